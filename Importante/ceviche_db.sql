@@ -116,6 +116,7 @@ CREATE TABLE mesa (
     capacidad INT DEFAULT 4,
     zona_id INT NOT NULL,
     estado ENUM('disponible','ocupada','limpieza','reservada','fuera_servicio') DEFAULT 'disponible',
+    version INT NOT NULL DEFAULT 0,
     qr_code VARCHAR(255) UNIQUE,
     posicion_x FLOAT DEFAULT 0.0,
     posicion_y FLOAT DEFAULT 0.0,
@@ -131,6 +132,18 @@ CREATE TABLE mesa (
     INDEX idx_mesa_numero (numero)
 );
 
+CREATE TABLE evento_mesa (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    mesa_id INT NOT NULL,
+    estado_anterior VARCHAR(20),
+    estado_nuevo VARCHAR(20) NOT NULL,
+    version INT NOT NULL,
+    motivo VARCHAR(50),
+    creado_en DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (mesa_id) REFERENCES mesa(id) ON DELETE CASCADE,
+    INDEX idx_evento_mesa_creado (creado_en)
+);
+
 -- ===============================
 --   TABLA: CATEGORÍA Y PRODUCTO
 -- ===============================
@@ -196,13 +209,17 @@ CREATE TABLE ingrediente (
     proveedor VARCHAR(100),
     codigo_barras VARCHAR(50) UNIQUE,
     ubicacion_almacen VARCHAR(50),
+    ratio_stock DECIMAL(12,4) AS (stock * 1.0 / NULLIF(stock_minimo, 0)) STORED,
     creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (tipo_ingrediente_id) REFERENCES tipo_ingrediente(id) ON DELETE SET NULL,
     INDEX idx_ingrediente_nombre (nombre),
     INDEX idx_ingrediente_tipo (tipo_ingrediente_id),
     INDEX idx_ingrediente_activo (activo),
-    INDEX idx_ingrediente_codigo_barras (codigo_barras)
+    INDEX idx_ingrediente_codigo_barras (codigo_barras),
+    INDEX idx_ingrediente_alerta_stock (activo, ratio_stock),
+    INDEX idx_ingrediente_alerta_vencimiento (activo, fecha_vencimiento),
+    INDEX idx_ingrediente_proveedor (proveedor)
 );
 
 CREATE TABLE producto_ingrediente (
@@ -251,6 +268,19 @@ CREATE TABLE item_orden (
     INDEX idx_itemorden_orden (orden_id)
 );
 
+-- Histograma de tiempos de cola, preparación y pase por hora, estación y producto
+CREATE TABLE tiempo_cocina (
+    hora DATETIME NOT NULL,
+    estacion VARCHAR(20) NOT NULL,
+    producto_id INT NOT NULL,
+    fase VARCHAR(20) NOT NULL,
+    cubeta INT NOT NULL,
+    cantidad INT NOT NULL DEFAULT 0,
+    suma_segundos DOUBLE NOT NULL DEFAULT 0,
+    PRIMARY KEY (hora, estacion, producto_id, fase, cubeta),
+    FOREIGN KEY (producto_id) REFERENCES producto(id) ON DELETE CASCADE
+);
+
 -- ===============================
 --           TABLA: PAGOS
 -- ===============================
@@ -292,6 +322,20 @@ CREATE TABLE resena (
     INDEX idx_resena_producto (producto_id)
 );
 
+-- Resumen de las reseñas aprobadas por producto (cantidad, suma e histograma de estrellas)
+CREATE TABLE resumen_resena (
+    producto_id INT PRIMARY KEY,
+    cantidad INT NOT NULL DEFAULT 0,
+    suma INT NOT NULL DEFAULT 0,
+    estrellas_1 INT NOT NULL DEFAULT 0,
+    estrellas_2 INT NOT NULL DEFAULT 0,
+    estrellas_3 INT NOT NULL DEFAULT 0,
+    estrellas_4 INT NOT NULL DEFAULT 0,
+    estrellas_5 INT NOT NULL DEFAULT 0,
+    actualizado_en DATETIME,
+    FOREIGN KEY (producto_id) REFERENCES producto(id)
+);
+
 -- ===============================
 --           TABLA: RESERVAS
 -- ===============================
@@ -513,6 +557,23 @@ CREATE INDEX idx_sesion_usuario_fecha ON sesion_usuario(usuario_id, ultimo_acces
 -- ALTER TABLE producto ADD FULLTEXT ft_nombre_descripcion (nombre, descripcion);
 -- ALTER TABLE ingrediente ADD FULLTEXT ft_nombre (nombre);
 
+-- Bases creadas antes de ingrediente.ratio_stock: la aplicación no tiene migraciones y
+-- todas las consultas de Ingrediente seleccionan esa columna, así que hay que agregarla a mano:
+-- ALTER TABLE ingrediente
+--     ADD COLUMN ratio_stock DECIMAL(12,4) AS (stock * 1.0 / NULLIF(stock_minimo, 0)) STORED,
+--     ADD INDEX idx_ingrediente_alerta_stock (activo, ratio_stock),
+--     ADD INDEX idx_ingrediente_alerta_vencimiento (activo, fecha_vencimiento),
+--     ADD INDEX idx_ingrediente_proveedor (proveedor);
+
+-- Bases creadas antes de mesa.version: todas las consultas de Mesa (mapa, órdenes, pagos,
+-- reservas) seleccionan esa columna, así que hay que agregarla a mano. La tabla
+-- evento_mesa se crea con su CREATE TABLE de arriba:
+-- ALTER TABLE mesa ADD COLUMN version INT NOT NULL DEFAULT 0;
+
+-- Bases creadas antes de resumen_resena: crear la tabla con su CREATE TABLE de arriba y
+-- llamar una vez a POST /api/resena/resumenes/recalcular (admin) para resumir las reseñas
+-- que ya estaban aprobadas; desde ahí el resumen se mantiene al moderar.
+
 -- ===============================
 --         DATOS DE EJEMPLO
 -- ===============================
@@ -1,34 +1,58 @@
 import os
 import datetime
+import importlib
 import json
+import logging
 from flask import Flask, request, jsonify
 from werkzeug.exceptions import HTTPException
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import config_by_name
 from models import db
-
-# Importar los blueprints
-from routes.auth_routes import auth_bp
-from routes.admin_routes import admin_bp
-from routes.permission_routes import permission_bp
-from routes.upload_routes import upload_bp
-from routes.caja_routes import caja_bp
-from routes.mesero_routes import mesero_bp
-from routes.cocina_routes import cocina_bp
-from routes.audit_routes import audit_bp
-from routes.audit_routes_simple import audit_bp_simple
-from routes.local_routes import local_bp
-from routes.reserva_routes import reserva_bp
-from routes.reserva_routes_public import reserva_public_bp
-from routes.bloqueo_routes import bloqueo_bp
-from routes.bloqueo_routes_public import bloqueo_public_bp
-from routes.categoria_routes import categoria_bp
-from routes.ingrediente_routes import ingrediente_bp
-from routes.producto_routes import producto_bp
-from routes.tipo_ingrediente_routes import tipo_ingrediente_bp
-from routes.producto_ingrediente_routes import producto_ingrediente_bp
-from routes.orden_routes import orden_bp
+from utils.json_provider import CevicheJSONProvider
+from utils.db_pool import init_pool
+from utils.replica import init_replica
+from utils.sql_instrumentacion import init_instrumentacion
+from utils.metricas import init_metricas
+from utils.logs import init_logging
+from utils.compresion import init_compresion
+from utils.tareas import programar_tarea
+
+# Blueprints (módulo, atributo, prefijo). Se importan al crear la aplicación, no al
+# importar este módulo: scripts y CLI que solo necesitan create_app arrancan más rápido.
+BLUEPRINTS = [
+    ('routes.auth_routes', 'auth_bp', '/auth'),
+    ('routes.admin_routes', 'admin_bp', '/api/admin'),
+    ('routes.permission_routes', 'permission_bp', '/api/permissions'),
+    ('routes.upload_routes', 'upload_bp', '/api/upload'),
+    ('routes.caja_routes', 'caja_bp', '/api/caja'),
+    ('routes.mesero_routes', 'mesero_bp', '/api/mesero'),
+    ('routes.cocina_routes', 'cocina_bp', '/api/cocina'),
+    ('routes.audit_routes', 'audit_bp', '/api/audit'),
+    ('routes.audit_routes_simple', 'audit_bp_simple', '/api/audit-simple'),
+    ('routes.local_routes', 'local_bp', '/api/local'),
+    ('routes.reserva_routes', 'reserva_bp', None),
+    ('routes.reserva_routes_public', 'reserva_public_bp', None),
+    ('routes.bloqueo_routes', 'bloqueo_bp', None),
+    ('routes.bloqueo_routes_public', 'bloqueo_public_bp', None),
+    ('routes.categoria_routes', 'categoria_bp', '/api/categoria'),
+    ('routes.ingrediente_routes', 'ingrediente_bp', '/api/ingrediente'),
+    ('routes.producto_routes', 'producto_bp', '/api/producto'),
+    ('routes.resena_routes', 'resena_bp', '/api/resena'),
+    ('routes.tipo_ingrediente_routes', 'tipo_ingrediente_bp', '/api/tipo-ingrediente'),
+    ('routes.producto_ingrediente_routes', 'producto_ingrediente_bp', '/api/producto-ingrediente'),
+    ('routes.orden_routes', 'orden_bp', '/api/orden'),
+    ('routes.qr_routes', 'qr_bp', '/api/qr'),
+    ('routes.interno_routes', 'interno_bp', '/api/interno'),
+    ('routes.metricas_routes', 'metricas_bp', None),
+]
+
+# Rutas de prueba y diagnóstico: solo con RUTAS_PRUEBA_HABILITADAS
+BLUEPRINTS_PRUEBA = [
+    ('routes.prueba_routes', 'prueba_bp', None),
+]
+
+logger = logging.getLogger(__name__)
 
 def create_app(config_name=None):
     """
@@ -39,6 +63,10 @@ def create_app(config_name=None):
 
     app = Flask(__name__)
     app.config.from_object(config_by_name[config_name])
+    init_logging(app)
+
+    # Serialización JSON rápida (orjson) con soporte nativo de Decimal y fechas
+    app.json = CevicheJSONProvider(app)
 
     # Configurar CORS para desarrollo (permitir acceso desde IPs de la red)
     CORS(app,
@@ -55,65 +83,48 @@ def create_app(config_name=None):
 
     # Inicializar extensiones
     db.init_app(app)
+    init_pool(app, db)
+    init_replica(app, db)
+    init_instrumentacion(app, db)
+    init_metricas(app, db)
+    # Registrado antes que los after_request de CORS y blueprints: se ejecuta el último
+    init_compresion(app)
     jwt = JWTManager(app)
 
-    # Registrar Blueprints (módulos de rutas) con verificación
+    # Registrar Blueprints (módulos de rutas)
+    blueprints = BLUEPRINTS + (BLUEPRINTS_PRUEBA if app.config.get('RUTAS_PRUEBA_HABILITADAS') else [])
     try:
-        app.register_blueprint(auth_bp, url_prefix='/auth')
-        app.register_blueprint(admin_bp, url_prefix='/api/admin')
-        app.register_blueprint(permission_bp, url_prefix='/api/permissions')
-        app.register_blueprint(upload_bp, url_prefix='/api/upload')
-        app.register_blueprint(caja_bp, url_prefix='/api/caja')
-        app.register_blueprint(mesero_bp, url_prefix='/api/mesero')
-        app.register_blueprint(cocina_bp, url_prefix='/api/cocina')
-        app.register_blueprint(audit_bp, url_prefix='/api/audit')
-        app.register_blueprint(audit_bp_simple, url_prefix='/api/audit-simple')
-        app.register_blueprint(local_bp, url_prefix='/api/local')
-        app.register_blueprint(reserva_bp)
-        app.register_blueprint(reserva_public_bp)
-        app.register_blueprint(bloqueo_bp)
-        app.register_blueprint(bloqueo_public_bp)
-        app.register_blueprint(categoria_bp, url_prefix='/api/categoria')
-        app.register_blueprint(ingrediente_bp, url_prefix='/api/ingrediente')
-        app.register_blueprint(producto_bp, url_prefix='/api/producto')
-        app.register_blueprint(tipo_ingrediente_bp, url_prefix='/api/tipo-ingrediente')
-        app.register_blueprint(producto_ingrediente_bp, url_prefix='/api/producto-ingrediente')
-        app.register_blueprint(orden_bp, url_prefix='/api/orden')
-
-        # Verificar que las rutas se registraron correctamente
-        tipo_routes = [rule for rule in app.url_map.iter_rules() if 'tipo_ingrediente' in str(rule)]
-        ingrediente_routes = [rule for rule in app.url_map.iter_rules() if 'ingrediente' in str(rule) and 'tipo' not in str(rule)]
-
-        if not tipo_routes:
-            print("WARNING: No tipo_ingrediente routes found!")
-        else:
-            print(f"✓ Found {len(tipo_routes)} tipo_ingrediente routes")
-
-        if not ingrediente_routes:
-            print("WARNING: No ingrediente routes found!")
-        else:
-            print(f"✓ Found {len(ingrediente_routes)} ingrediente routes")
-
-    except Exception as e:
-        print(f"ERROR registering blueprints: {e}")
+        for modulo, nombre, prefijo in blueprints:
+            blueprint = getattr(importlib.import_module(modulo), nombre)
+            app.register_blueprint(blueprint, url_prefix=prefijo)
+    except Exception:
+        logger.exception("Error registrando blueprints")
         raise
 
+    # Tareas periódicas por proceso (ver utils/tareas.py)
+    from services.permission_service import PermissionService
+    programar_tarea(app, 'permisos-expirados', app.config.get('PERMISOS_LIMPIEZA_INTERVALO', 0),
+                    PermissionService.cleanup_expired_permissions)
+    from services.qr_sesion_service import QRSesionService
+    programar_tarea(app, 'wishlist-volcado', app.config.get('QR_WISHLIST_VOLCADO_INTERVALO', 0),
+                    QRSesionService.volcar_wishlists)
+    from services.mesa_estado_service import MesaEstadoService
+    programar_tarea(app, 'eventos-mesa-purga', app.config.get('MESA_EVENTOS_PURGA_INTERVALO', 0),
+                    MesaEstadoService.purgar_eventos)
+    from services.analitica_cocina_service import AnaliticaCocinaService
+    programar_tarea(app, 'tiempos-cocina-purga', app.config.get('COCINA_TIEMPOS_PURGA_INTERVALO', 0),
+                    AnaliticaCocinaService.purgar)
+    from services.estimador_cocina_service import estimador_cocina
+    programar_tarea(app, 'estimador-cocina', app.config.get('COCINA_ESTIMADOR_INTERVALO', 0),
+                    estimador_cocina.entrenar)
+
     @app.route("/")
     def index():
         return "<h1>Backend Cevichería</h1><p>Todas las rutas conectadas.</p>"
 
-    @app.route("/test-cors")
-    def test_cors():
-        """Endpoint de prueba para verificar CORS"""
-        return jsonify({
-            "message": "CORS funcionando correctamente",
-            "status": "success",
-            "timestamp": datetime.datetime.now().isoformat()
-        }), 200
-
     @app.route("/api/test")
     def test_api():
-        """Endpoint de prueba para verificar que la API funciona"""
+        """Endpoint de verificación (lo usan los scripts de despliegue como health check)"""
         return jsonify({
             "message": "API funcionando correctamente",
             "status": "success",
@@ -124,56 +135,6 @@ def create_app(config_name=None):
             ]
         }), 200
 
-    @app.route("/api/test-image")
-    def test_image():
-        """Crear y servir una imagen de prueba"""
-        try:
-            from PIL import Image
-            import io
-
-            # Crear imagen de prueba
-            img = Image.new('RGB', (300, 200), color='red')
-            from PIL import ImageDraw
-            draw = ImageDraw.Draw(img)
-            draw.text((20, 20), "TEST IMAGE", fill='white')
-
-            img_bytes = io.BytesIO()
-            img.save(img_bytes, format='PNG')
-            img_bytes.seek(0)
-
-            from flask import Response
-            return Response(
-                img_bytes.getvalue(),
-                mimetype='image/png',
-                headers={'Access-Control-Allow-Origin': '*'}
-            )
-
-        except ImportError:
-            # Si PIL no está disponible, devolver JSON
-            return jsonify({
-                "message": "PIL no disponible - instala con: pip install Pillow",
-                "status": "error"
-            }), 500
-
-    @app.route("/api/test/mesero")
-    def test_mesero():
-        """Endpoint de prueba para el servicio de mesero"""
-        try:
-            from services.mesero_service import MeseroService
-            layout = MeseroService.get_layout_with_realtime_data()
-            return jsonify({
-                "message": "MeseroService funcionando",
-                "status": "success",
-                "layout_length": len(layout),
-                "first_piso": layout[0]['nombre'] if layout else None
-            }), 200
-        except Exception as e:
-            return jsonify({
-                "message": "Error en MeseroService",
-                "error": str(e),
-                "status": "error"
-            }), 500
-    
     # Ruta para servir archivos subidos
     @app.route('/uploads/<path:filename>')
     def uploaded_file(filename):
@@ -249,12 +210,19 @@ def create_app(config_name=None):
 
     return app
 
-if __name__ == '__main__':
-    env_name = os.getenv('FLASK_ENV', 'development')
-    app = create_app(env_name)
+def __getattr__(nombre):
+    """
+    Instancia `app` perezosa para `gunicorn app:app` y `flask run`: se construye una
+    sola vez, en el primer acceso. Importar create_app no crea ninguna aplicación.
+    """
+    if nombre == 'app':
+        global app
+        app = create_app(os.getenv('FLASK_ENV', 'development'))
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
-    app.run(host='0.0.0.0', port=5000, debug=True)
 
-# Para importación
-env_name = os.getenv('FLASK_ENV', 'development')
-app = create_app(env_name)
+if __name__ == '__main__':
+    aplicacion = create_app(os.getenv('FLASK_ENV', 'development'))
+    # El reloader relanza el proceso: solo tiene sentido en desarrollo
+    aplicacion.run(host='0.0.0.0', port=5000, debug=aplicacion.debug, use_reloader=aplicacion.debug)
@@ -0,0 +1,78 @@
+"""
+Benchmark de arranque de la aplicación.
+
+Cada medición corre en un proceso Python nuevo (como un worker de gunicorn recién
+lanzado) y reporta:
+    - import:   importar el módulo app (no debe construir ninguna aplicación)
+    - create:   create_app() completo (extensiones, blueprints)
+    - primera:  primera petición (GET /api/test) con el cliente de pruebas
+    - rss:      memoria residente máxima del proceso
+    - modulos:  módulos cargados en sys.modules
+    - rutas:    reglas registradas en url_map
+
+Escenarios: con y sin RUTAS_PRUEBA_HABILITADAS.
+
+Uso:
+    python benchmarks/bench_arranque.py [--repeticiones 7] [--entorno testing]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MEDICION = r'''
+import json, resource, sys, time
+inicio = time.perf_counter()
+import app as modulo
+importado = time.perf_counter()
+construido_al_importar = 'app' in vars(modulo)
+aplicacion = modulo.create_app(sys.argv[1])
+creado = time.perf_counter()
+with aplicacion.test_client() as cliente:
+    cliente.get('/api/test')
+primera = time.perf_counter()
+print(json.dumps({
+    'import': importado - inicio,
+    'create': creado - importado,
+    'primera': primera - creado,
+    'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modulos': len(sys.modules),
+    'rutas': len(list(aplicacion.url_map.iter_rules())),
+    'construido_al_importar': construido_al_importar
+}))
+'''
+
+
+def medir(entorno: str, rutas_prueba: bool) -> dict:
+    env = dict(os.environ, RUTAS_PRUEBA_HABILITADAS='true' if rutas_prueba else 'false', LOG_LEVEL='ERROR')
+    salida = subprocess.run([sys.executable, '-c', MEDICION, entorno], cwd=RAIZ, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arranque de la aplicación')
+    parser.add_argument('--repeticiones', type=int, default=7)
+    parser.add_argument('--entorno', default='testing', help='Configuración usada por create_app')
+    args = parser.parse_args()
+
+    print(f"{'escenario':<22} {'import ms':>10} {'create ms':>10} {'1ª pet ms':>10} {'total ms':>10} {'RSS MB':>8} {'módulos':>8} {'rutas':>6}")
+    for nombre, rutas_prueba in (('sin rutas de prueba', False), ('con rutas de prueba', True)):
+        muestras = [medir(args.entorno, rutas_prueba) for _ in range(args.repeticiones)]
+        if any(m['construido_al_importar'] for m in muestras):
+            print('  ¡Atención! importar app construye una aplicación')
+        mediana = {clave: statistics.median(m[clave] for m in muestras)
+                   for clave in ('import', 'create', 'primera', 'rss', 'modulos', 'rutas')}
+        total = mediana['import'] + mediana['create'] + mediana['primera']
+        print(f"{nombre:<22} {mediana['import'] * 1000:>10.1f} {mediana['create'] * 1000:>10.1f} "
+              f"{mediana['primera'] * 1000:>10.1f} {total * 1000:>10.1f} {mediana['rss']:>8.1f} "
+              f"{mediana['modulos']:>8.0f} {mediana['rutas']:>6.0f}")
+    print(f'\nMedianas de {args.repeticiones} procesos nuevos por escenario.')
+
+
+if __name__ == '__main__':
+    main()
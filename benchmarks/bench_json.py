@@ -0,0 +1,156 @@
+"""
+Micro-benchmark de serialización JSON.
+
+Compara el proveedor por defecto de Flask (json de la librería estándar) con
+CevicheJSONProvider sobre payloads sintéticos con la forma de las respuestas de
+órdenes, menú y plano del local.
+
+Uso:
+    python benchmarks/bench_json.py [--repeticiones 200] [--escala 1]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils.json_provider import CevicheJSONProvider, codificar, orjson
+
+ESTADOS_ITEM = ['pendiente', 'en_cola', 'preparando', 'listo', 'servido']
+ESTACIONES = ['frio', 'caliente', 'bebida', 'postre']
+
+
+def payload_ordenes(n_ordenes: int) -> dict:
+    """Órdenes activas con sus ítems (forma de Orden.to_dict con Decimal y datetime nativos)."""
+    base = datetime(2024, 6, 1, 19, 0, 0)
+    ordenes = []
+    for i in range(n_ordenes):
+        creado = base + timedelta(minutes=i)
+        items = [{
+            'id': i * 10 + j,
+            'orden_id': i,
+            'producto_id': 100 + j,
+            'cantidad': 1 + j % 3,
+            'precio_unitario': Decimal('24.90') + j,
+            'estado': ESTADOS_ITEM[j % len(ESTADOS_ITEM)],
+            'estacion': ESTACIONES[j % len(ESTACIONES)],
+            'fecha_inicio': creado + timedelta(minutes=2),
+            'fecha_listo': None,
+            'fecha_servido': None,
+            'notas': 'sin cebolla' if j % 4 == 0 else None,
+            'creado_en': creado,
+            'actualizado_en': creado,
+            'producto': {'id': 100 + j, 'nombre': f'Ceviche clásico {j}', 'descripcion': 'Pescado del día, limón y ají limo'}
+        } for j in range(6)]
+        ordenes.append({
+            'id': i,
+            'numero': f'ORD-{i:05d}',
+            'mesa_id': i % 40,
+            'mozo_id': i % 8,
+            'tipo': 'local',
+            'estado': 'en_proceso',
+            'monto_total': Decimal('149.40'),
+            'num_comensales': 4,
+            'cliente_nombre': None,
+            'creado_en': creado,
+            'actualizado_en': creado,
+            'total': Decimal('149.40'),
+            'items': items
+        })
+    return {'success': True, 'data': ordenes, 'total': len(ordenes)}
+
+
+def payload_menu(n_productos: int) -> dict:
+    """Menú completo con categoría e imágenes anidadas."""
+    ahora = datetime(2024, 6, 1, 12, 0, 0)
+    productos = [{
+        'id': i,
+        'nombre': f'Producto {i}',
+        'descripcion': 'Leche de tigre, camote, choclo y cancha serrana',
+        'precio': Decimal('32.50') + i % 7,
+        'categoria_id': i % 12,
+        'tipo_estacion': ESTACIONES[i % len(ESTACIONES)],
+        'tiempo_preparacion': 10 + i % 15,
+        'nivel_picante': 'medio',
+        'ingredientes': 'pescado, limón, ají, cebolla',
+        'etiquetas': 'marino,clásico',
+        'disponible': True,
+        'stock': None,
+        'alerta_stock': 0,
+        'es_favorito': i % 9 == 0,
+        'imagen_url': f'/uploads/productos/{i}.jpg',
+        'creado_en': ahora,
+        'actualizado_en': ahora,
+        'categoria': {'id': i % 12, 'nombre': f'Categoría {i % 12}', 'descripcion': None, 'activo': True},
+        'imagenes': [{'id': i * 3 + k, 'producto_id': i, 'imagen_url': f'/uploads/productos/{i}_{k}.jpg',
+                      'orden': k, 'es_principal': k == 0, 'creado_en': ahora} for k in range(3)]
+    } for i in range(n_productos)]
+    return {'success': True, 'data': productos, 'total': len(productos), 'favoritos_count': n_productos // 9}
+
+
+def payload_plano(n_pisos: int) -> dict:
+    """Plano del local: pisos > zonas > mesas con su estado."""
+    pisos = []
+    mesa_id = 0
+    for p in range(n_pisos):
+        zonas = []
+        for z in range(4):
+            mesas = []
+            for _ in range(12):
+                mesa_id += 1
+                mesas.append({
+                    'id': mesa_id,
+                    'numero': f'M{mesa_id}',
+                    'capacidad': 4,
+                    'estado': 'ocupada' if mesa_id % 3 == 0 else 'disponible',
+                    'zona_id': p * 4 + z,
+                    'qr_code': f'QR-{mesa_id:06d}',
+                    'posicion_x': Decimal(mesa_id * 37 % 800),
+                    'posicion_y': Decimal(mesa_id * 53 % 600),
+                    'activo': True
+                })
+            zonas.append({'id': p * 4 + z, 'nombre': f'Zona {z}', 'tipo': 'interior', 'piso_id': p, 'mesas': mesas})
+        pisos.append({'id': p, 'nombre': f'Piso {p + 1}', 'nivel': p + 1, 'activo': True, 'zonas': zonas})
+    return {'success': True, 'data': pisos}
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mejor de 3 rondas, en milisegundos por llamada."""
+    tiempos = timeit.repeat(funcion, number=repeticiones, repeat=3)
+    return min(tiempos) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de serialización JSON')
+    parser.add_argument('--repeticiones', type=int, default=200)
+    parser.add_argument('--escala', type=int, default=1, help='Multiplicador del tamaño de los payloads')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    estandar = DefaultJSONProvider(app)
+    rapido = CevicheJSONProvider(app)
+
+    payloads = {
+        'ordenes': payload_ordenes(60 * args.escala),
+        'menu': payload_menu(120 * args.escala),
+        'plano': payload_plano(3 * args.escala),
+    }
+
+    print(f"Codificador rápido: {'orjson ' + orjson.__version__ if orjson else 'no disponible (json estándar)'}")
+    print(f"{'payload':<10}{'bytes':>10}{'flask (ms)':>14}{'ceviche (ms)':>15}{'bytes (ms)':>13}{'mejora':>9}")
+    for nombre, payload in payloads.items():
+        tam = len(codificar(payload))
+        t_estandar = medir(lambda: estandar.dumps(payload), args.repeticiones)
+        t_rapido = medir(lambda: rapido.dumps(payload), args.repeticiones)
+        t_bytes = medir(lambda: codificar(payload), args.repeticiones)
+        print(f"{nombre:<10}{tam:>10}{t_estandar:>14.3f}{t_rapido:>15.3f}{t_bytes:>13.3f}{t_estandar / t_bytes:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
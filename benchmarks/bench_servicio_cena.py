@@ -0,0 +1,309 @@
+"""
+Benchmark de un servicio de cena completo contra la aplicación Flask real.
+
+1. Crea una base de datos nueva (SQLite temporal o --uri) y la siembra con un
+   local escalado: pisos, zonas, mesas, carta, personal e histórico de órdenes
+   cerradas (GeneradorDatos de generar_datos.py, inserciones por lotes).
+2. Recorre un servicio guionizado con el cliente de pruebas de Flask y tokens
+   JWT reales por rol:
+     - meseros: sondeo del plano en tiempo real, apertura de órdenes y pedidos
+     - cocina: refresco del tablero y avance de ítems (preparando/listo/servido)
+     - caja: órdenes por cobrar y pagos
+     - clientes: menú público por QR
+3. Informa por endpoint p50/p95/p99 de latencia y sentencias SQL por petición
+   (cabeceras X-SQL-* de utils.sql_instrumentacion).
+
+Con --guardar se escribe el resultado en JSON; con --comparar se contrasta con un
+resultado previo y el proceso termina con código 1 si algún endpoint empeora más
+allá de la tolerancia (útil antes de desplegar).
+
+Uso:
+    python benchmarks/bench_servicio_cena.py [--pisos 4] [--mesas-por-zona 10]
+        [--productos 120] [--historico-dias 30] [--rondas 30] [--semilla 42]
+        [--uri mysql+pymysql://...] [--guardar base.json] [--comparar base.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# La configuración se lee al importar config: fijarla antes de importar la aplicación
+os.environ.setdefault('FLASK_ENV', 'testing')
+os.environ.setdefault('SQL_INSTRUMENTACION', 'cabeceras')
+os.environ.setdefault('SQL_MUESTREO', '1.0')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+METODOS_PAGO = ['efectivo', 'tarjeta', 'yape', 'plin']
+
+
+# --- Siembra ---
+
+def sembrar(args):
+    """Crea el esquema y lo llena con un local escalado (generar_datos.py). Devuelve lo sembrado."""
+    from generar_datos import GeneradorDatos
+    from models import db
+
+    db.drop_all()
+    db.create_all()
+    with db.engine.begin() as conexion:
+        generador = GeneradorDatos(conexion, semilla=args.semilla)
+        generador.preparar_conexion()
+        usuarios = generador.personal(meseros=args.meseros, caja=1)
+        mesas = generador.local(args.pisos, args.zonas_por_piso, args.mesas_por_zona)
+        productos = [p for p in generador.carta(args.productos) if p['disponible']]
+        generador.historico(mesas, productos, usuarios, args.historico_dias, args.ordenes_dia)
+
+    return {'usuarios': usuarios, 'mesas': mesas, 'productos': productos, 'conteo': generador.insertadas}
+
+
+# --- Servicio guionizado ---
+
+class Medidor:
+    """Latencias y sentencias SQL por endpoint."""
+
+    def __init__(self, client):
+        self.client = client
+        self.activo = True
+        self.muestras = {}
+
+    def llamar(self, metodo, etiqueta, url, headers=None, json_cuerpo=None, esperado=(200, 201)):
+        inicio = perf_counter()
+        respuesta = self.client.open(url, method=metodo, headers=headers, json=json_cuerpo)
+        duracion = perf_counter() - inicio
+        if self.activo:
+            datos = self.muestras.setdefault(f'{metodo} {etiqueta}', {'tiempos': [], 'sql': [], 'errores': 0, 'n_mas_uno': 0})
+            datos['tiempos'].append(duracion)
+            datos['sql'].append(int(respuesta.headers.get('X-SQL-Count', 0)))
+            datos['n_mas_uno'] += 1 if respuesta.headers.get('X-SQL-N1') else 0
+            if respuesta.status_code not in esperado:
+                datos['errores'] += 1
+        return respuesta
+
+
+def cabeceras_jwt(usuario):
+    """Token emitido directamente (requiere contexto de la aplicación)."""
+    from flask_jwt_extended import create_access_token
+    return {'Authorization': f"Bearer {create_access_token(identity=str(usuario['id']))}"}
+
+
+class ServicioCena:
+    """Estado del servicio (mesas libres, órdenes abiertas) que persiste entre rondas."""
+
+    SIGUIENTE = {'en_cola': 'preparando', 'preparando': 'listo', 'listo': 'servido'}
+
+    def __init__(self, medidor, semilla, args, rng, cabeceras=cabeceras_jwt):
+        self.medidor, self.args, self.rng = medidor, args, rng
+        usuarios = semilla['usuarios']
+        self.meseros = [(u['id'], cabeceras(u)) for u in usuarios if u['rol'] == 'mozo']
+        self.cocina = [cabeceras(u) for u in usuarios if u['rol'] == 'cocina']
+        self.caja = cabeceras(next(u for u in usuarios if u['rol'] == 'caja'))
+        self.productos = semilla['productos']
+        self.capacidades = {m['id']: m['capacidad'] for m in semilla['mesas']}
+        self.mesas_libres = set(self.capacidades)
+        # orden_id -> {'mesa': id, 'items': {item_id: estado}}
+        self.abiertas = {}
+
+    def rondas(self, cantidad):
+        """Cada ronda equivale a un intervalo de sondeo del frontend."""
+        for _ in range(cantidad):
+            self.meseros_ronda()
+            self.cocina_ronda()
+            self.caja_ronda()
+            self.clientes_ronda()
+
+    def meseros_ronda(self):
+        """Sondeo del plano y apertura de mesas con su pedido."""
+        medidor, rng = self.medidor, self.rng
+        for mozo_id, headers in self.meseros:
+            medidor.llamar('GET', '/api/mesero/public/layout/realtime', '/api/mesero/public/layout/realtime')
+            medidor.llamar('GET', '/api/mesero/public/estadisticas/estados', '/api/mesero/public/estadisticas/estados')
+            if not self.mesas_libres or rng.random() >= self.args.prob_nueva_orden:
+                continue
+            mesa_id = rng.choice(sorted(self.mesas_libres))
+            respuesta = medidor.llamar('POST', '/api/orden/', '/api/orden/', headers, {
+                'mesa_id': mesa_id, 'mozo_id': mozo_id, 'num_comensales': rng.randint(1, self.capacidades[mesa_id])
+            })
+            if respuesta.status_code != 201:
+                continue
+            orden_id = respuesta.get_json()['data']['id']
+            self.mesas_libres.discard(mesa_id)
+            self.abiertas[orden_id] = {'mesa': mesa_id, 'items': {}}
+            for producto in rng.sample(self.productos, rng.randint(2, 6)):
+                respuesta = medidor.llamar('POST', '/api/orden/<id>/productos', f'/api/orden/{orden_id}/productos', headers, {
+                    'producto_id': producto['id'], 'cantidad': rng.randint(1, 3),
+                    'precio_unitario': producto['precio'], 'estacion': producto['tipo_estacion']
+                })
+                if respuesta.status_code == 201:
+                    self.abiertas[orden_id]['items'][respuesta.get_json()['data']['id']] = 'en_cola'
+
+    def cocina_ronda(self):
+        """Refresco del tablero por estación y avance de una parte de los ítems."""
+        for headers in self.cocina:
+            self.medidor.llamar('GET', '/api/orden/cocina/pendientes', '/api/orden/cocina/pendientes', headers)
+        pendientes = [(o, i) for o, datos in self.abiertas.items() for i, e in datos['items'].items() if e in self.SIGUIENTE]
+        for orden_id, item_id in self.rng.sample(pendientes, min(len(pendientes), self.args.avances_cocina)):
+            estado = self.SIGUIENTE[self.abiertas[orden_id]['items'][item_id]]
+            respuesta = self.medidor.llamar('PUT', '/api/orden/items/<id>/estado', f'/api/orden/items/{item_id}/estado',
+                                            self.cocina[0], {'estado': estado})
+            if respuesta.status_code == 200:
+                self.abiertas[orden_id]['items'][item_id] = estado
+
+    def caja_ronda(self):
+        """Cobra las órdenes con todos sus ítems servidos."""
+        self.medidor.llamar('GET', '/api/orden/caja/pendientes', '/api/orden/caja/pendientes', self.caja)
+        servidas = [o for o, datos in self.abiertas.items()
+                    if datos['items'] and all(e == 'servido' for e in datos['items'].values())]
+        for orden_id in servidas:
+            respuesta = self.medidor.llamar('POST', '/api/orden/<id>/pagar', f'/api/orden/{orden_id}/pagar', self.caja,
+                                            {'metodo': self.rng.choice(METODOS_PAGO)})
+            if respuesta.status_code == 201:
+                self.mesas_libres.add(self.abiertas.pop(orden_id)['mesa'])
+
+    def clientes_ronda(self):
+        """Clientes escaneando el QR de la mesa."""
+        for _ in range(self.args.clientes_qr):
+            self.medidor.llamar('GET', '/api/producto/public', '/api/producto/public')
+            self.medidor.llamar('GET', '/api/categoria/public', '/api/categoria/public')
+            self.medidor.llamar('GET', '/api/mesero/public/layout', '/api/mesero/public/layout')
+
+
+# --- Reporte ---
+
+def percentil(valores, p):
+    """Percentil por rango más cercano."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))]
+
+
+def resumir(muestras):
+    resultado = {}
+    for endpoint, datos in sorted(muestras.items()):
+        tiempos = datos['tiempos']
+        resultado[endpoint] = {
+            'peticiones': len(tiempos),
+            'errores': datos['errores'],
+            'p50_ms': round(percentil(tiempos, 50) * 1000, 2),
+            'p95_ms': round(percentil(tiempos, 95) * 1000, 2),
+            'p99_ms': round(percentil(tiempos, 99) * 1000, 2),
+            'max_ms': round(max(tiempos) * 1000, 2),
+            'sql_media': round(sum(datos['sql']) / len(datos['sql']), 1),
+            'sql_max': max(datos['sql']),
+            'n_mas_uno': datos['n_mas_uno']
+        }
+    return resultado
+
+
+def imprimir(resultado):
+    cabecera = f"{'endpoint':<46} {'n':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'sql':>6} {'sql max':>7} {'N+1':>5}"
+    print(cabecera)
+    print('-' * len(cabecera))
+    for endpoint, r in resultado.items():
+        print(f"{endpoint:<46} {r['peticiones']:>6} {r['errores']:>4} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} {r['sql_media']:>6.1f} {r['sql_max']:>7} {r['n_mas_uno']:>5}")
+
+
+def comparar(actual, base, tolerancia):
+    """Regresiones respecto a un resultado previo: p95 más lento o más sentencias SQL por petición."""
+    regresiones = []
+    for endpoint, r in actual.items():
+        previo = base.get(endpoint)
+        if previo is None:
+            continue
+        # Margen absoluto de 1 ms para no marcar ruido en endpoints muy rápidos
+        if r['p95_ms'] > previo['p95_ms'] * (1 + tolerancia) + 1:
+            regresiones.append(f"{endpoint}: p95 {previo['p95_ms']} -> {r['p95_ms']} ms")
+        if r['sql_media'] > previo['sql_media'] + 0.5:
+            regresiones.append(f"{endpoint}: SQL/petición {previo['sql_media']} -> {r['sql_media']}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', help='Base de datos (por defecto SQLite temporal). ¡Se borra y se vuelve a crear!')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--pisos', type=int, default=4)
+    parser.add_argument('--zonas-por-piso', type=int, default=4)
+    parser.add_argument('--mesas-por-zona', type=int, default=10)
+    parser.add_argument('--productos', type=int, default=120)
+    parser.add_argument('--historico-dias', type=int, default=30, help='Días de órdenes cerradas previas')
+    parser.add_argument('--ordenes-dia', type=float, default=100, help='Media de órdenes históricas por día laborable')
+    parser.add_argument('--meseros', type=int, default=6)
+    parser.add_argument('--rondas', type=int, default=30)
+    parser.add_argument('--calentamiento', type=int, default=3, help='Rondas iniciales sin medir')
+    parser.add_argument('--prob-nueva-orden', type=float, default=0.35)
+    parser.add_argument('--avances-cocina', type=int, default=25, help='Cambios de estado de ítems por ronda')
+    parser.add_argument('--clientes-qr', type=int, default=5, help='Visitas al menú público por ronda')
+    parser.add_argument('--guardar', help='Escribe el resultado en este archivo JSON')
+    parser.add_argument('--comparar', help='Resultado JSON previo contra el que detectar regresiones')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Empeoramiento relativo de p95 permitido')
+    args = parser.parse_args()
+
+    temporal = None
+    if args.uri:
+        os.environ['TEST_DATABASE_URI'] = args.uri
+    else:
+        temporal = tempfile.NamedTemporaryFile(prefix='bench_cena_', suffix='.sqlite', delete=False).name
+        os.environ['TEST_DATABASE_URI'] = f'sqlite:///{temporal}'
+
+    from app import create_app
+    from models import db
+
+    rng = random.Random(args.semilla)
+    # OrdenService genera números de orden con el módulo random global
+    random.seed(args.semilla)
+
+    app = create_app('testing')
+    try:
+        with app.app_context():
+            inicio = perf_counter()
+            semilla = sembrar(args)
+            print(f"Siembra en {perf_counter() - inicio:.1f}s: {semilla['conteo']}")
+
+            medidor = Medidor(app.test_client())
+            cena = ServicioCena(medidor, semilla, args, rng)
+            medidor.activo = False
+            cena.rondas(args.calentamiento)
+            medidor.activo = True
+
+            inicio = perf_counter()
+            cena.rondas(args.rondas)
+            total = perf_counter() - inicio
+            db.session.remove()
+
+        resultado = resumir(medidor.muestras)
+        peticiones = sum(r['peticiones'] for r in resultado.values())
+        print(f'\n{args.rondas} rondas, {peticiones} peticiones en {total:.1f}s ({peticiones / total:.0f} pet/s)\n')
+        imprimir(resultado)
+
+        if args.guardar:
+            with open(args.guardar, 'w', encoding='utf-8') as f:
+                json.dump({'parametros': vars(args), 'conteo': semilla['conteo'], 'endpoints': resultado}, f, indent=2, ensure_ascii=False)
+            print(f'\nResultado guardado en {args.guardar}')
+
+        if args.comparar:
+            with open(args.comparar, encoding='utf-8') as f:
+                base = json.load(f)['endpoints']
+            regresiones = comparar(resultado, base, args.tolerancia)
+            if regresiones:
+                print('\nREGRESIONES:')
+                for linea in regresiones:
+                    print(f'  {linea}')
+                sys.exit(1)
+            print('\nSin regresiones respecto a la referencia.')
+    finally:
+        if temporal:
+            with app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
+            os.unlink(temporal)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,413 @@
+"""
+Compara modos de worker de gunicorn (sync frente a gevent) con el perfil del
+servicio de cena, contra un servidor real por HTTP y con concurrencia.
+
+Cada "equipo" es un hilo que ejecuta el mismo guion que bench_servicio_cena.py
+(meseros, cocina, caja y clientes QR) sobre su propio subconjunto de mesas. Con
+varios equipos en paralelo se ve lo que pasa cuando una petición lenta ocupa un
+worker: en sync el resto espera en cola; en gevent el worker atiende otras
+peticiones mientras la primera espera a MySQL.
+
+Procedimiento (misma base de datos y mismos parámetros en ambas corridas):
+
+    # 1. Sembrar una vez (contraseña de todo el personal: 12345)
+    python generar_datos.py --uri $URI --meses 3 --ordenes-dia 300 --reiniciar --si
+
+    # 2. Modo sync (3 workers)
+    GUNICORN_WORKER_CLASS=sync GUNICORN_WORKERS=3 gunicorn -c gunicorn.conf.py app:app
+    python benchmarks/bench_workers.py --url http://localhost:5000 --uri $URI --guardar sync.json
+
+    # 3. Modo gevent (3 workers x 100 greenlets, pool de 20+30 conexiones por worker)
+    GUNICORN_WORKER_CLASS=gevent GUNICORN_WORKERS=3 GUNICORN_WORKER_CONNECTIONS=100 \\
+        gunicorn -c gunicorn.conf.py app:app
+    python benchmarks/bench_workers.py --url http://localhost:5000 --uri $URI --comparar sync.json
+
+Entre corridas las mesas quedan ocupadas por las órdenes abiertas del guion:
+liberarlas (o volver a sembrar) antes de repetir.
+
+--uri solo se usa para leer el personal, las mesas y la carta existentes. Para ver
+sentencias SQL por endpoint, arrancar el servidor con SQL_INSTRUMENTACION=cabeceras.
+
+Escenario tiempo_real (--escenario tiempo_real, sin --uri): por cada nivel de
+concurrencia C mide el stream SSE de eventos de mesas (C clientes a la vez, tiempo
+hasta la primera línea), el plano en tiempo real con esos streams abiertos
+(--concurrencia-plano clientes) y, cerrados los streams, el plano con C clientes.
+El servidor necesita MESA_EVENTOS_STREAM_HABILITADO=true:
+
+    python benchmarks/bench_workers.py --url http://localhost:5000 --escenario tiempo_real \\
+        --concurrencias 1,8,32,64 --timeout 30 --guardar sync.json
+
+Resultados (2026-10-19). Una vCPU compartida por servidor y cliente, Python 3.11.7,
+gunicorn 21.2.0, gevent 24.2.1, 3 workers (gevent: 100 greenlets por worker), SQLite
+en archivo sembrado con generar_datos.py --meses 1 --ordenes-dia 60 (3 pisos,
+120 mesas, 150 productos, 2010 órdenes), MESA_EVENTOS_INTERVALO=1, --duracion 10
+--timeout 30.
+
+Plano en tiempo real (GET /api/mesero/public/layout/realtime), C clientes:
+
+       C | sync p50 / p95 ms   pet/s | gevent p50 / p95 ms  pet/s
+       1 |    186 /    286       4.7 |     230 /    290      4.5
+       8 |   2248 /   2760       3.5 |    2056 /   2744      3.7
+      32 |  11881 /  13264       2.5 |    9556 /  10284      3.3
+      64 |  13860 /  19740       3.5 |   16218 /  23368      2.8
+
+Stream SSE (GET /api/local/mesas/eventos/stream), C clientes a la vez: streams
+servidos y primera línea p50 / p95 ms:
+
+       C | sync                | gevent
+       1 |  1/1     93 /  93   |  1/1     79 /  79
+       8 |  3/8     37 /  40   |  8/8     43 /  48
+      32 |  3/32    21 /  22   | 32/32   122 / 215
+      64 |  3/64    31 /  31   | 64/64   170 / 317
+
+Plano (4 clientes) mientras siguen abiertos los streams del nivel C:
+
+       C | sync p50 / p95 ms   pet/s | gevent p50 / p95 ms  pet/s
+       1 |    896 /   1118       4.3 |    1080 /   1512      3.6
+       8 | sin respuesta (4 de 4 clientes agotan los 30 s) | 1124 / 1878  3.3
+      32 | sin respuesta                                   | 1192 / 2260  2.7
+      64 | sin respuesta                                   | 1468 / 2272  2.6
+
+Escenario servicio (8 equipos x 5 rondas, misma base): 15.8 pet/s en los dos modos,
+sin errores, y p95 por endpoint dentro de la tolerancia del 25 % salvo POST
+/api/orden/<id>/productos (788 -> 1028 ms).
+
+Lectura: en esta máquina el plano es CPU (~200 ms por petición con una vCPU) y
+ningún modo le da más rendimiento; la latencia crece con la cola en los dos y las
+diferencias entre ellos a igual C son ruido. Lo que cambia es la concurrencia de
+conexiones largas: en sync cada stream SSE ocupa un worker, con 3 abiertos el resto
+no conecta y el servidor deja de responder; con gevent 64 streams conviven con el
+plano. Falta repetir con MySQL, donde además las esperas de PyMySQL ceden el worker
+(SQLite es una extensión en C y bloquea igual en los dos modos), y con el cliente en
+otra máquina.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from time import perf_counter, sleep
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_servicio_cena import Medidor, ServicioCena, comparar, imprimir, percentil, resumir
+
+ENDPOINT_PLANO = '/api/mesero/public/layout/realtime'
+ENDPOINT_SSE = '/api/local/mesas/eventos/stream'
+
+
+class RespuestaHTTP:
+    """Lo mínimo de la respuesta del cliente de pruebas de Flask que usa el guion."""
+
+    def __init__(self, status_code, headers, cuerpo):
+        self.status_code = status_code
+        self.headers = headers
+        self._cuerpo = cuerpo
+
+    def get_json(self):
+        return json.loads(self._cuerpo) if self._cuerpo else None
+
+
+class ClienteHTTP:
+    """Cliente con la interfaz `open` del cliente de pruebas, sobre urllib."""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def open(self, url, method='GET', headers=None, json=None):
+        datos = None
+        cabeceras = dict(headers or {})
+        if json is not None:
+            datos = _json_bytes(json)
+            cabeceras['Content-Type'] = 'application/json'
+        peticion = urllib.request.Request(self.base_url + url, data=datos, method=method, headers=cabeceras)
+        try:
+            with urllib.request.urlopen(peticion, timeout=self.timeout) as respuesta:
+                return RespuestaHTTP(respuesta.status, respuesta.headers, respuesta.read())
+        except urllib.error.HTTPError as e:
+            return RespuestaHTTP(e.code, e.headers, e.read())
+
+
+def _json_bytes(valor):
+    return json.dumps(valor).encode('utf-8')
+
+
+def cargar_datos(uri, semilla):
+    """Personal, mesas y carta existentes en la base del servidor."""
+    from sqlalchemy import create_engine
+    from generar_datos import GeneradorDatos
+
+    engine = create_engine(uri)
+    with engine.connect() as conexion:
+        generador = GeneradorDatos(conexion, semilla=semilla)
+        usuarios = generador.personal()
+        mesas = generador.local()
+        productos = [p for p in generador.carta() if p['disponible']]
+    engine.dispose()
+    if not mesas or not productos:
+        raise SystemExit('La base no tiene mesas o productos: sembrar antes con generar_datos.py')
+    return usuarios, mesas, productos
+
+
+def cabeceras_login(cliente, contrasena):
+    """Inicia sesión por /auth/login, como el frontend."""
+    cache = {}
+    lock = threading.Lock()
+
+    def cabeceras(usuario):
+        with lock:
+            if usuario['usuario'] not in cache:
+                respuesta = cliente.open('/auth/login', 'POST', json={'identifier': usuario['usuario'], 'password': contrasena})
+                if respuesta.status_code != 200:
+                    raise SystemExit(f"Login fallido para {usuario['usuario']}: {respuesta.status_code}")
+                cache[usuario['usuario']] = {'Authorization': f"Bearer {respuesta.get_json()['access_token']}"}
+            return cache[usuario['usuario']]
+    return cabeceras
+
+
+# --- Escenario tiempo real: plano en vivo y SSE por nivel de concurrencia ---
+
+def _resumen_tiempos(tiempos, errores, duracion):
+    return {
+        'peticiones': len(tiempos),
+        'errores': errores,
+        'p50_ms': round(percentil(tiempos, 50) * 1000, 1),
+        'p95_ms': round(percentil(tiempos, 95) * 1000, 1),
+        'pet_s': round(len(tiempos) / duracion, 1)
+    }
+
+
+def carga_plano(url, concurrencia, duracion, timeout):
+    """`concurrencia` hilos piden el plano en tiempo real en bucle durante `duracion` segundos."""
+    tiempos, errores = [], [0]
+    lock = threading.Lock()
+    fin = perf_counter() + duracion
+
+    def trabajar():
+        cliente = ClienteHTTP(url, timeout=timeout)
+        while perf_counter() < fin:
+            inicio = perf_counter()
+            try:
+                correcta = cliente.open(ENDPOINT_PLANO).status_code == 200
+            except OSError:  # incluye los timeouts
+                correcta = False
+            tiempo = perf_counter() - inicio
+            with lock:
+                if correcta:
+                    tiempos.append(tiempo)
+                else:
+                    errores[0] += 1
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(concurrencia)]
+    inicio = perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return _resumen_tiempos(tiempos, errores[0], perf_counter() - inicio)
+
+
+def abrir_streams(url, cantidad, cabeceras, timeout):
+    """
+    Abre `cantidad` streams SSE a la vez y mide el tiempo hasta su primera línea (un
+    evento o el keep-alive). Devuelve (conexiones abiertas, resumen); un stream que no
+    responde en `timeout` segundos cuenta como error.
+    """
+    partes = urllib.parse.urlsplit(url)
+    abiertas, tiempos, errores = [], [], [0]
+    lock = threading.Lock()
+
+    def abrir():
+        conexion = http.client.HTTPConnection(partes.hostname, partes.port, timeout=timeout)
+        inicio = perf_counter()
+        try:
+            conexion.request('GET', ENDPOINT_SSE, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            if respuesta.status != 200 or not respuesta.readline():
+                raise http.client.HTTPException(f'HTTP {respuesta.status}')
+            tiempo = perf_counter() - inicio
+            with lock:
+                # La respuesta también: al recolectarla se cierra el socket y el stream
+                abiertas.append((conexion, respuesta))
+                tiempos.append(tiempo)
+        except (OSError, http.client.HTTPException):
+            conexion.close()
+            with lock:
+                errores[0] += 1
+
+    hilos = [threading.Thread(target=abrir) for _ in range(cantidad)]
+    inicio = perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    resumen = _resumen_tiempos(tiempos, errores[0], perf_counter() - inicio)
+    del resumen['pet_s']
+    return abiertas, resumen
+
+
+def escenario_tiempo_real(args):
+    """
+    Por cada nivel de concurrencia C, con el servidor en reposo al empezar cada fase:
+      1. sse: C clientes abren el stream de eventos de mesas a la vez (tiempo hasta
+         la primera línea);
+      2. plano_con_streams: con esos streams abiertos, --concurrencia-plano clientes
+         piden el plano (cuánto sigue atendiendo el servidor mientras tiene streams);
+      3. plano: cerrados los streams, C clientes piden el plano en tiempo real en bucle.
+    """
+    cabeceras = cabeceras_login(ClienteHTTP(args.url), args.contrasena)({'usuario': args.usuario})
+    niveles = []
+    for concurrencia in args.concurrencias:
+        nivel = {'concurrencia': concurrencia}
+        abiertas, nivel['sse'] = abrir_streams(args.url, concurrencia, cabeceras, args.timeout)
+        nivel['plano_con_streams'] = carga_plano(args.url, args.concurrencia_plano, args.duracion, args.timeout)
+        for conexion, respuesta in abiertas:
+            respuesta.close()
+            conexion.close()
+        # Un worker sync suelta el stream al fallar su siguiente keep-alive
+        sleep(args.pausa)
+        carga_plano(args.url, concurrencia, args.calentamiento, args.timeout)
+        nivel['plano'] = carga_plano(args.url, concurrencia, args.duracion, args.timeout)
+        niveles.append(nivel)
+        # Peticiones abandonadas por timeout que el servidor aún tenga en cola
+        sleep(args.pausa)
+    return niveles
+
+
+def imprimir_tiempo_real(niveles):
+    cabecera = (f"{'C':>4} | {'plano p50':>9} {'p95':>8} {'pet/s':>7} {'err':>5} | {'sse ok':>7} {'1ª línea p50':>12} "
+                f"{'p95':>8} | {'plano+sse p50':>13} {'p95':>8} {'pet/s':>7} {'err':>5}")
+    print(cabecera)
+    print('-' * len(cabecera))
+    for n in niveles:
+        plano, sse, mixto = n['plano'], n['sse'], n['plano_con_streams']
+        print(f"{n['concurrencia']:>4} | {plano['p50_ms']:>9.1f} {plano['p95_ms']:>8.1f} {plano['pet_s']:>7.1f} "
+              f"{plano['errores']:>5} | {sse['peticiones']:>3}/{n['concurrencia']:<3} {sse['p50_ms']:>12.1f} "
+              f"{sse['p95_ms']:>8.1f} | {mixto['p50_ms']:>13.1f} {mixto['p95_ms']:>8.1f} {mixto['pet_s']:>7.1f} "
+              f"{mixto['errores']:>5}")
+
+
+# --- Escenario servicio de cena ---
+
+def escenario_servicio(args):
+    """Equipos concurrentes con el guion de bench_servicio_cena.py, por HTTP."""
+    usuarios, mesas, productos = cargar_datos(args.uri, args.semilla)
+    cabeceras = cabeceras_login(ClienteHTTP(args.url), args.contrasena)
+    meseros = [u for u in usuarios if u['rol'] == 'mozo']
+    personal = [u for u in usuarios if u['rol'] != 'mozo']
+
+    equipos = []
+    for i in range(args.equipos):
+        medidor = Medidor(ClienteHTTP(args.url))
+        semilla = {
+            # Cada equipo atiende sus propias mesas con uno de los meseros
+            'usuarios': [meseros[i % len(meseros)]] + personal,
+            'mesas': mesas[i::args.equipos],
+            'productos': productos
+        }
+        equipos.append(ServicioCena(medidor, semilla, args, random.Random(args.semilla + i), cabeceras=cabeceras))
+
+    errores = []
+
+    def ejecutar(equipo, rondas, medir):
+        try:
+            equipo.medidor.activo = medir
+            equipo.rondas(rondas)
+        except Exception as e:  # un equipo caído no debe colgar la medición
+            errores.append(repr(e))
+
+    for rondas, medir in ((args.calentamiento, False), (args.rondas, True)):
+        hilos = [threading.Thread(target=ejecutar, args=(e, rondas, medir)) for e in equipos]
+        inicio = perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = perf_counter() - inicio
+
+    muestras = {}
+    for equipo in equipos:
+        for endpoint, datos in equipo.medidor.muestras.items():
+            total = muestras.setdefault(endpoint, {'tiempos': [], 'sql': [], 'errores': 0, 'n_mas_uno': 0})
+            for clave in ('tiempos', 'sql'):
+                total[clave].extend(datos[clave])
+            total['errores'] += datos['errores']
+            total['n_mas_uno'] += datos['n_mas_uno']
+
+    resultado = resumir(muestras)
+    peticiones = sum(r['peticiones'] for r in resultado.values())
+    print(f'{args.equipos} equipos x {args.rondas} rondas: {peticiones} peticiones en {duracion:.1f}s '
+          f'({peticiones / duracion:.0f} pet/s)\n')
+    imprimir(resultado)
+    for error in errores:
+        print(f'Equipo con error: {error}')
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': vars(args), 'rendimiento_pet_s': peticiones / duracion, 'endpoints': resultado},
+                      f, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        print(f"\nRendimiento: {base['rendimiento_pet_s']:.0f} -> {peticiones / duracion:.0f} pet/s")
+        for linea in comparar(resultado, base['endpoints'], args.tolerancia):
+            print(f'  {linea}')
+
+
+def _lista_enteros(texto):
+    return [int(valor) for valor in texto.split(',') if valor.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', required=True, help='Servidor bajo prueba, p. ej. http://localhost:5000')
+    parser.add_argument('--escenario', choices=('servicio', 'tiempo_real'), default='servicio')
+    parser.add_argument('--uri', help='Base de datos del servidor (solo lectura; escenario servicio)')
+    parser.add_argument('--contrasena', default='12345')
+    parser.add_argument('--equipos', type=int, default=8, help='Hilos concurrentes, cada uno con su propio guion')
+    parser.add_argument('--rondas', type=int, default=20)
+    parser.add_argument('--calentamiento', type=int, default=2,
+                        help='Rondas (servicio) o segundos por nivel (tiempo_real) sin medir')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--prob-nueva-orden', type=float, default=0.35)
+    parser.add_argument('--avances-cocina', type=int, default=10)
+    parser.add_argument('--clientes-qr', type=int, default=3)
+    parser.add_argument('--usuario', default='admin', help='Usuario del stream SSE (tiempo_real)')
+    parser.add_argument('--concurrencias', type=_lista_enteros, default=[1, 8, 32, 64])
+    parser.add_argument('--concurrencia-plano', type=int, default=4,
+                        help='Clientes del plano mientras los streams siguen abiertos (tiempo_real)')
+    parser.add_argument('--duracion', type=float, default=10, help='Segundos medidos por nivel (tiempo_real)')
+    parser.add_argument('--timeout', type=float, default=5)
+    parser.add_argument('--pausa', type=float, default=3, help='Segundos entre niveles (tiempo_real)')
+    parser.add_argument('--guardar')
+    parser.add_argument('--comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.25)
+    args = parser.parse_args()
+
+    if args.escenario == 'servicio':
+        if not args.uri:
+            parser.error('--uri es obligatorio en el escenario servicio')
+        escenario_servicio(args)
+        return
+
+    niveles = escenario_tiempo_real(args)
+    imprimir_tiempo_real(niveles)
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': vars(args), 'niveles': niveles}, f, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        print(f"\nReferencia ({args.comparar}):")
+        imprimir_tiempo_real(base['niveles'])
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from utils.db_pool import opciones_engine
 
 load_dotenv()
 
@@ -19,24 +20,123 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Alertas de inventario (stock bajo y vencimiento de ingredientes)
+    ALERTAS_DIAS_VENCIMIENTO = int(os.environ.get('ALERTAS_DIAS_VENCIMIENTO', 7))
+    ALERTAS_PUSH_HABILITADO = os.environ.get('ALERTAS_PUSH_HABILITADO', 'false').lower() == 'true'
+    ALERTAS_PUSH_INTERVALO = int(os.environ.get('ALERTAS_PUSH_INTERVALO', 30))  # segundos
+
+    # Caché de respuestas JSON precodificadas (menú público), en segundos; 0 la desactiva
+    MENU_PUBLICO_CACHE_TTL = float(os.environ.get('MENU_PUBLICO_CACHE_TTL', 5))
+    # Mapa de categorías que usa la serialización de productos, en segundos
+    CATEGORIAS_CACHE_TTL = float(os.environ.get('CATEGORIAS_CACHE_TTL', 30))
+    # Plano del local (pisos/zonas/mesas) y mapa de estados de mesas que se le superpone, en segundos
+    PLANO_CACHE_TTL = float(os.environ.get('PLANO_CACHE_TTL', 30))
+    PLANO_ESTADOS_TTL = float(os.environ.get('PLANO_ESTADOS_TTL', 1))
+
+    # Máquina de estados de mesas: reintentos ante cambios concurrentes y flujo de eventos
+    MESA_TRANSICION_REINTENTOS = int(os.environ.get('MESA_TRANSICION_REINTENTOS', 3))
+    MESA_EVENTOS_STREAM_HABILITADO = os.environ.get('MESA_EVENTOS_STREAM_HABILITADO', 'false').lower() == 'true'
+    MESA_EVENTOS_INTERVALO = float(os.environ.get('MESA_EVENTOS_INTERVALO', 1))
+    # Segundos que un evento se sigue releyendo: debe superar la transacción más larga que cambia una mesa
+    MESA_EVENTOS_MARGEN = float(os.environ.get('MESA_EVENTOS_MARGEN', 10))
+    MESA_EVENTOS_RETENCION_HORAS = float(os.environ.get('MESA_EVENTOS_RETENCION_HORAS', 24))
+    MESA_EVENTOS_PURGA_INTERVALO = float(os.environ.get('MESA_EVENTOS_PURGA_INTERVALO', 3600))  # 0 la desactiva
+
+    # Histogramas de tiempos de cocina (ver services/analitica_cocina_service.py)
+    COCINA_TIEMPOS_RETENCION_DIAS = float(os.environ.get('COCINA_TIEMPOS_RETENCION_DIAS', 90))
+    COCINA_TIEMPOS_PURGA_INTERVALO = float(os.environ.get('COCINA_TIEMPOS_PURGA_INTERVALO', 86400))  # 0 la desactiva
+    # Estimador de tiempos de preparación (ver services/estimador_cocina_service.py)
+    COCINA_ESTIMADOR_INTERVALO = float(os.environ.get('COCINA_ESTIMADOR_INTERVALO', 300))  # 0: se entrena al usarlo
+    COCINA_ESTIMADOR_VENTANA_DIAS = float(os.environ.get('COCINA_ESTIMADOR_VENTANA_DIAS', 14))
+    COCINA_ESTIMADOR_PESO_PREVIO = float(os.environ.get('COCINA_ESTIMADOR_PESO_PREVIO', 5))  # mediciones que vale el tiempo del menú
+    COCINA_TIEMPO_PREPARACION_DEFECTO = float(os.environ.get('COCINA_TIEMPO_PREPARACION_DEFECTO', 10))  # minutos
+    COCINA_CAPACIDAD_DEFECTO = int(os.environ.get('COCINA_CAPACIDAD_DEFECTO', 2))  # ítems simultáneos sin historial
+
+    # Token para endpoints internos de monitoreo (/api/interno/*); sin token solo admin por JWT
+    INTERNAL_METRICS_TOKEN = os.environ.get('INTERNAL_METRICS_TOKEN')
+
+    # Réplica de lectura (bind 'replica'): retraso máximo tolerado y frecuencia de chequeo, en segundos
+    REPLICA_RETRASO_MAXIMO = float(os.environ.get('REPLICA_RETRASO_MAXIMO', 5))
+    REPLICA_CHEQUEO_INTERVALO = float(os.environ.get('REPLICA_CHEQUEO_INTERVALO', 10))
+
+    # Instrumentación SQL por petición: 'cabeceras', 'reporte' u 'off' (ver utils/sql_instrumentacion.py)
+    SQL_INSTRUMENTACION = os.environ.get('SQL_INSTRUMENTACION', 'off')
+    SQL_MUESTREO = float(os.environ.get('SQL_MUESTREO', 1.0))  # fracción de peticiones instrumentadas
+    SQL_N1_UMBRAL = int(os.environ.get('SQL_N1_UMBRAL', 5))  # repeticiones de una SELECT para marcar N+1
+    SQL_MAX_LENTAS = 5
+
+    # Métricas Prometheus en /metrics; los indicadores del negocio se recalculan cada N segundos
+    METRICAS_HABILITADAS = os.environ.get('METRICAS_HABILITADAS', 'true').lower() == 'true'
+    METRICAS_DOMINIO_INTERVALO = float(os.environ.get('METRICAS_DOMINIO_INTERVALO', 15))
+
+    # Logging estructurado (ver utils/logs.py): nivel, formato ('json' o 'texto') y archivo opcional
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMATO = os.environ.get('LOG_FORMATO', 'json')
+    LOG_ARCHIVO = os.environ.get('LOG_ARCHIVO')
+    LOG_COLA_CAPACIDAD = int(os.environ.get('LOG_COLA_CAPACIDAD', 10000))
+
+    # Permisos temporales: caché de permisos efectivos por proceso y expiración periódica, en segundos
+    PERMISOS_CACHE_TTL = float(os.environ.get('PERMISOS_CACHE_TTL', 30))
+    PERMISOS_LIMPIEZA_INTERVALO = float(os.environ.get('PERMISOS_LIMPIEZA_INTERVALO', 60))  # 0 la desactiva
+
+    # Sesiones QR y wishlist en memoria (ver services/qr_sesion_service.py), tiempos en segundos
+    QR_INDICE_TTL = float(os.environ.get('QR_INDICE_TTL', 60))
+    QR_SESIONES_MAX = int(os.environ.get('QR_SESIONES_MAX', 5000))
+    QR_SESION_TTL = float(os.environ.get('QR_SESION_TTL', 4 * 3600))
+    QR_SESION_REFRESCO = float(os.environ.get('QR_SESION_REFRESCO', 10))
+    QR_WISHLIST_MAX_ITEMS = int(os.environ.get('QR_WISHLIST_MAX_ITEMS', 50))
+    QR_WISHLIST_VOLCADO_INTERVALO = float(os.environ.get('QR_WISHLIST_VOLCADO_INTERVALO', 5))  # 0 lo desactiva
+
+    # Índice de búsqueda de productos en memoria (ver services/busqueda_service.py), en segundos
+    INDICE_BUSQUEDA_VERIFICACION = float(os.environ.get('INDICE_BUSQUEDA_VERIFICACION', 5))
+    INDICE_BUSQUEDA_RECONSTRUCCION = float(os.environ.get('INDICE_BUSQUEDA_RECONSTRUCCION', 600))
+
+    # Compresión gzip/brotli y ETag/304 (ver utils/compresion.py)
+    COMPRESION_HABILITADA = os.environ.get('COMPRESION_HABILITADA', 'true').lower() == 'true'
+    COMPRESION_MINIMO_BYTES = int(os.environ.get('COMPRESION_MINIMO_BYTES', 1024))
+    COMPRESION_NIVEL_GZIP = int(os.environ.get('COMPRESION_NIVEL_GZIP', 6))
+    COMPRESION_NIVEL_BROTLI = int(os.environ.get('COMPRESION_NIVEL_BROTLI', 5))
+    HTTP_ETAG_HABILITADO = os.environ.get('HTTP_ETAG_HABILITADO', 'true').lower() == 'true'
+
+    # Rutas de prueba y diagnóstico (routes/prueba_routes.py); desactivadas salvo en desarrollo
+    RUTAS_PRUEBA_HABILITADAS = os.environ.get('RUTAS_PRUEBA_HABILITADAS', 'false').lower() == 'true'
+
 class DevelopmentConfig(Config):
     DEBUG = True
+    RUTAS_PRUEBA_HABILITADAS = os.environ.get('RUTAS_PRUEBA_HABILITADAS', 'true').lower() == 'true'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URI', 'sqlite:///ceviche_db_dev.sqlite')
     SQLALCHEMY_ECHO = False
+    SQL_INSTRUMENTACION = os.environ.get('SQL_INSTRUMENTACION', 'cabeceras')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG')
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
         'pool_recycle': 3600
     }
+    # Réplica local opcional, p. ej. sqlite:///ceviche_db_dev_replica.sqlite (sincronizar con `flask replica-sync`)
+    SQLALCHEMY_BINDS = {'replica': os.environ['DEV_REPLICA_URI']} if os.environ.get('DEV_REPLICA_URI') else {}
 
 class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('PROD_DATABASE_URI')
+    # Pool dimensionado por entorno (DB_POOL_*, GUNICORN_WORKER_CLASS); ver utils/db_pool.py
+    SQLALCHEMY_ENGINE_OPTIONS = opciones_engine(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_BINDS = {
+        'replica': {'url': os.environ['REPLICA_DATABASE_URI'], **opciones_engine(os.environ['REPLICA_DATABASE_URI'])}
+    } if os.environ.get('REPLICA_DATABASE_URI') else {}
+    SQL_INSTRUMENTACION = os.environ.get('SQL_INSTRUMENTACION', 'reporte')
+    SQL_MUESTREO = float(os.environ.get('SQL_MUESTREO', 0.05))
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URI', 'sqlite:///:memory:')
     SECRET_KEY = 'test-secret-key'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING')
     JWT_SECRET_KEY = 'test-jwt-secret-key'
+    PERMISOS_LIMPIEZA_INTERVALO = float(os.environ.get('PERMISOS_LIMPIEZA_INTERVALO', 0))
+    QR_WISHLIST_VOLCADO_INTERVALO = float(os.environ.get('QR_WISHLIST_VOLCADO_INTERVALO', 0))
+    MESA_EVENTOS_PURGA_INTERVALO = float(os.environ.get('MESA_EVENTOS_PURGA_INTERVALO', 0))
+    COCINA_TIEMPOS_PURGA_INTERVALO = float(os.environ.get('COCINA_TIEMPOS_PURGA_INTERVALO', 0))
+    COCINA_ESTIMADOR_INTERVALO = float(os.environ.get('COCINA_ESTIMADOR_INTERVALO', 0))
 
 config_by_name = {
     'development': DevelopmentConfig,
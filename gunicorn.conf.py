@@ -0,0 +1,101 @@
+"""
+Configuración de gunicorn (gunicorn -c gunicorn.conf.py app:app).
+
+Los valores se toman del entorno para poder ajustar el despliegue sin reconstruir
+la imagen. El pool de conexiones se dimensiona con las mismas variables
+(ver utils/db_pool.py).
+
+Con GUNICORN_PRELOAD=true la aplicación se construye una sola vez en el maestro y
+los workers la heredan por fork, compartiendo su memoria copy-on-write. Los
+recursos ligados al proceso (conexiones, hilo de logs, métricas) se reinician en
+cada worker.
+
+Modo gevent (GUNICORN_WORKER_CLASS=gevent): cada worker atiende hasta
+GUNICORN_WORKER_CONNECTIONS peticiones a la vez en greenlets, y una consulta o
+subida lenta ya no bloquea el worker. PyMySQL es Python puro: con la librería
+estándar parcheada cede el control mientras espera a MySQL. El pool de
+SQLAlchemy limita cuántas de esas peticiones usan la base a la vez. Medido en
+benchmarks/bench_workers.py: con una vCPU y SQLite no da más rendimiento en
+peticiones cortas, pero sostiene los streams SSE sin dejar de atender el resto (en
+sync cada stream ocupa un worker). Sync sigue siendo el modo por defecto.
+"""
+import gc
+import os
+import sys
+
+if 'gevent' in os.environ.get('GUNICORN_WORKER_CLASS', 'sync').lower():
+    # Parchear antes de importar nada que use socket/threading/ssl (utils.db_pool ya
+    # importa SQLAlchemy): con preload_app la aplicación se carga en el maestro antes de
+    # que el worker de gevent aplique su propio parche
+    from gevent import monkey
+    monkey.patch_all()
+
+from utils.db_pool import tipo_worker
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+
+def on_starting(server):
+    # Métricas multiproceso: limpiar los archivos de una ejecución anterior
+    directorio = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+        for nombre in os.listdir(directorio):
+            if nombre.endswith('.db'):
+                os.remove(os.path.join(directorio, nombre))
+
+
+def _app_cargada():
+    # vars() y no hasattr(): app.app es perezosa y hasattr la construiría
+    modulo = sys.modules.get('app')
+    return vars(modulo).get('app') if modulo is not None else None
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        # Mover los objetos de la aplicación a la generación permanente del GC para que
+        # las recolecciones en los workers no toquen (y copien) esas páginas
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    if tipo_worker() == 'gevent':
+        from gevent import monkey
+        if not monkey.is_module_patched('socket'):
+            # Sin parche PyMySQL bloquea el worker entero en cada consulta
+            worker.log.warning('Worker gevent sin monkey-patching de socket: las consultas a MySQL serán bloqueantes')
+
+
+def post_fork(server, worker):
+    # Con preload_app el engine se creó en el maestro: descartar sus conexiones en el hijo
+    app = _app_cargada()
+    if app is not None:
+        from models import db
+        from utils.db_pool import reiniciar_tras_fork
+        reiniciar_tras_fork(app, db)
+
+
+def worker_exit(server, worker):
+    app = _app_cargada()
+    if app is not None:
+        # Wishlists QR aún en memoria de este worker
+        from services.qr_sesion_service import QRSesionService
+        try:
+            with app.app_context():
+                QRSesionService.volcar_wishlists()
+        except Exception:
+            worker.log.exception('No se pudieron volcar las wishlists al cerrar el worker')
+        from models import db
+        from utils.db_pool import cerrar_pool
+        cerrar_pool(app, db)
+
+
+def child_exit(server, worker):
+    from utils.metricas import marcar_worker_terminado
+    marcar_worker_terminado(worker.pid)
@@ -1,15 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
+from utils.replica import SesionEnrutada
 
 # Inicializa la instancia de la base de datos.
-db = SQLAlchemy()
+# La sesión enruta las lecturas marcadas a la réplica (ver utils/replica.py).
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 
 # Importar todos los modelos para que SQLAlchemy los reconozca
 # al momento de crear las tablas (db.create_all()).
 from .user import Usuario
 from .core import SesionUsuario, PermisoTemporal, Auditoria
-from .local import Piso, Zona, Mesa
+from .local import Piso, Zona, Mesa, EventoMesa
 from .menu import Categoria, Producto, Ingrediente, ProductoIngrediente
 # Se importa Reserva junto con las otras clases de order.py
-from .order import Orden, ItemOrden, Pago, Wishlist, Resena
+from .order import Orden, ItemOrden, Pago, Wishlist, Resena, ResumenResena, TiempoCocina
 from .reserva import Reserva
 from .bloqueo import Bloqueo 
@@ -27,7 +27,10 @@ class Piso(db.Model):
     def __repr__(self):
         return f'<Piso {self.nombre}>'
     
-    def to_dict(self):
+    def to_dict(self, total_zonas=None):
+        # El plano del local (LocalService) pasa los conteos ya agregados; si no, COUNT sin cargar las zonas
+        if total_zonas is None:
+            total_zonas = db.session.query(db.func.count(Zona.id)).filter(Zona.piso_id == self.id).scalar()
         return {
             'id': self.id,
             'nombre': self.nombre,
@@ -36,7 +39,7 @@ class Piso(db.Model):
             'activo': self.activo,
             'creado_en': self.creado_en.isoformat() if self.creado_en else None,
             'actualizado_en': self.actualizado_en.isoformat() if self.actualizado_en else None,
-            'total_zonas': len(self.zonas) if self.zonas else 0
+            'total_zonas': total_zonas or 0
         }
 
 class Zona(db.Model):
@@ -73,7 +76,12 @@ class Zona(db.Model):
     def __repr__(self):
         return f'<Zona {self.nombre} en {self.piso.nombre if self.piso else "Sin piso"}>'
     
-    def to_dict(self):
+    def to_dict(self, total_mesas=None, mesas_ocupadas=None):
+        if total_mesas is None or mesas_ocupadas is None:
+            total_mesas, mesas_ocupadas = db.session.query(
+                db.func.count(Mesa.id),
+                db.func.sum(db.case((Mesa.estado == 'ocupada', 1), else_=0))
+            ).filter(Mesa.zona_id == self.id).one()
         return {
             'id': self.id,
             'nombre': self.nombre,
@@ -88,8 +96,8 @@ class Zona(db.Model):
             'icono': self.icono,
             'creado_en': self.creado_en.isoformat() if self.creado_en else None,
             'actualizado_en': self.actualizado_en.isoformat() if self.actualizado_en else None,
-            'total_mesas': len(self.mesas) if self.mesas else 0,
-            'mesas_ocupadas': len([m for m in self.mesas if m.estado == 'ocupada']) if self.mesas else 0
+            'total_mesas': total_mesas or 0,
+            'mesas_ocupadas': int(mesas_ocupadas or 0)
         }
 
 class Mesa(db.Model):
@@ -101,6 +109,9 @@ class Mesa(db.Model):
     capacidad = db.Column(db.Integer, default=4)  # Capacidad de comensales
     zona_id = db.Column(db.Integer, db.ForeignKey('zona.id'), nullable=False)
     estado = db.Column(db.Enum('disponible', 'ocupada', 'limpieza', 'reservada', 'fuera_servicio'), default='disponible')
+    # Se incrementa en cada cambio de estado (ver MesaEstadoService).
+    # En bases existentes se agrega a mano (ver Importante/ceviche_db.sql)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     qr_code = db.Column(db.String(255), unique=True)  # Código QR único
     posicion_x = db.Column(db.Float, default=0.0)  # Posición X en el mapa
     posicion_y = db.Column(db.Float, default=0.0)  # Posición Y en el mapa
@@ -128,7 +139,11 @@ class Mesa(db.Model):
     def __repr__(self):
         return f'<Mesa {self.numero} en {self.zona.nombre if self.zona else "Sin zona"}>'
     
-    def to_dict(self):
+    def to_dict(self, total_ordenes=None):
+        if total_ordenes is None:
+            # COUNT en vez de cargar el historial completo de órdenes de la mesa
+            from .order import Orden
+            total_ordenes = db.session.query(db.func.count(Orden.id)).filter(Orden.mesa_id == self.id).scalar()
         return {
             'id': self.id,
             'numero': self.numero,
@@ -136,6 +151,7 @@ class Mesa(db.Model):
             'zona_id': self.zona_id,
             'zona_nombre': self.zona.nombre if self.zona else None,
             'estado': self.estado,
+            'version': self.version,
             'qr_code': self.qr_code,
             'posicion_x': self.posicion_x,
             'posicion_y': self.posicion_y,
@@ -143,7 +159,7 @@ class Mesa(db.Model):
             'notas': self.notas,
             'creado_en': self.creado_en.isoformat() if self.creado_en else None,
             'actualizado_en': self.actualizado_en.isoformat() if self.actualizado_en else None,
-            'total_ordenes': len(self.ordenes) if self.ordenes else 0
+            'total_ordenes': total_ordenes or 0
         }
     
     def generar_qr_code(self):
@@ -151,4 +167,31 @@ class Mesa(db.Model):
         import uuid
         if not self.qr_code:
             self.qr_code = f"MESA_{self.id}_{uuid.uuid4().hex[:8].upper()}"
-        return self.qr_code
\ No newline at end of file
+        return self.qr_code
+
+class EventoMesa(db.Model):
+    """Cambio de estado de una mesa; flujo de eventos para cachés y clientes en tiempo real"""
+    __tablename__ = 'evento_mesa'
+
+    id = db.Column(db.Integer, primary_key=True)
+    mesa_id = db.Column(db.Integer, db.ForeignKey('mesa.id', ondelete='CASCADE'), nullable=False)
+    estado_anterior = db.Column(db.String(20))
+    estado_nuevo = db.Column(db.String(20), nullable=False)
+    version = db.Column(db.Integer, nullable=False)  # Versión de la mesa tras el cambio
+    motivo = db.Column(db.String(50))  # 'orden', 'pago', 'reserva', 'bloqueo', 'manual', ...
+    creado_en = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        Index('idx_evento_mesa_creado', 'creado_en'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mesa_id': self.mesa_id,
+            'estado_anterior': self.estado_anterior,
+            'estado_nuevo': self.estado_nuevo,
+            'version': self.version,
+            'motivo': self.motivo,
+            'creado_en': self.creado_en.isoformat() if self.creado_en else None
+        }
@@ -1,5 +1,6 @@
 from . import db
 from datetime import datetime
+from sqlalchemy import Index, Computed
 
 class TipoIngrediente(db.Model):
     __tablename__ = 'tipo_ingrediente'
@@ -34,7 +35,10 @@ class Categoria(db.Model):
     def __repr__(self):
         return f'<Categoria {self.id}: {self.nombre}>'
 
-    def to_dict(self):
+    def to_dict(self, cantidad_productos=None):
+        # Los listados pasan el conteo ya agregado (CategoriaService); si no, COUNT sin cargar los productos
+        if cantidad_productos is None:
+            cantidad_productos = db.session.query(db.func.count(Producto.id)).filter(Producto.categoria_id == self.id).scalar()
         return {
             'id': self.id,
             'nombre': self.nombre,
@@ -42,7 +46,7 @@ class Categoria(db.Model):
             'icono': self.icono,
             'color': self.color,
             'activo': self.activo,
-            'cantidad_productos': len(self.productos) if self.productos else 0,
+            'cantidad_productos': cantidad_productos or 0,
             'creado_en': self.creado_en.isoformat() if hasattr(self, 'creado_en') and self.creado_en else None,
             'actualizado_en': self.actualizado_en.isoformat() if hasattr(self, 'actualizado_en') and self.actualizado_en else None
         }
@@ -98,6 +102,18 @@ class Producto(db.Model):
     resenas = db.relationship('Resena', back_populates='producto', cascade="all, delete-orphan")
     imagenes = db.relationship('ProductoImagen', back_populates='producto', cascade="all, delete-orphan", order_by="ProductoImagen.orden")
 
+    def _categoria_dict(self):
+        """Categoría desde el mapa en caché de CategoriaService (sin cargar la relación)"""
+        if self.categoria_id is None:
+            return None
+        from services.categoria_service import CategoriaService
+        categoria = CategoriaService.mapa_categorias().get(self.categoria_id)
+        if categoria is None and self.categoria is not None:
+            # Categoría creada después de cachear el mapa
+            return self.categoria.to_dict()
+        # Copia: el mapa se comparte entre todas las serializaciones del proceso
+        return dict(categoria) if categoria is not None else None
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -105,7 +121,7 @@ class Producto(db.Model):
             'descripcion': self.descripcion,
             'precio': float(self.precio) if self.precio else 0,
             'categoria_id': self.categoria_id,
-            'categoria': self.categoria.to_dict() if self.categoria else None,
+            'categoria': self._categoria_dict(),
             'tipo_estacion': self.tipo_estacion,
             'tiempo_preparacion': self.tiempo_preparacion,
             'nivel_picante': self.nivel_picante,
@@ -137,6 +153,9 @@ class Ingrediente(db.Model):
     proveedor = db.Column(db.String(100))
     codigo_barras = db.Column(db.String(50), unique=True)
     ubicacion_almacen = db.Column(db.String(50))
+    # Columna derivada stock/stock_minimo (NULL si no hay mínimo) para alertas indexadas.
+    # En bases existentes se agrega a mano (ver Importante/ceviche_db.sql)
+    ratio_stock = db.Column(db.Numeric(12, 4), Computed('stock * 1.0 / NULLIF(stock_minimo, 0)', persisted=True))
 
     creado_en = db.Column(db.DateTime, server_default=db.func.now())
     actualizado_en = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -145,6 +164,13 @@ class Ingrediente(db.Model):
     tipo = db.relationship('TipoIngrediente', back_populates='ingredientes')
     productos_asociados = db.relationship('ProductoIngrediente', back_populates='ingrediente')
 
+    # Índices
+    __table_args__ = (
+        Index('idx_ingrediente_alerta_stock', 'activo', 'ratio_stock'),
+        Index('idx_ingrediente_alerta_vencimiento', 'activo', 'fecha_vencimiento'),
+        Index('idx_ingrediente_proveedor', 'proveedor'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -161,6 +187,7 @@ class Ingrediente(db.Model):
             'proveedor': self.proveedor,
             'codigo_barras': self.codigo_barras,
             'ubicacion_almacen': self.ubicacion_almacen,
+            'ratio_stock': float(self.ratio_stock) if self.ratio_stock is not None else None,
             'creado_en': self.creado_en.isoformat() if self.creado_en else None,
             'actualizado_en': self.actualizado_en.isoformat() if self.actualizado_en else None
         }
@@ -152,3 +152,43 @@ class Resena(db.Model):
             'creado_en': self.creado_en.isoformat() if self.creado_en else None
         }
 
+
+class ResumenResena(db.Model):
+    """
+    Resumen de las reseñas aprobadas de un producto (lo mantiene ResenaService al moderar).
+    En bases existentes: crear la tabla y recalcular una vez (ver Importante/ceviche_db.sql).
+    """
+    __tablename__ = 'resumen_resena'
+
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    suma = db.Column(db.Integer, nullable=False, default=0)
+    estrellas_1 = db.Column(db.Integer, nullable=False, default=0)
+    estrellas_2 = db.Column(db.Integer, nullable=False, default=0)
+    estrellas_3 = db.Column(db.Integer, nullable=False, default=0)
+    estrellas_4 = db.Column(db.Integer, nullable=False, default=0)
+    estrellas_5 = db.Column(db.Integer, nullable=False, default=0)
+    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'producto_id': self.producto_id,
+            'cantidad': self.cantidad,
+            'promedio': round(self.suma / self.cantidad, 2) if self.cantidad else None,
+            'histograma': {str(estrellas): getattr(self, f'estrellas_{estrellas}') for estrellas in range(1, 6)}
+        }
+
+class TiempoCocina(db.Model):
+    """
+    Histograma de duraciones de las fases de los ítems (cola, preparación, pase) por hora,
+    estación y producto. Lo mantiene AnaliticaCocinaService al cambiar el estado de un ítem.
+    """
+    __tablename__ = 'tiempo_cocina'
+
+    hora = db.Column(db.DateTime, primary_key=True)  # inicio de la hora en que terminó la fase
+    estacion = db.Column(db.String(20), primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id', ondelete='CASCADE'), primary_key=True)
+    fase = db.Column(db.String(20), primary_key=True)
+    cubeta = db.Column(db.Integer, primary_key=True)  # índice en LIMITES_CUBETAS
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    suma_segundos = db.Column(db.Float, nullable=False, default=0)
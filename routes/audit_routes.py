@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from services.audit_service import AuditService
 from routes.admin_routes import admin_required
+from utils.replica import lectura_replica
 from datetime import datetime
 import logging
 
@@ -55,6 +56,7 @@ def get_audit_logs():
 
 @audit_bp.route('/statistics', methods=['GET'])
 @admin_required
+@lectura_replica
 def get_audit_statistics():
     """Obtener estadísticas de auditoría"""
     try:
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from services.audit_service import AuditService
+from utils.replica import lectura_replica
 from datetime import datetime
 import logging
 
@@ -52,6 +53,7 @@ def get_audit_logs():
         return jsonify({"error": str(e)}), 500
 
 @audit_bp_simple.route('/statistics', methods=['GET'])
+@lectura_replica
 def get_audit_statistics():
     """Obtener estadísticas de auditoría (sin autenticación para prueba)"""
     try:
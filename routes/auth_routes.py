@@ -5,6 +5,9 @@ from services.auth_service import AuthService
 from models import db
 from models.core import SesionUsuario
 from models.user import Usuario
+import logging
+
+logger = logging.getLogger(__name__)
 
 auth_bp = Blueprint('auth_bp', __name__)
 
@@ -43,24 +46,6 @@ def get_user_profile():
     except Exception as e:
         return jsonify({"error": f"Error al obtener perfil: {str(e)}"}), 500
 
-@auth_bp.route('/test-jwt', methods=['GET'])
-@jwt_required()
-def test_jwt():
-    """Endpoint de prueba para verificar JWT"""
-    try:
-        current_user_id = get_jwt_identity()
-        print(f"🔍 Test JWT - Identity: {current_user_id}")
-
-        return jsonify({
-            "success": True,
-            "message": "JWT funcionando correctamente",
-            "identity": str(current_user_id),
-            "type": str(type(current_user_id))
-        })
-    except Exception as e:
-        print(f"❌ Error en test JWT: {str(e)}")
-        return jsonify({"error": f"Error JWT: {str(e)}"}), 500
-
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Endpoint para el inicio de sesión de usuarios."""
@@ -111,8 +96,7 @@ def login():
 
     except Exception as e:
         db.session.rollback()
-        # En un entorno de producción, aquí se registraría el error en un log
-        print(f"Error al crear la sesión: {e}")
+        logger.exception("Error al crear la sesión")
         return jsonify({"error": "No se pudo procesar el inicio de sesión. Inténtelo de nuevo."}), 500
 
 @auth_bp.route('/profile', methods=['PUT'])
@@ -121,7 +105,7 @@ def update_user_profile():
     """Actualizar perfil del usuario actual"""
     try:
         current_user_id = get_jwt_identity()
-        print(f"🔍 Actualizando perfil del usuario: {current_user_id}")
+        logger.debug("Actualizando perfil del usuario %s", current_user_id)
 
         # Convertir a int si es string
         if isinstance(current_user_id, str):
@@ -147,9 +131,7 @@ def update_user_profile():
         }), 200
 
     except Exception as e:
-        print(f"❌ Error actualizando perfil: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error actualizando perfil")
         return jsonify({"error": f"Error actualizando perfil: {str(e)}"}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
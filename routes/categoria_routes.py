@@ -4,9 +4,17 @@ from functools import wraps
 from models.user import Usuario
 from services.categoria_service import CategoriaService
 from services.error_handler import ErrorHandler
+from utils.replica import lectura_replica
 
 categoria_bp = Blueprint('categoria_bp', __name__)
 
+@categoria_bp.after_app_request
+def _invalidar_mapa_categorias(response):
+    # Crear, mover o borrar productos cambia cantidad_productos
+    if request.method in ('POST', 'PUT', 'DELETE') and request.path.startswith('/api/producto'):
+        CategoriaService.invalidar_mapa()
+    return response
+
 # --- Decorador para verificar rol de Admin ---
 def admin_required(fn):
     @wraps(fn)
@@ -36,6 +44,7 @@ def admin_or_mesero_required(fn):
 # --- Rutas Públicas (para desarrollo) ---
 
 @categoria_bp.route('/public', methods=['GET'])
+@lectura_replica
 def get_categorias_public():
     """Obtener todas las categorías (ruta pública)"""
     try:
@@ -52,6 +61,7 @@ def get_categorias_public():
         }), 500
 
 @categoria_bp.route('/public/<int:categoria_id>', methods=['GET'])
+@lectura_replica
 def get_categoria_public(categoria_id):
     """Obtener una categoría por ID (ruta pública)"""
     try:
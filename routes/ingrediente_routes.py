@@ -1,5 +1,14 @@
-from flask import Blueprint, request, jsonify
+import csv
+import io
+import json
+import time
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import get_jwt_identity
+from models import db
 from services.ingrediente_service import IngredienteService
+from services.alerta_ingrediente_service import AlertaIngredienteService
+from services.importacion_ingrediente_service import ImportacionIngredienteService
+from services.recepcion_ingrediente_service import RecepcionIngredienteService
 from services.error_handler import ErrorHandler
 from routes.admin_routes import admin_required
 from routes.mesero_routes import mesero_or_admin_required
@@ -11,6 +20,15 @@ ingrediente_bp = Blueprint('ingrediente_bp', __name__)
 def get_ingredientes():
     """Obtener todos los ingredientes"""
     try:
+        if request.args.get('formato') == 'plano':
+            resultado = IngredienteService.get_ingredientes(plano=True)
+            response = ErrorHandler.create_success_response(
+                data=resultado['data'],
+                message='Ingredientes obtenidos exitosamente'
+            )
+            response['incluidos'] = resultado['incluidos']
+            return jsonify(response), 200
+
         ingredientes = IngredienteService.get_ingredientes()
         return jsonify(ErrorHandler.create_success_response(
             data=ingredientes,
@@ -170,4 +188,188 @@ def get_ingredientes_bajos_stock():
     except Exception as e:
         _, error_dict = ErrorHandler.handle_service_error(e, 'obtener ingredientes con stock bajo', 'ingrediente')
         error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
-        return jsonify(error_resp), status_code
\ No newline at end of file
+        return jsonify(error_resp), status_code
+
+@ingrediente_bp.route('/alertas', methods=['GET'])
+@admin_required
+def get_alertas_ingredientes():
+    """Obtener alertas de stock bajo y vencimiento ordenadas por severidad"""
+    try:
+        dias = request.args.get('dias', current_app.config.get('ALERTAS_DIAS_VENCIMIENTO', 7), type=int)
+        umbral = request.args.get('umbral', 1.0, type=float)
+        limite = request.args.get('limite', type=int)
+        proveedor = request.args.get('proveedor')
+
+        resultado = AlertaIngredienteService.get_alertas(
+            dias_vencimiento=dias,
+            umbral_ratio=umbral,
+            proveedor=proveedor,
+            limite=limite
+        )
+        return jsonify(ErrorHandler.create_success_response(
+            data=resultado,
+            message=f'Se encontraron {resultado["total"]} alerta(s) de inventario'
+        )), 200
+    except Exception as e:
+        _, error_dict = ErrorHandler.handle_service_error(e, 'obtener alertas de', 'ingrediente')
+        error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
+        return jsonify(error_resp), status_code
+
+@ingrediente_bp.route('/alertas/stream', methods=['GET'])
+@admin_required
+def stream_alertas_ingredientes():
+    """Enviar alertas nuevas a clientes administradores (Server-Sent Events, opcional por config)"""
+    if not current_app.config.get('ALERTAS_PUSH_HABILITADO'):
+        error_resp, status_code = ErrorHandler.create_error_response({
+            "error": 'Push de alertas deshabilitado',
+            "code": 'FEATURE_DISABLED',
+            "details": 'Active ALERTAS_PUSH_HABILITADO para usar este endpoint'
+        }, 404)
+        return jsonify(error_resp), status_code
+
+    intervalo = current_app.config.get('ALERTAS_PUSH_INTERVALO', 30)
+    dias = request.args.get('dias', current_app.config.get('ALERTAS_DIAS_VENCIMIENTO', 7), type=int)
+
+    @stream_with_context
+    def generar():
+        conocidas = set()
+        while True:
+            nuevas, conocidas = AlertaIngredienteService.get_alertas_nuevas(conocidas, dias)
+            # Cerrar la transacción para leer datos frescos en el siguiente ciclo
+            db.session.rollback()
+            if nuevas:
+                yield f"event: alertas\ndata: {json.dumps(nuevas)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            time.sleep(intervalo)
+
+    return Response(generar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def _leer_filas_importacion():
+    """Devuelve un iterador de filas según el tipo de contenido (CSV, NDJSON, JSON o archivo)."""
+    delimitador = request.args.get('delimitador', ',')
+    content_type = (request.mimetype or '').lower()
+
+    if 'archivo' in request.files:
+        archivo = request.files['archivo']
+        if archivo.filename.lower().endswith('.json'):
+            datos = json.load(archivo.stream)
+            return datos.get('filas', []) if isinstance(datos, dict) else datos
+        texto = io.TextIOWrapper(archivo.stream, encoding='utf-8-sig', newline='')
+        return csv.DictReader(texto, delimiter=delimitador)
+
+    if content_type == 'text/csv':
+        texto = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        return csv.DictReader(texto, delimiter=delimitador)
+
+    if content_type == 'application/x-ndjson':
+        texto = io.TextIOWrapper(request.stream, encoding='utf-8')
+        return (json.loads(linea) for linea in texto if linea.strip())
+
+    datos = request.get_json(silent=True)
+    if isinstance(datos, dict):
+        return datos.get('filas', [])
+    return datos
+
+@ingrediente_bp.route('/importar', methods=['POST'])
+@admin_required
+def importar_ingredientes():
+    """Importar/conciliar ingredientes en bloque desde CSV o JSON"""
+    try:
+        filas = _leer_filas_importacion()
+        if filas is None:
+            error_resp, status_code = ErrorHandler.create_error_response({
+                "error": 'Datos requeridos',
+                "code": 'VALIDATION_ERROR',
+                "details": 'Envíe un CSV, NDJSON, un arreglo JSON de filas o un archivo en el campo "archivo"'
+            }, 400)
+            return jsonify(error_resp), status_code
+
+        simular = request.args.get('simular', 'false').lower() == 'true'
+        crear_nuevos = request.args.get('crear_nuevos', 'true').lower() == 'true'
+
+        success, result = ImportacionIngredienteService.importar(filas, simular=simular, crear_nuevos=crear_nuevos)
+
+        if success:
+            resumen = result['resumen']
+            return jsonify(ErrorHandler.create_success_response(
+                data=result,
+                message=(f"{resumen['creados']} creado(s), {resumen['actualizados']} actualizado(s), "
+                         f"{resumen['errores']} error(es)" + (' (simulación)' if simular else ''))
+            )), 200
+        else:
+            error_resp, status_code = ErrorHandler.create_error_response({
+                "error": result.get('error', 'Error desconocido'),
+                "code": 'IMPORT_ERROR'
+            }, 400)
+            return jsonify(error_resp), status_code
+    except Exception as e:
+        _, error_dict = ErrorHandler.handle_service_error(e, 'importar', 'ingredientes')
+        error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
+        return jsonify(error_resp), status_code
+
+@ingrediente_bp.route('/codigo/<string:codigo>', methods=['GET'])
+@mesero_or_admin_required
+def get_ingrediente_por_codigo(codigo):
+    """Obtener un ingrediente por código de barras (escaneo en recepción)"""
+    try:
+        ingrediente = RecepcionIngredienteService.buscar_por_codigo(codigo)
+        if not ingrediente:
+            error_resp, status_code = ErrorHandler.create_error_response({
+                "error": 'Ingrediente no encontrado',
+                "code": 'NOT_FOUND',
+                "details": f'No existe un ingrediente con código de barras {codigo}'
+            }, 404)
+            return jsonify(error_resp), status_code
+
+        return jsonify(ErrorHandler.create_success_response(
+            data=ingrediente,
+            message='Ingrediente obtenido exitosamente'
+        )), 200
+    except Exception as e:
+        _, error_dict = ErrorHandler.handle_service_error(e, 'obtener ingrediente por código de barras', 'ingrediente')
+        error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
+        return jsonify(error_resp), status_code
+
+@ingrediente_bp.route('/recepcion', methods=['POST'])
+@mesero_or_admin_required
+def recibir_ingredientes():
+    """Registrar la recepción de mercadería: uno o varios escaneos {codigo_barras, cantidad}"""
+    try:
+        data = request.get_json()
+        if not data:
+            error_resp, status_code = ErrorHandler.create_error_response({
+                "error": 'Datos requeridos',
+                "code": 'VALIDATION_ERROR',
+                "details": 'Debe proporcionar los escaneos de la entrega'
+            }, 400)
+            return jsonify(error_resp), status_code
+
+        escaneos = data.get('escaneos', [data]) if isinstance(data, dict) else data
+        usuario_id = get_jwt_identity()
+
+        success, result = RecepcionIngredienteService.recibir(
+            escaneos, usuario_id=int(usuario_id) if usuario_id else None
+        )
+
+        if success:
+            return jsonify(ErrorHandler.create_success_response(
+                data=result,
+                message=f'Recepción registrada para {len(result["recibidos"])} ingrediente(s)'
+            )), 200
+        else:
+            error_data = {
+                "error": result.get('error', 'Error desconocido'),
+                "code": 'VALIDATION_ERROR'
+            }
+            if result.get('errores'):
+                error_data["details"] = result['errores']
+            error_resp, status_code = ErrorHandler.create_error_response(error_data, 400)
+            return jsonify(error_resp), status_code
+    except Exception as e:
+        _, error_dict = ErrorHandler.handle_service_error(e, 'registrar recepción de', 'ingredientes')
+        error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
+        return jsonify(error_resp), status_code
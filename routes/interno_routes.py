@@ -0,0 +1,91 @@
+from flask import Blueprint, jsonify, request, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from functools import wraps
+from models import db
+from models.user import Usuario
+from services.error_handler import ErrorHandler
+from utils.db_pool import estado_pool
+from utils.replica import estado_replica
+from utils.sql_instrumentacion import reporte as reporte_sql
+import hmac
+
+interno_bp = Blueprint('interno_bp', __name__)
+
+def interno_required(fn):
+    """
+    Acceso a endpoints internos: token de monitoreo (cabecera X-Internal-Token,
+    configurado en INTERNAL_METRICS_TOKEN) o JWT de administrador.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('INTERNAL_METRICS_TOKEN')
+        enviado = request.headers.get('X-Internal-Token')
+        if token and enviado and hmac.compare_digest(token, enviado):
+            return fn(*args, **kwargs)
+
+        try:
+            verify_jwt_in_request()
+        except Exception:
+            return jsonify({"error": "Se requiere token interno o sesión de administrador."}), 401
+
+        user = Usuario.query.get(get_jwt_identity())
+        if user and user.rol == 'admin':
+            return fn(*args, **kwargs)
+        return jsonify({"error": "Acceso denegado. Se requiere rol de administrador."}), 403
+    return wrapper
+
+@interno_bp.route('/db/pool', methods=['GET'])
+@interno_required
+def get_estado_pool():
+    """Estadísticas del pool de conexiones del worker que atiende la petición"""
+    try:
+        return jsonify(ErrorHandler.create_success_response(
+            data=estado_pool(db),
+            message='Estado del pool de conexiones'
+        )), 200
+    except Exception as e:
+        error_resp, status_code = ErrorHandler.create_error_response(
+            {'error': f'Error obteniendo estado del pool: {str(e)}', 'code': 'INTERNAL_ERROR'}, 500
+        )
+        return jsonify(error_resp), status_code
+
+@interno_bp.route('/db/replica', methods=['GET'])
+@interno_required
+def get_estado_replica():
+    """Disponibilidad y retraso de la réplica de lectura vistos por este worker"""
+    try:
+        return jsonify(ErrorHandler.create_success_response(
+            data=estado_replica(db),
+            message='Estado de la réplica de lectura'
+        )), 200
+    except Exception as e:
+        error_resp, status_code = ErrorHandler.create_error_response(
+            {'error': f'Error obteniendo estado de la réplica: {str(e)}', 'code': 'INTERNAL_ERROR'}, 500
+        )
+        return jsonify(error_resp), status_code
+
+@interno_bp.route('/sql', methods=['GET'])
+@interno_required
+def get_reporte_sql():
+    """Reporte de sentencias SQL por endpoint y peticiones con posibles N+1 (este worker)"""
+    try:
+        return jsonify(ErrorHandler.create_success_response(
+            data={
+                'modo': current_app.config.get('SQL_INSTRUMENTACION'),
+                'muestreo': current_app.config.get('SQL_MUESTREO'),
+                **reporte_sql.to_dict()
+            },
+            message='Reporte de instrumentación SQL'
+        )), 200
+    except Exception as e:
+        error_resp, status_code = ErrorHandler.create_error_response(
+            {'error': f'Error obteniendo reporte SQL: {str(e)}', 'code': 'INTERNAL_ERROR'}, 500
+        )
+        return jsonify(error_resp), status_code
+
+@interno_bp.route('/sql', methods=['DELETE'])
+@interno_required
+def reiniciar_reporte_sql():
+    """Reiniciar el reporte SQL de este worker"""
+    reporte_sql.reiniciar()
+    return jsonify(ErrorHandler.create_success_response(message='Reporte SQL reiniciado')), 200
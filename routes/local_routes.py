@@ -1,15 +1,38 @@
-from flask import Blueprint, request, jsonify
-from services.local_service import LocalService
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, g
+from models import db
+from services.local_service import LocalService, plano_local
+from services.mesa_estado_service import MesaEstadoService
 from routes.admin_routes import admin_required
+from routes.mesero_routes import mesero_or_admin_required
 from flask_jwt_extended import get_jwt_identity
 from services.audit_service import AuditService
 from services.error_handler import ErrorHandler
+from utils.replica import lectura_replica
+from utils.compresion import etag_version
+import json
+import logging
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
 
 local_bp = Blueprint('local', __name__)
 
+@local_bp.after_app_request
+def _invalidar_plano_local(response):
+    # Los cambios de estado de mesas llegan al plano como eventos (MesaEstadoService);
+    # las escrituras de pisos/zonas/mesas y de órdenes (total_ordenes) cambian la estructura
+    if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and \
+            request.path.startswith(('/api/local', '/api/orden', '/api/mesero', '/api/qr')):
+        plano_local.invalidar()
+    # La vista del plano vale solo para esta petición (g sobrevive si hay un contexto de app externo)
+    g.pop('_plano_vista', None)
+    return response
+
 # --- RUTAS PÚBLICAS (SIN AUTENTICACIÓN) ---
 
 @local_bp.route('/zonas/public', methods=['GET'])
+@lectura_replica
 def get_zonas_public():
     """Obtener zonas públicas para desplegables"""
     try:
@@ -26,6 +49,7 @@ def get_zonas_public():
         }), 500
 
 @local_bp.route('/mesas/public', methods=['GET'])
+@lectura_replica
 def get_mesas_public():
     """Obtener mesas públicas para desplegables"""
     try:
@@ -43,6 +67,7 @@ def get_mesas_public():
         }), 500
 
 @local_bp.route('/pisos/public', methods=['GET'])
+@lectura_replica
 def get_pisos_public():
     """Obtener pisos públicos para desplegables"""
     try:
@@ -133,7 +158,7 @@ def create_piso():
                 valores_nuevos=piso.to_dict()
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -171,7 +196,7 @@ def update_piso(piso_id):
                 valores_nuevos=piso.to_dict()
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -205,7 +230,7 @@ def delete_piso(piso_id):
                 id_entidad=piso_id
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -305,7 +330,7 @@ def create_zona():
                 valores_nuevos=zona.to_dict()
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -343,7 +368,7 @@ def update_zona(zona_id):
                 valores_nuevos=zona.to_dict()
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -377,7 +402,7 @@ def delete_zona(zona_id):
                 id_entidad=zona_id
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -472,7 +497,7 @@ def create_mesa():
                 valores_nuevos=mesa.to_dict()
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -510,7 +535,7 @@ def update_mesa(mesa_id):
                 valores_nuevos=mesa.to_dict()
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -544,7 +569,7 @@ def delete_mesa(mesa_id):
                 id_entidad=mesa_id
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -575,8 +600,9 @@ def cambiar_estado_mesa(mesa_id):
         if error:
             return jsonify({
                 'success': False,
-                'error': error['error']
-            }), 400
+                'error': error['error'],
+                'code': error.get('code')
+            }), 409 if error.get('code') == 'CONFLICTO_ESTADO_MESA' else 400
         
         # Registrar en auditoría
         try:
@@ -588,7 +614,7 @@ def cambiar_estado_mesa(mesa_id):
                 valores_nuevos={'estado': nuevo_estado}
             )
         except Exception as e:
-            print(f"Error registrando auditoría: {e}")
+            logger.warning("Error registrando auditoría: %s", e)
         
         return jsonify({
             'success': True,
@@ -620,6 +646,7 @@ def get_estadisticas():
 
 @local_bp.route('/mapa', methods=['GET'])
 @admin_required
+@etag_version(LocalService.version_mapa)
 def get_mapa_restaurante():
     """Obtener datos para el mapa del restaurante"""
     try:
@@ -634,6 +661,77 @@ def get_mapa_restaurante():
             'error': f'Error obteniendo mapa: {str(e)}'
         }), 500
 
+@local_bp.route('/mesas/eventos', methods=['GET'])
+@mesero_or_admin_required
+def get_eventos_mesas():
+    """
+    Cambios de estado de mesas posteriores a ?desde=<cursor>. La siguiente consulta usa
+    el `ultimo_id` devuelto; los eventos recientes se repiten hasta que el cursor los pasa
+    y el cliente descarta los que ya aplicó por (mesa_id, version).
+    """
+    try:
+        desde = request.args.get('desde', 0, type=int)
+        limite = min(request.args.get('limite', 200, type=int), 1000)
+        eventos, cursor = MesaEstadoService.eventos_desde(desde, limite)
+        return jsonify(ErrorHandler.create_success_response(
+            data={
+                'eventos': eventos,
+                'ultimo_id': cursor
+            },
+            message='Eventos de mesas obtenidos exitosamente'
+        )), 200
+    except Exception as e:
+        error_dict = ErrorHandler.handle_service_error(e, 'obtener eventos de', 'mesa')
+        error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
+        return jsonify(error_resp), status_code
+
+@local_bp.route('/mesas/eventos/stream', methods=['GET'])
+@mesero_or_admin_required
+def stream_eventos_mesas():
+    """Enviar cambios de estado de mesas a clientes en tiempo real (Server-Sent Events, opcional por config)"""
+    if not current_app.config.get('MESA_EVENTOS_STREAM_HABILITADO'):
+        error_resp, status_code = ErrorHandler.create_error_response({
+            "error": 'Stream de eventos de mesas deshabilitado',
+            "code": 'FEATURE_DISABLED',
+            "details": 'Active MESA_EVENTOS_STREAM_HABILITADO para usar este endpoint'
+        }, 404)
+        return jsonify(error_resp), status_code
+
+    intervalo = current_app.config.get('MESA_EVENTOS_INTERVALO', 1)
+    limite = 200
+    # Reanudación tras reconexión (Last-Event-ID) o desde un cursor dado; por defecto, solo eventos nuevos
+    desde = request.headers.get('Last-Event-ID', type=int) or request.args.get('desde', type=int)
+    if desde is None:
+        desde = MesaEstadoService.cursor_actual()
+
+    @stream_with_context
+    def generar():
+        cursor = desde
+        # (mesa_id, version) -> id de los eventos enviados que el cursor aún no pasó
+        enviados: Dict[tuple, int] = {}
+        while True:
+            anterior = cursor
+            eventos, cursor = MesaEstadoService.eventos_desde(cursor, limite)
+            # Cerrar la transacción para leer datos frescos en el siguiente ciclo
+            db.session.rollback()
+            nuevos = [e for e in eventos if (e['mesa_id'], e['version']) not in enviados]
+            for evento in nuevos:
+                enviados[(evento['mesa_id'], evento['version'])] = evento['id']
+                # El id SSE es el cursor: al reconectar se releen los eventos aún no asentados
+                yield f"id: {cursor}\nevent: mesa\ndata: {json.dumps(evento)}\n\n"
+            enviados = {clave: id_ for clave, id_ in enviados.items() if id_ > cursor}
+            # Página llena de eventos ya asentados: seguir leyendo sin esperar
+            if len(eventos) == limite and cursor > anterior:
+                continue
+            if not nuevos:
+                yield ": keep-alive\n\n"
+            time.sleep(intervalo)
+
+    return Response(generar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 # --- RUTAS PÚBLICAS (para QR) ---
 
 @local_bp.route('/mesas/qr/<qr_code>', methods=['GET'])
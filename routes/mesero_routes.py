@@ -104,11 +104,12 @@ def update_mesa_status(mesa_id):
         success, error = MeseroService.update_mesa_status(mesa_id, nuevo_estado)
         
         if error:
-            return jsonify(ErrorHandler.create_error_response(
-                error=error.get('error', 'Error actualizando mesa'),
-                code='UPDATE_ERROR',
-                details=error.get('error')
-            )), 400
+            error_resp, status_code = ErrorHandler.create_error_response({
+                "error": error.get('error', 'Error actualizando mesa'),
+                "code": error.get('code', 'UPDATE_ERROR'),
+                "details": error.get('error')
+            }, 409 if error.get('code') == 'CONFLICTO_ESTADO_MESA' else 400)
+            return jsonify(error_resp), status_code
 
         return jsonify(ErrorHandler.create_success_response(
             message=f'Mesa {mesa_id} actualizada a {nuevo_estado} exitosamente'
@@ -0,0 +1,30 @@
+from flask import Blueprint, Response, jsonify, request, current_app
+from models import db
+from utils import metricas
+from utils.compresion import sin_etag
+import hmac
+
+metricas_bp = Blueprint('metricas_bp', __name__)
+
+def _token_valido() -> bool:
+    """Sin INTERNAL_METRICS_TOKEN el endpoint es abierto (restringirlo en nginx); con token se exige."""
+    token = current_app.config.get('INTERNAL_METRICS_TOKEN')
+    if not token:
+        return True
+    enviado = request.headers.get('X-Internal-Token') or ''
+    autorizacion = request.headers.get('Authorization', '')
+    if autorizacion.startswith('Bearer '):
+        enviado = enviado or autorizacion[7:]
+    return bool(enviado) and hmac.compare_digest(token, enviado)
+
+@metricas_bp.route('/metrics', methods=['GET'])
+@sin_etag
+def get_metricas():
+    """Métricas en formato de exposición de Prometheus"""
+    if not _token_valido():
+        return jsonify({"error": "Token de métricas inválido"}), 401
+    if metricas.prometheus_client is None or not current_app.config.get('METRICAS_HABILITADAS', True):
+        return jsonify({"error": "Métricas no disponibles (prometheus_client no instalado o deshabilitado)"}), 503
+
+    cuerpo, content_type = metricas.exportar(db, current_app.config.get('METRICAS_DOMINIO_INTERVALO', 15))
+    return Response(cuerpo, mimetype=None, content_type=content_type)
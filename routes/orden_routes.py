@@ -1,13 +1,18 @@
 from flask import Blueprint, request, jsonify
 from services.orden_service import OrdenService
 from services.caja_service import CajaService
+from services.estimador_cocina_service import estimador_cocina
 from services.error_handler import ErrorHandler
+from utils.replica import lectura_replica
 from routes.admin_routes import admin_required
 from routes.mesero_routes import mesero_or_admin_required
 from functools import wraps
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import Usuario
 from flask import jsonify
+import logging
+
+logger = logging.getLogger(__name__)
 
 orden_bp = Blueprint('orden_bp', __name__)
 
@@ -256,9 +261,7 @@ def cancelar_orden(orden_id):
 def get_ordenes_pendientes():
     """Obtener órdenes detalladas para cocina (confirmadas, preparando, lista, servida y con items en preparación)"""
     try:
-        print("🍳 Endpoint /cocina/pendientes llamado")
         ordenes = OrdenService.obtener_ordenes_activas()
-        print(f"🍳 Órdenes activas obtenidas: {len(ordenes)}")
 
         # Filtrar órdenes que cocina necesita ver:
         # 1. Órdenes en estado 'confirmada', 'preparando', 'lista', 'servida', 'cancelada'
@@ -269,22 +272,15 @@ def get_ordenes_pendientes():
                (o.items and any(item.estado in ['en_cola', 'preparando', 'listo'] for item in o.items))
         ]
 
-        print(f"🍳 Órdenes filtradas para cocina: {len(ordenes_pendientes)}")
-
-        ordenes_dict = []
-        for orden in ordenes_pendientes:
-            orden_dict = orden.to_dict()
-            print(f"🍳 Orden {orden.id}: estado={orden.estado}, items={len(orden.items or [])}")
-            ordenes_dict.append(orden_dict)
+        ordenes_dict = [orden.to_dict() for orden in ordenes_pendientes]
+        logger.debug("Cocina pendientes: %d órdenes activas, %d filtradas", len(ordenes), len(ordenes_dict))
 
         return jsonify(ErrorHandler.create_success_response(
             data=ordenes_dict,
             message='Órdenes detalladas obtenidas exitosamente'
         )), 200
     except Exception as e:
-        print(f"🍳 Error en /cocina/pendientes: {str(e)}")
-        import traceback
-        print(f"🍳 Traceback: {traceback.format_exc()}")
+        logger.exception("Error en /cocina/pendientes")
         error_dict = ErrorHandler.handle_service_error(e, 'obtener órdenes detalladas', 'orden')
         error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
         return jsonify(error_resp), status_code
@@ -294,14 +290,11 @@ def get_ordenes_pendientes():
 def actualizar_estado_orden(orden_id):
     """Actualizar el estado de una orden"""
     try:
-        print(f"🍳 Endpoint actualizar_estado_orden llamado para orden {orden_id}")
-
         # Verificar autorización
         current_user_id = get_jwt_identity()
-        print(f"🍳 Usuario autenticado: {current_user_id}")
 
         data = request.get_json()
-        print(f"🍳 Datos recibidos: {data}")
+        logger.debug("Actualizar estado de orden %s por usuario %s: %s", orden_id, current_user_id, data)
 
         if not data or 'estado' not in data:
             error_data = {
@@ -310,12 +303,9 @@ def actualizar_estado_orden(orden_id):
                 "details": 'El campo estado es obligatorio'
             }
             error_resp, status_code = ErrorHandler.create_error_response(error_data, 400)
-            print(f"🍳 Error de validación: {error_resp}")
             return jsonify(error_resp), status_code
 
-        print(f"🍳 Llamando a OrdenService.actualizar_estado_orden({orden_id}, {data['estado']})")
         orden = OrdenService.actualizar_estado_orden(orden_id, data['estado'])
-        print(f"🍳 Orden actualizada correctamente: {orden.id} -> {orden.estado}")
 
         # Verificar que la orden existe y está en el estado correcto
         if not orden:
@@ -325,17 +315,15 @@ def actualizar_estado_orden(orden_id):
                 "details": f'No se pudo encontrar la orden {orden_id} después de la actualización'
             }
             error_resp, status_code = ErrorHandler.create_error_response(error_data, 404)
-            print(f"🍳 Error: orden no encontrada después de actualización")
+            logger.warning("Orden %s no encontrada después de actualizar su estado", orden_id)
             return jsonify(error_resp), status_code
 
-        response_data = orden.to_dict()
-        print(f"🍳 Serializando orden: {response_data}")
+        logger.info("Orden %s actualizada a estado %s", orden.id, orden.estado)
 
         success_response = ErrorHandler.create_success_response(
-            data=response_data,
+            data=orden.to_dict(),
             message='Estado de orden actualizado exitosamente'
         )
-        print(f"🍳 Respuesta exitosa: {success_response}")
 
         return jsonify(success_response), 200
 
@@ -346,12 +334,10 @@ def actualizar_estado_orden(orden_id):
             "details": str(e)
         }
         error_resp, status_code = ErrorHandler.create_error_response(error_data, 400)
-        print(f"🍳 Error de validación: {error_resp}")
+        logger.info("Cambio de estado rechazado para orden %s: %s", orden_id, e)
         return jsonify(error_resp), status_code
     except Exception as e:
-        print(f"🍳 Error inesperado: {str(e)}")
-        import traceback
-        print(f"🍳 Traceback: {traceback.format_exc()}")
+        logger.exception("Error inesperado actualizando estado de orden %s", orden_id)
         error_dict = ErrorHandler.handle_service_error(e, 'actualizar estado de orden', 'orden')
         error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
         return jsonify(error_resp), status_code
@@ -456,6 +442,7 @@ def procesar_pago(orden_id):
 
 @orden_bp.route('/estadisticas', methods=['GET'])
 @admin_required
+@lectura_replica
 def get_estadisticas_pedidos():
     """Obtener estadísticas de pedidos para dashboard admin"""
     try:
@@ -472,6 +459,7 @@ def get_estadisticas_pedidos():
 
 @orden_bp.route('/historico', methods=['GET'])
 @admin_required
+@lectura_replica
 def get_ordenes_historico():
     """Obtener histórico completo de órdenes"""
     try:
@@ -650,6 +638,23 @@ def get_ordenes_por_mesa(mesa_id):
         error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
         return jsonify(error_resp), status_code
 
+@orden_bp.route('/mesa/<int:mesa_id>/estimacion', methods=['GET'])
+@orden_required
+def get_estimacion_mesa(mesa_id):
+    """Minutos estimados hasta que estén listos los ítems de las órdenes abiertas de la mesa"""
+    try:
+        estimacion = estimador_cocina.estimar_mesa(mesa_id)
+
+        return jsonify(ErrorHandler.create_success_response(
+            data=estimacion,
+            message='Estimación de la mesa obtenida exitosamente'
+        )), 200
+
+    except Exception as e:
+        error_dict = ErrorHandler.handle_service_error(e, 'estimar tiempos de mesa', 'orden')
+        error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
+        return jsonify(error_resp), status_code
+
 
 @orden_bp.route('/pagos', methods=['GET'])
 @caja_or_admin_required
@@ -691,6 +696,7 @@ def get_pago(pago_id):
 
 @orden_bp.route('/pagos/estadisticas', methods=['GET'])
 @admin_required
+@lectura_replica
 def get_estadisticas_pagos():
     """Obtiene estadísticas de pagos"""
     try:
@@ -706,6 +712,7 @@ def get_estadisticas_pagos():
 
 @orden_bp.route('/pagos/fecha', methods=['GET'])
 @caja_or_admin_required
+@lectura_replica
 def get_pagos_por_fecha():
     """Obtiene pagos por rango de fechas"""
     try:
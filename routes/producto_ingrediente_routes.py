@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify
 from services.producto_ingrediente_service import ProductoIngredienteService
 from services.error_handler import ErrorHandler
 from routes.admin_routes import admin_required
+import logging
+
+logger = logging.getLogger(__name__)
 
 producto_ingrediente_bp = Blueprint('producto_ingrediente_bp', __name__)
 
@@ -10,6 +13,15 @@ producto_ingrediente_bp = Blueprint('producto_ingrediente_bp', __name__)
 def get_productos_ingredientes():
     """Obtener todas las asociaciones producto-ingrediente"""
     try:
+        if request.args.get('formato') == 'plano':
+            resultado = ProductoIngredienteService.get_productos_ingredientes(plano=True)
+            response = ErrorHandler.create_success_response(
+                data=resultado['data'],
+                message='Asociaciones producto-ingrediente obtenidas exitosamente'
+            )
+            response['incluidos'] = resultado['incluidos']
+            return jsonify(response), 200
+
         asociaciones = ProductoIngredienteService.get_productos_ingredientes()
         return jsonify(ErrorHandler.create_success_response(
             data=asociaciones,
@@ -170,12 +182,11 @@ def delete_producto_ingrediente(asociacion_id):
 def verificar_stock_suficiente(producto_id):
     """Verificar si hay stock suficiente para producir un producto"""
     try:
-        print(f"[DEBUG] Verificando stock para producto_id: {producto_id}")
         cantidad_necesaria = request.args.get('cantidad', 1, type=int)
-        print(f"[DEBUG] Cantidad necesaria: {cantidad_necesaria}")
 
         success, result = ProductoIngredienteService.verificar_stock_suficiente(producto_id, cantidad_necesaria)
-        print(f"[DEBUG] Resultado del servicio: success={success}, result={result}")
+        logger.debug("Verificación de stock producto %s x%s: success=%s, result=%s",
+                     producto_id, cantidad_necesaria, success, result)
 
         if success:
             return jsonify(ErrorHandler.create_success_response(
@@ -1,9 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from functools import wraps
 from models.menu import Producto, Categoria, ProductoImagen
 from models.user import Usuario
 from services.error_handler import ErrorHandler
+from utils.json_provider import CacheJSON
+from utils.replica import lectura_replica
+from services.resena_service import ResenaService
+from services.busqueda_service import BusquedaProductoService
 from routes.admin_routes import admin_required
 from models import db
 import os
@@ -11,23 +15,57 @@ from werkzeug.utils import secure_filename
 
 producto_bp = Blueprint('producto_bp', __name__)
 
+# Menú público ya codificado (se invalida al modificar productos en este proceso)
+_cache_menu_publico = CacheJSON()
+
+# Solo las reseñas moderadas cuentan en el menú: moderar, borrar o recalcular resúmenes lo
+# invalidan; crear una reseña (POST público y anónimo, queda pendiente) no
+_RUTA_RESENA_PUBLICA = '/api/resena/public'
+
+@producto_bp.after_app_request
+def _invalidar_menu_publico(response):
+    if request.method in ('POST', 'PUT', 'DELETE') and (
+            request.path.startswith(('/api/producto', '/api/categoria'))
+            or (request.path.startswith('/api/resena') and request.path != _RUTA_RESENA_PUBLICA)):
+        _cache_menu_publico.invalidar()
+    return response
+
+@producto_bp.after_app_request
+def _actualizar_indice_busqueda(response):
+    if request.method not in ('POST', 'PUT', 'DELETE') or response.status_code >= 400:
+        return response
+    if request.path.startswith('/api/categoria'):
+        BusquedaProductoService.invalidar()
+    elif request.path.startswith('/api/producto'):
+        BusquedaProductoService.registrar_cambio((request.view_args or {}).get('producto_id'))
+    return response
+
+@lectura_replica
+def _construir_menu_publico():
+    # Obtener favoritos primero, luego el resto
+    productos_favoritos = Producto.query.filter_by(es_favorito=True, disponible=True).order_by(Producto.nombre).all()
+    productos_normales = Producto.query.filter_by(es_favorito=False, disponible=True).order_by(Producto.nombre).all()
+
+    productos = productos_favoritos + productos_normales
+    # Resúmenes de reseñas de todos los productos en una consulta (None si no tiene aprobadas)
+    resenas = ResenaService.resumenes_por_producto()
+
+    return {
+        'success': True,
+        'data': [{**producto.to_dict(), 'resenas': resenas.get(producto.id)} for producto in productos],
+        'total': len(productos),
+        'favoritos_count': len(productos_favoritos)
+    }
+
 # --- Rutas Públicas ---
 @producto_bp.route('/public', methods=['GET'])
 def get_productos_public():
     """Obtener todos los productos (ruta pública) - Favoritos primero"""
     try:
-        # Obtener favoritos primero, luego el resto
-        productos_favoritos = Producto.query.filter_by(es_favorito=True, disponible=True).order_by(Producto.nombre).all()
-        productos_normales = Producto.query.filter_by(es_favorito=False, disponible=True).order_by(Producto.nombre).all()
-
-        productos = productos_favoritos + productos_normales
-
-        return jsonify({
-            'success': True,
-            'data': [producto.to_dict() for producto in productos],
-            'total': len(productos),
-            'favoritos_count': len(productos_favoritos)
-        }), 200
+        cuerpo = _cache_menu_publico.obtener(
+            'menu', _construir_menu_publico, ttl=current_app.config.get('MENU_PUBLICO_CACHE_TTL', 5)
+        )
+        return jsonify(cuerpo), 200
     except Exception as e:
         return jsonify({
             'success': False,
@@ -71,6 +109,30 @@ def get_productos():
             'error': f'Error obteniendo productos: {str(e)}'
         }), 500
 
+@producto_bp.route('/search', methods=['GET'])
+@admin_or_mesero_required
+def search_productos():
+    """Buscar productos por nombre, etiquetas, ingredientes o descripción (?q=, tolera tildes y errores de tipeo)"""
+    try:
+        consulta = request.args.get('q', '')
+        resultados = BusquedaProductoService.buscar(
+            consulta,
+            limite=min(request.args.get('limite', 20, type=int), 100),
+            solo_disponibles=request.args.get('todos', 'false').lower() != 'true',
+            categoria_id=request.args.get('categoria_id', type=int)
+        )
+        return jsonify({
+            'success': True,
+            'data': resultados,
+            'total': len(resultados),
+            'consulta': consulta
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error buscando productos: {str(e)}'
+        }), 500
+
 @producto_bp.route('/<int:producto_id>', methods=['GET'])
 @admin_required
 def get_producto(producto_id):
@@ -304,47 +366,6 @@ def get_producto_imagenes(producto_id):
     except Exception as e:
         return jsonify({'success': False, 'error': f'Error obteniendo imágenes: {str(e)}'}), 500
 
-# --- Endpoint de prueba para debug (temporal) ---
-@producto_bp.route('/test-upload', methods=['POST'])
-def test_upload():
-    """Endpoint de prueba para subir imágenes sin autenticación"""
-    try:
-        if 'imagenes' not in request.files:
-            return jsonify({'success': False, 'error': 'No se encontraron imágenes'}), 400
-
-        imagenes = request.files.getlist('imagenes')
-
-        # Crear directorio si no existe
-        upload_dir = os.path.join('uploads', 'productos')
-        os.makedirs(upload_dir, exist_ok=True)
-
-        imagenes_subidas = []
-
-        for imagen in imagenes:
-            if imagen and imagen.filename:
-                filename = secure_filename(imagen.filename)
-                import time
-                timestamp = str(int(time.time()))
-                filename = f"{timestamp}_{filename}"
-                filepath = os.path.join(upload_dir, filename)
-
-                imagen.save(filepath)
-
-                imagenes_subidas.append({
-                    'filename': filename,
-                    'size': os.path.getsize(filepath),
-                    'url': f"/uploads/productos/{filename}"
-                })
-
-        return jsonify({
-            'success': True,
-            'data': imagenes_subidas,
-            'message': f'Se subieron {len(imagenes_subidas)} imágenes de prueba exitosamente'
-        }), 201
-
-    except Exception as e:
-        return jsonify({'success': False, 'error': f'Error en prueba: {str(e)}'}), 500
-
 @producto_bp.route('/imagenes/<int:imagen_id>', methods=['DELETE'])
 def delete_producto_imagen(imagen_id):
     """Eliminar una imagen de producto"""
@@ -412,6 +433,7 @@ def toggle_favorito(producto_id):
         return jsonify({'success': False, 'error': f'Error actualizando favorito: {str(e)}'}), 500
 
 @producto_bp.route('/favoritos', methods=['GET'])
+@lectura_replica
 def get_favoritos():
     """Obtener todos los productos favoritos"""
     try:
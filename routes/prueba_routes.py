@@ -0,0 +1,235 @@
+"""
+Rutas de prueba y diagnóstico.
+
+Solo se registran con RUTAS_PRUEBA_HABILITADAS (activo en desarrollo): en
+producción no existen, no ocupan el mapa de URLs ni exponen endpoints sin
+autenticación como la subida de imágenes de prueba.
+"""
+import datetime
+import logging
+import os
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+prueba_bp = Blueprint('prueba_bp', __name__)
+
+# --- Aplicación ---
+
+@prueba_bp.route("/test-cors")
+def test_cors():
+    """Endpoint de prueba para verificar CORS"""
+    return jsonify({
+        "message": "CORS funcionando correctamente",
+        "status": "success",
+        "timestamp": datetime.datetime.now().isoformat()
+    }), 200
+
+@prueba_bp.route("/api/test-image")
+def test_image():
+    """Crear y servir una imagen de prueba"""
+    try:
+        from PIL import Image
+        import io
+
+        # Crear imagen de prueba
+        img = Image.new('RGB', (300, 200), color='red')
+        from PIL import ImageDraw
+        draw = ImageDraw.Draw(img)
+        draw.text((20, 20), "TEST IMAGE", fill='white')
+
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format='PNG')
+        img_bytes.seek(0)
+
+        from flask import Response
+        return Response(
+            img_bytes.getvalue(),
+            mimetype='image/png',
+            headers={'Access-Control-Allow-Origin': '*'}
+        )
+
+    except ImportError:
+        # Si PIL no está disponible, devolver JSON
+        return jsonify({
+            "message": "PIL no disponible - instala con: pip install Pillow",
+            "status": "error"
+        }), 500
+
+@prueba_bp.route("/api/test/mesero")
+def test_mesero():
+    """Endpoint de prueba para el servicio de mesero"""
+    try:
+        from services.mesero_service import MeseroService
+        layout = MeseroService.get_layout_with_realtime_data()
+        return jsonify({
+            "message": "MeseroService funcionando",
+            "status": "success",
+            "layout_length": len(layout),
+            "first_piso": layout[0]['nombre'] if layout else None
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "message": "Error en MeseroService",
+            "error": str(e),
+            "status": "error"
+        }), 500
+
+# --- Cocina ---
+
+@prueba_bp.route('/api/cocina/test-public', methods=['GET'])
+def test_cocina_public():
+    """Endpoint de prueba público para verificar que el blueprint funciona"""
+    return jsonify({
+        "success": True,
+        "message": "Blueprint de cocina funcionando correctamente (público)",
+        "data": {
+            "status": "activo",
+            "timestamp": datetime.datetime.utcnow().isoformat()
+        }
+    })
+
+@prueba_bp.route('/api/cocina/test', methods=['GET'])
+def test_cocina():
+    """Endpoint de prueba para verificar que el blueprint funciona"""
+    return jsonify({
+        "success": True,
+        "message": "Blueprint de cocina funcionando correctamente",
+        "data": {
+            "endpoints_disponibles": [
+                "/api/cocina/test",
+                "/api/cocina/items",
+                "/api/cocina/mesas/<estacion>",
+                "/api/cocina/estadisticas/<estacion>",
+                "/api/cocina/urgentes/<estacion>",
+                "/api/cocina/ordenes"
+            ]
+        }
+    })
+
+@prueba_bp.route('/api/cocina/test-simple', methods=['GET'])
+def test_simple_cocina():
+    """Endpoint de prueba simple que devuelve un array de órdenes"""
+    try:
+        # Crear datos de prueba
+        test_ordenes = [
+            {
+                "id": 1,
+                "numero": "TEST-001",
+                "mesa_id": 1,
+                "mozo_id": 1,
+                "tipo": "mesa",
+                "estado": "confirmada",
+                "monto_total": 45.50,
+                "cliente_nombre": "Cliente Test 1",
+                "creado_en": "2024-01-01T10:00:00Z",
+                "actualizado_en": "2024-01-01T10:30:00Z",
+                "mesa": {"numero": "1", "zona": "Principal", "piso": "1"},
+                "mozo": {"usuario": "mesero1"},
+                "items": [
+                    {
+                        "id": 1,
+                        "producto_id": 1,
+                        "cantidad": 2,
+                        "estado": "en_cola",
+                        "producto": {"nombre": "Ceviche Mixto"}
+                    }
+                ]
+            },
+            {
+                "id": 2,
+                "numero": "TEST-002",
+                "mesa_id": 2,
+                "mozo_id": 2,
+                "tipo": "mesa",
+                "estado": "preparando",
+                "monto_total": 32.00,
+                "cliente_nombre": "Cliente Test 2",
+                "creado_en": "2024-01-01T11:00:00Z",
+                "actualizado_en": "2024-01-01T11:15:00Z",
+                "mesa": {"numero": "2", "zona": "Terraza", "piso": "1"},
+                "mozo": {"usuario": "mesero2"},
+                "items": [
+                    {
+                        "id": 2,
+                        "producto_id": 2,
+                        "cantidad": 1,
+                        "estado": "preparando",
+                        "producto": {"nombre": "Arroz con Mariscos"}
+                    }
+                ]
+            }
+        ]
+
+        return jsonify({
+            "success": True,
+            "message": "Datos de prueba de cocina",
+            "data": test_ordenes
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# --- Productos ---
+
+@prueba_bp.route('/api/producto/test-upload', methods=['POST'])
+def test_upload():
+    """Endpoint de prueba para subir imágenes sin autenticación"""
+    try:
+        if 'imagenes' not in request.files:
+            return jsonify({'success': False, 'error': 'No se encontraron imágenes'}), 400
+
+        imagenes = request.files.getlist('imagenes')
+
+        # Crear directorio si no existe
+        upload_dir = os.path.join('uploads', 'productos')
+        os.makedirs(upload_dir, exist_ok=True)
+
+        imagenes_subidas = []
+
+        for imagen in imagenes:
+            if imagen and imagen.filename:
+                filename = secure_filename(imagen.filename)
+                import time
+                timestamp = str(int(time.time()))
+                filename = f"{timestamp}_{filename}"
+                filepath = os.path.join(upload_dir, filename)
+
+                imagen.save(filepath)
+
+                imagenes_subidas.append({
+                    'filename': filename,
+                    'size': os.path.getsize(filepath),
+                    'url': f"/uploads/productos/{filename}"
+                })
+
+        return jsonify({
+            'success': True,
+            'data': imagenes_subidas,
+            'message': f'Se subieron {len(imagenes_subidas)} imágenes de prueba exitosamente'
+        }), 201
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Error en prueba: {str(e)}'}), 500
+
+# --- Autenticación ---
+
+@prueba_bp.route('/auth/test-jwt', methods=['GET'])
+@jwt_required()
+def test_jwt():
+    """Endpoint de prueba para verificar JWT"""
+    try:
+        current_user_id = get_jwt_identity()
+        logger.debug("Test JWT - identity: %s", current_user_id)
+
+        return jsonify({
+            "success": True,
+            "message": "JWT funcionando correctamente",
+            "identity": str(current_user_id),
+            "type": str(type(current_user_id))
+        })
+    except Exception as e:
+        logger.warning("Error en test JWT: %s", e)
+        return jsonify({"error": f"Error JWT: {str(e)}"}), 500
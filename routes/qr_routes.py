@@ -0,0 +1,145 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt_identity
+from services.qr_sesion_service import QRSesionService, indice_qr
+from services.error_handler import ErrorHandler
+from routes.mesero_routes import mesero_or_admin_required
+import logging
+
+logger = logging.getLogger(__name__)
+
+qr_bp = Blueprint('qr_bp', __name__)
+
+@qr_bp.after_app_request
+def _invalidar_indice_qr(response):
+    # Mesas o productos modificados en este proceso: el índice QR se recarga en el próximo uso
+    if request.method in ('POST', 'PUT', 'DELETE') and request.path.startswith(('/api/local', '/api/producto')):
+        indice_qr.invalidar()
+    return response
+
+def _error_validacion(e: ValueError):
+    error_data = {
+        "error": str(e),
+        "code": 'VALIDATION_ERROR',
+        "details": str(e)
+    }
+    error_resp, status_code = ErrorHandler.create_error_response(error_data, 400)
+    return jsonify(error_resp), status_code
+
+def _error_servicio(e: Exception, operacion: str):
+    error_dict = ErrorHandler.handle_service_error(e, operacion, 'wishlist')
+    error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
+    return jsonify(error_resp), status_code
+
+# --- RUTAS PÚBLICAS (comensales en la mesa) ---
+
+@qr_bp.route('/sesion', methods=['POST'])
+def iniciar_sesion():
+    """Iniciar una sesión QR a partir del código de la mesa"""
+    try:
+        data = request.get_json() or {}
+        if not data.get('qr_code'):
+            error_data = {
+                "error": 'Campo requerido faltante: qr_code',
+                "code": 'MISSING_FIELD',
+                "details": 'El campo qr_code es obligatorio'
+            }
+            error_resp, status_code = ErrorHandler.create_error_response(error_data, 400)
+            return jsonify(error_resp), status_code
+
+        sesion = QRSesionService.iniciar_sesion(data['qr_code'])
+        return jsonify(ErrorHandler.create_success_response(
+            data=sesion,
+            message='Sesión QR iniciada'
+        )), 201
+    except ValueError as e:
+        return _error_validacion(e)
+    except Exception as e:
+        return _error_servicio(e, 'iniciar sesión de')
+
+@qr_bp.route('/sesion/<sesion_id>/wishlist', methods=['GET'])
+def get_wishlist(sesion_id):
+    """Obtener la wishlist de la sesión"""
+    try:
+        wishlist = QRSesionService.obtener_wishlist(sesion_id)
+        return jsonify(ErrorHandler.create_success_response(
+            data=wishlist,
+            message='Wishlist obtenida exitosamente'
+        )), 200
+    except ValueError as e:
+        return _error_validacion(e)
+    except Exception as e:
+        return _error_servicio(e, 'obtener')
+
+@qr_bp.route('/sesion/<sesion_id>/wishlist', methods=['POST'])
+def agregar_a_wishlist(sesion_id):
+    """Agregar un producto a la wishlist de la sesión"""
+    try:
+        data = request.get_json() or {}
+        if 'producto_id' not in data:
+            error_data = {
+                "error": 'Campo requerido faltante: producto_id',
+                "code": 'MISSING_FIELD',
+                "details": 'El campo producto_id es obligatorio'
+            }
+            error_resp, status_code = ErrorHandler.create_error_response(error_data, 400)
+            return jsonify(error_resp), status_code
+
+        wishlist = QRSesionService.agregar_producto(sesion_id, int(data['producto_id']), int(data.get('cantidad', 1)))
+        return jsonify(ErrorHandler.create_success_response(
+            data=wishlist,
+            message='Producto agregado a la wishlist'
+        )), 200
+    except ValueError as e:
+        return _error_validacion(e)
+    except Exception as e:
+        return _error_servicio(e, 'agregar producto a')
+
+@qr_bp.route('/sesion/<sesion_id>/wishlist/<int:producto_id>', methods=['DELETE'])
+def quitar_de_wishlist(sesion_id, producto_id):
+    """Quitar un producto de la wishlist (?cantidad=N para quitar solo N unidades)"""
+    try:
+        wishlist = QRSesionService.quitar_producto(sesion_id, producto_id, request.args.get('cantidad', type=int))
+        return jsonify(ErrorHandler.create_success_response(
+            data=wishlist,
+            message='Producto quitado de la wishlist'
+        )), 200
+    except ValueError as e:
+        return _error_validacion(e)
+    except Exception as e:
+        return _error_servicio(e, 'quitar producto de')
+
+# --- RUTAS PARA MESEROS ---
+
+@qr_bp.route('/mesa/<int:mesa_id>/wishlists', methods=['GET'])
+@mesero_or_admin_required
+def get_wishlists_mesa(mesa_id):
+    """Obtener las wishlists de todas las sesiones QR de una mesa"""
+    try:
+        wishlists = QRSesionService.wishlists_de_mesa(mesa_id)
+        return jsonify(ErrorHandler.create_success_response(
+            data=wishlists,
+            message='Wishlists de la mesa obtenidas exitosamente'
+        )), 200
+    except Exception as e:
+        return _error_servicio(e, 'obtener')
+
+@qr_bp.route('/sesion/<sesion_id>/orden', methods=['POST'])
+@mesero_or_admin_required
+def convertir_wishlist_en_orden(sesion_id):
+    """Convertir la wishlist de la sesión en ítems de la orden de la mesa"""
+    try:
+        data = request.get_json(silent=True) or {}
+        orden, omitidos = QRSesionService.convertir_en_orden(
+            sesion_id,
+            mozo_id=int(get_jwt_identity()),
+            orden_id=data.get('orden_id'),
+            num_comensales=data.get('num_comensales', 1)
+        )
+        return jsonify(ErrorHandler.create_success_response(
+            data={'orden': orden.to_dict(), 'productos_omitidos': omitidos},
+            message='Wishlist convertida en orden exitosamente'
+        )), 201
+    except ValueError as e:
+        return _error_validacion(e)
+    except Exception as e:
+        return _error_servicio(e, 'convertir en orden')
@@ -0,0 +1,148 @@
+from flask import Blueprint, request, jsonify
+from services.resena_service import ResenaService
+from services.error_handler import ErrorHandler
+from routes.admin_routes import admin_required
+from utils.replica import lectura_replica
+import logging
+
+logger = logging.getLogger(__name__)
+
+resena_bp = Blueprint('resena_bp', __name__)
+
+def _error_validacion(e: ValueError):
+    error_data = {
+        "error": str(e),
+        "code": 'VALIDATION_ERROR',
+        "details": str(e)
+    }
+    error_resp, status_code = ErrorHandler.create_error_response(error_data, 400)
+    return jsonify(error_resp), status_code
+
+def _error_servicio(e: Exception, operacion: str):
+    error_dict = ErrorHandler.handle_service_error(e, operacion, 'reseña')
+    error_resp, status_code = ErrorHandler.create_error_response(error_dict, 500)
+    return jsonify(error_resp), status_code
+
+# --- RUTAS PÚBLICAS ---
+
+@resena_bp.route('/public', methods=['POST'])
+def crear_resena():
+    """Enviar una reseña de un producto (queda pendiente de moderación)"""
+    try:
+        data = request.get_json() or {}
+        for field in ('producto_id', 'puntuacion'):
+            if field not in data:
+                error_data = {
+                    "error": f'Campo requerido faltante: {field}',
+                    "code": 'MISSING_FIELD',
+                    "details": f'El campo {field} es obligatorio'
+                }
+                error_resp, status_code = ErrorHandler.create_error_response(error_data, 400)
+                return jsonify(error_resp), status_code
+
+        resena = ResenaService.crear_resena(
+            producto_id=data['producto_id'],
+            puntuacion=data['puntuacion'],
+            nombre_cliente=data.get('nombre_cliente'),
+            comentario=data.get('comentario')
+        )
+        return jsonify(ErrorHandler.create_success_response(
+            data=resena.to_dict(),
+            message='Reseña enviada, pendiente de moderación'
+        )), 201
+    except ValueError as e:
+        return _error_validacion(e)
+    except Exception as e:
+        return _error_servicio(e, 'crear')
+
+@resena_bp.route('/producto/<int:producto_id>/public', methods=['GET'])
+@lectura_replica
+def get_resenas_producto(producto_id):
+    """Reseñas aprobadas y resumen de un producto"""
+    try:
+        limite = min(request.args.get('limite', 20, type=int), 100)
+        offset = request.args.get('offset', 0, type=int)
+        resenas = ResenaService.obtener_resenas('aprobada', producto_id, limite, offset)
+        return jsonify(ErrorHandler.create_success_response(
+            data={
+                'resumen': ResenaService.resumen_producto(producto_id),
+                'resenas': [resena.to_dict() for resena in resenas]
+            },
+            message='Reseñas obtenidas exitosamente'
+        )), 200
+    except Exception as e:
+        return _error_servicio(e, 'obtener')
+
+# --- RUTAS DE MODERACIÓN (ADMIN) ---
+
+@resena_bp.route('/', methods=['GET'])
+@admin_required
+def get_resenas():
+    """Listar reseñas (?estado=pendiente|aprobada|rechazada&producto_id=)"""
+    try:
+        resenas = ResenaService.obtener_resenas(
+            estado=request.args.get('estado'),
+            producto_id=request.args.get('producto_id', type=int),
+            limite=min(request.args.get('limite', 50, type=int), 200),
+            offset=request.args.get('offset', 0, type=int)
+        )
+        return jsonify(ErrorHandler.create_success_response(
+            data=[resena.to_dict() for resena in resenas],
+            message='Reseñas obtenidas exitosamente'
+        )), 200
+    except ValueError as e:
+        return _error_validacion(e)
+    except Exception as e:
+        return _error_servicio(e, 'obtener')
+
+@resena_bp.route('/<int:resena_id>/moderar', methods=['PUT'])
+@admin_required
+def moderar_resena(resena_id):
+    """Aprobar o rechazar una reseña ({"aprobada": true|false})"""
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data.get('aprobada'), bool):
+            error_data = {
+                "error": 'Campo requerido faltante: aprobada',
+                "code": 'MISSING_FIELD',
+                "details": 'El campo aprobada debe ser true o false'
+            }
+            error_resp, status_code = ErrorHandler.create_error_response(error_data, 400)
+            return jsonify(error_resp), status_code
+
+        resena = ResenaService.moderar_resena(resena_id, data['aprobada'])
+        return jsonify(ErrorHandler.create_success_response(
+            data={'resena': resena.to_dict(), 'resumen': ResenaService.resumen_producto(resena.producto_id)},
+            message='Reseña aprobada' if resena.aprobada else 'Reseña rechazada'
+        )), 200
+    except ValueError as e:
+        return _error_validacion(e)
+    except Exception as e:
+        return _error_servicio(e, 'moderar')
+
+@resena_bp.route('/<int:resena_id>', methods=['DELETE'])
+@admin_required
+def eliminar_resena(resena_id):
+    """Eliminar una reseña"""
+    try:
+        ResenaService.eliminar_resena(resena_id)
+        return jsonify(ErrorHandler.create_success_response(
+            message='Reseña eliminada exitosamente'
+        )), 200
+    except ValueError as e:
+        return _error_validacion(e)
+    except Exception as e:
+        return _error_servicio(e, 'eliminar')
+
+@resena_bp.route('/resumenes/recalcular', methods=['POST'])
+@admin_required
+def recalcular_resumenes():
+    """Reconstruir los resúmenes de reseñas desde las reseñas aprobadas"""
+    try:
+        productos = ResenaService.recalcular_resumenes()
+        return jsonify(ErrorHandler.create_success_response(
+            data={'productos': productos},
+            message='Resúmenes de reseñas recalculados'
+        )), 200
+    except Exception as e:
+        return _error_servicio(e, 'recalcular resúmenes de')
@@ -0,0 +1,172 @@
+from models.menu import Ingrediente, TipoIngrediente
+from models import db
+from sqlalchemy import and_, or_
+from datetime import date, timedelta
+from typing import List, Dict, Any, Optional, Set
+
+class AlertaIngredienteService:
+    """Servicio de alertas de inventario: stock bajo y vencimiento de ingredientes."""
+
+    # Umbrales de nivel para el ratio stock/stock_minimo
+    RATIO_CRITICO = 0.25
+
+    @staticmethod
+    def filtro_stock_bajo(umbral_ratio: float = 1.0):
+        """
+        Condición de stock bajo sobre el índice (activo, ratio_stock). Sin stock mínimo
+        (stock_minimo = 0) el ratio es NULL: esos ingredientes solo cuentan si están agotados.
+        """
+        return or_(
+            Ingrediente.ratio_stock <= umbral_ratio,
+            and_(Ingrediente.stock_minimo == 0, Ingrediente.stock <= 0)
+        )
+
+    @staticmethod
+    def _columnas_base():
+        """Columnas planas necesarias para una alerta (evita cargar el ORM y el tipo por fila)."""
+        return (
+            Ingrediente.id,
+            Ingrediente.nombre,
+            Ingrediente.stock,
+            Ingrediente.stock_minimo,
+            Ingrediente.unidad,
+            Ingrediente.ratio_stock,
+            Ingrediente.fecha_vencimiento,
+            Ingrediente.proveedor,
+            Ingrediente.codigo_barras,
+            Ingrediente.ubicacion_almacen,
+            Ingrediente.tipo_ingrediente_id,
+            TipoIngrediente.nombre.label('tipo_nombre')
+        )
+
+    @staticmethod
+    def _base_alerta(row) -> Dict[str, Any]:
+        return {
+            'ingrediente_id': row.id,
+            'ingrediente_nombre': row.nombre,
+            'stock': float(row.stock or 0),
+            'stock_minimo': float(row.stock_minimo or 0),
+            'unidad': row.unidad,
+            'ratio_stock': float(row.ratio_stock) if row.ratio_stock is not None else None,
+            'fecha_vencimiento': row.fecha_vencimiento.isoformat() if row.fecha_vencimiento else None,
+            'proveedor': row.proveedor,
+            'codigo_barras': row.codigo_barras,
+            'ubicacion_almacen': row.ubicacion_almacen,
+            'tipo_ingrediente_id': row.tipo_ingrediente_id,
+            'tipo_ingrediente': row.tipo_nombre
+        }
+
+    @staticmethod
+    def get_alertas_stock(umbral_ratio: float = 1.0, proveedor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Ingredientes activos cuyo ratio stock/stock_minimo está por debajo del umbral.
+        Usa el índice (activo, ratio_stock) en lugar de recorrer toda la tabla.
+        """
+        query = db.session.query(*AlertaIngredienteService._columnas_base()).outerjoin(
+            TipoIngrediente, Ingrediente.tipo_ingrediente_id == TipoIngrediente.id
+        ).filter(
+            Ingrediente.activo == True,
+            AlertaIngredienteService.filtro_stock_bajo(umbral_ratio)
+        )
+        if proveedor:
+            query = query.filter(Ingrediente.proveedor == proveedor)
+
+        alertas = []
+        for row in query.all():
+            ratio = float(row.ratio_stock) if row.ratio_stock is not None else 0.0
+            if float(row.stock or 0) <= 0:
+                nivel = 'agotado'
+            elif ratio <= AlertaIngredienteService.RATIO_CRITICO:
+                nivel = 'critico'
+            else:
+                nivel = 'bajo'
+
+            alerta = AlertaIngredienteService._base_alerta(row)
+            alerta.update({
+                'tipo': 'stock',
+                'nivel': nivel,
+                'puntuacion': round(50 + 50 * (1 - max(0.0, min(ratio, 1.0))), 2)
+            })
+            alertas.append(alerta)
+        return alertas
+
+    @staticmethod
+    def get_alertas_vencimiento(dias: int = 7, proveedor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Ingredientes activos vencidos o que vencen dentro de los próximos `dias`.
+        Usa el índice (activo, fecha_vencimiento) como búsqueda por rango.
+        """
+        hoy = date.today()
+        query = db.session.query(*AlertaIngredienteService._columnas_base()).outerjoin(
+            TipoIngrediente, Ingrediente.tipo_ingrediente_id == TipoIngrediente.id
+        ).filter(
+            Ingrediente.activo == True,
+            Ingrediente.fecha_vencimiento.isnot(None),
+            Ingrediente.fecha_vencimiento <= hoy + timedelta(days=dias)
+        )
+        if proveedor:
+            query = query.filter(Ingrediente.proveedor == proveedor)
+
+        alertas = []
+        for row in query.all():
+            dias_restantes = (row.fecha_vencimiento - hoy).days
+            if dias_restantes < 0:
+                nivel, puntuacion = 'vencido', 100.0
+            else:
+                nivel = 'critico' if dias_restantes <= 1 else 'proximo'
+                puntuacion = round(50 + 50 * (1 - dias_restantes / max(dias, 1)), 2)
+
+            alerta = AlertaIngredienteService._base_alerta(row)
+            alerta.update({
+                'tipo': 'vencimiento',
+                'nivel': nivel,
+                'dias_para_vencer': dias_restantes,
+                'puntuacion': puntuacion
+            })
+            alertas.append(alerta)
+        return alertas
+
+    @staticmethod
+    def get_alertas(dias_vencimiento: int = 7, umbral_ratio: float = 1.0,
+                    proveedor: Optional[str] = None, limite: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Devuelve las alertas de stock y vencimiento ordenadas por severidad (puntuación descendente).
+        Cuesta dos consultas indexadas sin importar el número de ingredientes.
+        """
+        alertas = (
+            AlertaIngredienteService.get_alertas_stock(umbral_ratio, proveedor) +
+            AlertaIngredienteService.get_alertas_vencimiento(dias_vencimiento, proveedor)
+        )
+        alertas.sort(key=lambda a: (-a['puntuacion'], a['ingrediente_nombre'] or ''))
+
+        resumen = {}
+        for alerta in alertas:
+            clave = f"{alerta['tipo']}_{alerta['nivel']}"
+            resumen[clave] = resumen.get(clave, 0) + 1
+
+        total = len(alertas)
+        if limite:
+            alertas = alertas[:limite]
+
+        return {
+            'alertas': alertas,
+            'total': total,
+            'resumen': resumen,
+            'generado_en': date.today().isoformat()
+        }
+
+    @staticmethod
+    def clave_alerta(alerta: Dict[str, Any]) -> str:
+        """Identificador estable de una alerta para detectar alertas nuevas entre ciclos."""
+        return f"{alerta['tipo']}:{alerta['ingrediente_id']}:{alerta['nivel']}"
+
+    @staticmethod
+    def get_alertas_nuevas(conocidas: Set[str], dias_vencimiento: int = 7) -> tuple[List[Dict[str, Any]], Set[str]]:
+        """
+        Calcula las alertas actuales y devuelve solo las que no estaban en `conocidas`,
+        junto con el nuevo conjunto de claves (las alertas resueltas desaparecen de él).
+        """
+        actuales = AlertaIngredienteService.get_alertas(dias_vencimiento)['alertas']
+        claves = {AlertaIngredienteService.clave_alerta(a) for a in actuales}
+        nuevas = [a for a in actuales if AlertaIngredienteService.clave_alerta(a) not in conocidas]
+        return nuevas, claves
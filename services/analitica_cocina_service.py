@@ -0,0 +1,271 @@
+"""
+Analítica de tiempos de cocina.
+
+Cada ítem pasa por tres fases medidas con sus propias marcas de tiempo:
+
+- cola: de `creado_en` a `fecha_inicio` (cuando pasa a 'preparando'),
+- preparacion: de `fecha_inicio` a `fecha_listo`,
+- pase: de `fecha_listo` a `fecha_servido`.
+
+Al terminar una fase, la duración se suma al histograma de `tiempo_cocina` de su hora,
+estación y producto con un UPDATE incremental, en la misma transacción que cambia el
+estado del ítem. Las cubetas son fijas (LIMITES_CUBETAS), así que los histogramas de
+varias horas o productos se combinan sumando filas: el tablero obtiene percentiles
+con una consulta agrupada sobre los resúmenes, sin recorrer los ítems. El error de un
+percentil está acotado por el ancho de su cubeta.
+"""
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from models.menu import Producto
+from models.order import ItemOrden, TiempoCocina
+
+logger = logging.getLogger(__name__)
+
+# Marcas de tiempo que abren y cierran cada fase
+FASES = {
+    'cola': ('creado_en', 'fecha_inicio'),
+    'preparacion': ('fecha_inicio', 'fecha_listo'),
+    'pase': ('fecha_listo', 'fecha_servido'),
+}
+# Estado del ítem con el que termina cada fase
+FASE_POR_ESTADO = {'preparando': 'cola', 'listo': 'preparacion', 'servido': 'pase'}
+# Avance de un ítem: solo se mide una fase cuando el ítem avanza, no al volver atrás
+ORDEN_ESTADOS = {'pendiente': 0, 'en_cola': 1, 'preparando': 2, 'listo': 3, 'servido': 4}
+
+# Límite superior (segundos) de cada cubeta; la última cubeta recoge lo que supera 1 hora
+LIMITES_CUBETAS = (30, 60, 90, 120, 180, 240, 300, 420, 600, 900, 1200, 1800, 2700, 3600)
+PERCENTILES = (50, 90, 95)
+SIN_ESTACION = 'sin_estacion'
+
+AGRUPACIONES = ('estacion', 'producto', 'hora')
+
+
+def _hora(momento: datetime) -> datetime:
+    return momento.replace(minute=0, second=0, microsecond=0)
+
+
+def _cubeta(segundos: float) -> int:
+    return bisect_left(LIMITES_CUBETAS, segundos)
+
+
+class Histograma:
+    """Cantidades y sumas por cubeta de una fase; se combinan sumando"""
+
+    __slots__ = ('cantidades', 'sumas')
+
+    def __init__(self):
+        self.cantidades = [0] * (len(LIMITES_CUBETAS) + 1)
+        self.sumas = [0.0] * (len(LIMITES_CUBETAS) + 1)
+
+    def agregar(self, cubeta: int, cantidad: int, suma: float):
+        self.cantidades[cubeta] += cantidad
+        self.sumas[cubeta] += suma
+
+    def percentil(self, p: float) -> Optional[float]:
+        """
+        Interpolación dentro de la cubeta que contiene el percentil, suponiendo sus valores
+        repartidos de forma uniforme alrededor de su media sin salir de sus límites.
+        """
+        total = sum(self.cantidades)
+        if not total:
+            return None
+        objetivo = total * p / 100
+        acumulado = 0
+        for cubeta, cantidad in enumerate(self.cantidades):
+            if not cantidad or acumulado + cantidad < objetivo:
+                acumulado += cantidad
+                continue
+            media = self.sumas[cubeta] / cantidad
+            inferior = LIMITES_CUBETAS[cubeta - 1] if cubeta else 0
+            superior = LIMITES_CUBETAS[cubeta] if cubeta < len(LIMITES_CUBETAS) else float('inf')
+            radio = max(0.0, min(media - inferior, superior - media))
+            fraccion = (objetivo - acumulado) / cantidad
+            return media + radio * (2 * fraccion - 1)
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        cantidad = sum(self.cantidades)
+        resumen = {
+            'cantidad': cantidad,
+            'promedio': round(sum(self.sumas) / cantidad, 1) if cantidad else None,
+        }
+        for p in PERCENTILES:
+            valor = self.percentil(p)
+            resumen[f'p{p}'] = round(valor, 1) if valor is not None else None
+        return resumen
+
+
+class AnaliticaCocinaService:
+    """Tiempos de cola, preparación y pase por estación, producto y hora (en segundos)"""
+
+    @staticmethod
+    def registrar_cambio_estado(item: ItemOrden, estado_anterior: Optional[str]):
+        """
+        Suma al histograma la fase que el ítem acaba de terminar, si avanzó. Corre en la
+        transacción del cambio de estado (no hace commit).
+        """
+        fase = FASE_POR_ESTADO.get(item.estado)
+        if fase is None or ORDEN_ESTADOS.get(estado_anterior, -1) >= ORDEN_ESTADOS[item.estado]:
+            return
+        inicio, fin = (getattr(item, marca) for marca in FASES[fase])
+        if not inicio or not fin or fin < inicio:
+            return
+        AnaliticaCocinaService._sumar(
+            _hora(fin), item.estacion or SIN_ESTACION, item.producto_id, fase, (fin - inicio).total_seconds()
+        )
+
+    @staticmethod
+    def _sumar(hora: datetime, estacion: str, producto_id: int, fase: str, segundos: float):
+        cubeta = _cubeta(segundos)
+        sentencia = update(TiempoCocina).where(
+            TiempoCocina.hora == hora,
+            TiempoCocina.estacion == estacion,
+            TiempoCocina.producto_id == producto_id,
+            TiempoCocina.fase == fase,
+            TiempoCocina.cubeta == cubeta
+        ).values(
+            cantidad=TiempoCocina.cantidad + 1,
+            suma_segundos=TiempoCocina.suma_segundos + segundos
+        ).execution_options(synchronize_session=False)
+        if db.session.execute(sentencia).rowcount:
+            return
+
+        # Primera medición de la cubeta en esta hora
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(TiempoCocina).values(
+                    hora=hora, estacion=estacion, producto_id=producto_id, fase=fase, cubeta=cubeta,
+                    cantidad=1, suma_segundos=segundos
+                ))
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            db.session.execute(sentencia)
+
+    @staticmethod
+    def histogramas(agrupar: str = 'estacion', horas: float = 24, estacion: Optional[str] = None,
+                    producto_id: Optional[int] = None) -> Dict[tuple, Dict[str, Histograma]]:
+        """
+        Histogramas combinados de las últimas `horas` por grupo y fase. La clave del grupo es
+        (estacion,), (estacion, producto_id, nombre) o (estacion, hora) según `agrupar`.
+        """
+        if agrupar not in AGRUPACIONES:
+            raise ValueError(f"Agrupación inválida. Valores válidos: {', '.join(AGRUPACIONES)}")
+        if horas <= 0:
+            raise ValueError("El número de horas debe ser mayor que 0")
+
+        claves = [TiempoCocina.estacion]
+        if agrupar == 'producto':
+            claves += [TiempoCocina.producto_id, Producto.nombre]
+        elif agrupar == 'hora':
+            claves.append(TiempoCocina.hora)
+
+        consulta = select(
+            *claves, TiempoCocina.fase, TiempoCocina.cubeta,
+            func.sum(TiempoCocina.cantidad), func.sum(TiempoCocina.suma_segundos)
+        ).where(TiempoCocina.hora >= _hora(datetime.utcnow() - timedelta(hours=horas)))
+        if agrupar == 'producto':
+            consulta = consulta.join(Producto, Producto.id == TiempoCocina.producto_id)
+        if estacion:
+            consulta = consulta.where(TiempoCocina.estacion == estacion)
+        if producto_id is not None:
+            consulta = consulta.where(TiempoCocina.producto_id == producto_id)
+        consulta = consulta.group_by(*claves, TiempoCocina.fase, TiempoCocina.cubeta)
+
+        grupos: Dict[tuple, Dict[str, Histograma]] = defaultdict(lambda: defaultdict(Histograma))
+        for *clave, fase, cubeta, cantidad, suma in db.session.execute(consulta):
+            grupos[tuple(clave)][fase].agregar(cubeta, int(cantidad or 0), float(suma or 0))
+        return grupos
+
+    @staticmethod
+    def resumen(agrupar: str = 'estacion', horas: float = 24, estacion: Optional[str] = None,
+                producto_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Cantidad, promedio y percentiles de cada fase en las últimas `horas`, agrupados por
+        estación, por estación y producto, o por estación y hora.
+        """
+        grupos = AnaliticaCocinaService.histogramas(agrupar, horas, estacion, producto_id)
+        resultado = []
+        for clave in sorted(grupos, key=lambda c: tuple('' if v is None else v for v in c)):
+            fila = {'estacion': clave[0]}
+            if agrupar == 'producto':
+                fila.update(producto_id=clave[1], producto_nombre=clave[2])
+            elif agrupar == 'hora':
+                fila['hora'] = clave[1].isoformat()
+            fila['fases'] = {fase: grupos[clave][fase].to_dict() for fase in FASES if fase in grupos[clave]}
+            resultado.append(fila)
+        return resultado
+
+    @staticmethod
+    def resumen_estacion(estacion: str, horas: float = 24) -> Dict[str, Dict[str, Any]]:
+        """Fases de una estación en las últimas `horas` ({} si no hay mediciones)"""
+        filas = AnaliticaCocinaService.resumen('estacion', horas, estacion=estacion)
+        return filas[0]['fases'] if filas else {}
+
+    @staticmethod
+    def recalcular(dias: Optional[float] = None) -> int:
+        """
+        Reconstruye los histogramas desde las marcas de tiempo de los ítems (carga inicial
+        o reparación). Lee solo las columnas de tiempo, en lotes. Devuelve las filas escritas.
+        """
+        try:
+            dias = dias if dias is not None else current_app.config.get('COCINA_TIEMPOS_RETENCION_DIAS', 90)
+            desde = _hora(datetime.utcnow() - timedelta(days=dias))
+
+            acumulado: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+            filas = db.session.execute(
+                select(
+                    ItemOrden.estacion, ItemOrden.producto_id, ItemOrden.estado, ItemOrden.creado_en,
+                    ItemOrden.fecha_inicio, ItemOrden.fecha_listo, ItemOrden.fecha_servido
+                ).where(ItemOrden.creado_en >= desde, ItemOrden.estado != 'cancelado')
+                .execution_options(yield_per=1000)
+            )
+            for fila in filas:
+                marcas = fila._mapping
+                for fase, (marca_inicio, marca_fin) in FASES.items():
+                    inicio, fin = marcas[marca_inicio], marcas[marca_fin]
+                    # Mientras el ítem no pasa a 'preparando', fecha_inicio es la de creación
+                    if fase == 'cola' and fila.estado in ('pendiente', 'en_cola'):
+                        continue
+                    if not inicio or not fin or fin < inicio or fin < desde:
+                        continue
+                    segundos = (fin - inicio).total_seconds()
+                    clave = (_hora(fin), fila.estacion or SIN_ESTACION, fila.producto_id, fase, _cubeta(segundos))
+                    acumulado[clave][0] += 1
+                    acumulado[clave][1] += segundos
+
+            db.session.execute(delete(TiempoCocina).where(TiempoCocina.hora >= desde))
+            if acumulado:
+                db.session.execute(insert(TiempoCocina), [
+                    {'hora': hora, 'estacion': estacion, 'producto_id': producto_id, 'fase': fase,
+                     'cubeta': cubeta, 'cantidad': cantidad, 'suma_segundos': suma}
+                    for (hora, estacion, producto_id, fase, cubeta), (cantidad, suma) in acumulado.items()
+                ])
+            db.session.commit()
+            return len(acumulado)
+
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Error recalculando tiempos de cocina")
+            raise e
+
+    @staticmethod
+    def purgar() -> int:
+        """Elimina histogramas más antiguos que COCINA_TIEMPOS_RETENCION_DIAS (tarea periódica)"""
+        try:
+            limite = datetime.utcnow() - timedelta(days=current_app.config.get('COCINA_TIEMPOS_RETENCION_DIAS', 90))
+            resultado = db.session.execute(delete(TiempoCocina).where(TiempoCocina.hora < _hora(limite)))
+            db.session.commit()
+            return resultado.rowcount
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error purgando tiempos de cocina")
+            return 0
@@ -1,6 +1,9 @@
 from sqlalchemy import or_
 from models.user import Usuario
 from werkzeug.security import check_password_hash
+import logging
+
+logger = logging.getLogger(__name__)
 
 class AuthService:
     """Servicio para manejar la lógica de autenticación."""
@@ -34,7 +37,7 @@ class AuthService:
         Invalida el token de sesión del usuario.
         """
         # Lógica para añadir el token a una lista negra o eliminarlo de la BD
-        print(f"Invalidando token: {token}")
+        logger.info("Invalidando token de sesión")
         return True
 
     @staticmethod
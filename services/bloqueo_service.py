@@ -1,11 +1,15 @@
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any, Tuple
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, select
 from models import db
 from models.bloqueo import Bloqueo
 from models.local import Mesa, Zona, Piso
 from services.audit_service import AuditService
 from services.error_handler import ErrorHandler, ValidationError, BusinessLogicError
+from services.mesa_estado_service import MesaEstadoService
+import logging
+
+logger = logging.getLogger(__name__)
 
 class BloqueoService:
     
@@ -23,9 +27,6 @@ class BloqueoService:
             fecha_inicio = data['fecha_inicio']
             fecha_fin = data['fecha_fin']
             
-            print(f"🔍 Fecha inicio recibida: {fecha_inicio}")
-            print(f"🔍 Fecha fin recibida: {fecha_fin}")
-            
             if isinstance(fecha_inicio, str):
                 fecha_inicio = datetime.fromisoformat(fecha_inicio.replace('Z', ''))
             if isinstance(fecha_fin, str):
@@ -36,9 +37,7 @@ class BloqueoService:
             
             # Comparar fechas (ambas son naive datetime ahora)
             now_utc = datetime.utcnow()
-            print(f"🔍 Fecha inicio procesada: {fecha_inicio}")
-            print(f"🔍 Fecha actual UTC: {now_utc}")
-            print(f"🔍 ¿Fecha inicio < ahora?: {fecha_inicio < now_utc}")
+            logger.debug("Bloqueo: inicio %s, fin %s, ahora UTC %s", fecha_inicio, fecha_fin, now_utc)
             
             if fecha_inicio < now_utc:
                 return None, {"error": "No se pueden crear bloqueos en fechas pasadas"}
@@ -85,25 +84,15 @@ class BloqueoService:
             # ✅ ACTUALIZAR ESTADO DE MESAS/ZONAS/PISOS INMEDIATAMENTE
             # Las mesas se marcan como 'fuera_servicio' cuando se crea el bloqueo
             # independientemente del estado del bloqueo (programado/activo)
+            # (salvo las ocupadas: los comensales sentados no se desalojan)
             if bloqueo.mesa_id:
-                mesa = Mesa.query.get(bloqueo.mesa_id)
-                if mesa:
-                    mesa.estado = 'fuera_servicio'  # Mesa bloqueada
-                    db.session.add(mesa)
+                BloqueoService._bloquear_mesa(bloqueo.mesa_id)
             elif bloqueo.zona_id:
                 # Si es una zona entera, marcar todas las mesas como fuera de servicio
-                mesas_zona = Mesa.query.filter_by(zona_id=bloqueo.zona_id).all()
-                for mesa in mesas_zona:
-                    mesa.estado = 'fuera_servicio'
-                    db.session.add(mesa)
+                BloqueoService._bloquear_zona(bloqueo.zona_id)
             elif bloqueo.piso_id:
                 # Si es un piso entero, marcar todas las mesas como fuera de servicio
-                zonas_piso = Zona.query.filter_by(piso_id=bloqueo.piso_id).all()
-                for zona in zonas_piso:
-                    mesas_zona = Mesa.query.filter_by(zona_id=zona.id).all()
-                    for mesa in mesas_zona:
-                        mesa.estado = 'fuera_servicio'
-                        db.session.add(mesa)
+                BloqueoService._bloquear_piso(bloqueo.piso_id)
 
             db.session.commit()
             
@@ -411,53 +400,42 @@ class BloqueoService:
                 BloqueoService._bloquear_piso(bloqueo.piso_id)
 
         except Exception as e:
-            print(f"Error actualizando estados de ubicaciones: {str(e)}")
+            logger.exception("Error actualizando estados de ubicaciones")
 
     @staticmethod
     def _liberar_mesa(mesa_id: int):
-        """Liberar una mesa específica"""
-        mesa = Mesa.query.get(mesa_id)
-        if mesa:
-            mesa.estado = 'disponible'
-            db.session.add(mesa)
+        """Liberar una mesa específica (si sigue fuera de servicio)"""
+        MesaEstadoService.transicionar_varias(Mesa.id == mesa_id, 'disponible', desde=('fuera_servicio',), motivo='bloqueo')
 
     @staticmethod
     def _liberar_zona(zona_id: int):
         """Liberar todas las mesas de una zona"""
-        mesas = Mesa.query.filter_by(zona_id=zona_id).all()
-        for mesa in mesas:
-            mesa.estado = 'disponible'
-            db.session.add(mesa)
+        MesaEstadoService.transicionar_varias(Mesa.zona_id == zona_id, 'disponible', desde=('fuera_servicio',), motivo='bloqueo')
 
     @staticmethod
     def _liberar_piso(piso_id: int):
         """Liberar todas las mesas de un piso"""
-        zonas = Zona.query.filter_by(piso_id=piso_id).all()
-        for zona in zonas:
-            BloqueoService._liberar_zona(zona.id)
+        MesaEstadoService.transicionar_varias(
+            Mesa.zona_id.in_(select(Zona.id).where(Zona.piso_id == piso_id)), 'disponible',
+            desde=('fuera_servicio',), motivo='bloqueo'
+        )
 
     @staticmethod
     def _bloquear_mesa(mesa_id: int):
         """Bloquear una mesa específica"""
-        mesa = Mesa.query.get(mesa_id)
-        if mesa:
-            mesa.estado = 'fuera_servicio'
-            db.session.add(mesa)
+        MesaEstadoService.transicionar_varias(Mesa.id == mesa_id, 'fuera_servicio', motivo='bloqueo')
 
     @staticmethod
     def _bloquear_zona(zona_id: int):
         """Bloquear todas las mesas de una zona"""
-        mesas = Mesa.query.filter_by(zona_id=zona_id).all()
-        for mesa in mesas:
-            mesa.estado = 'fuera_servicio'
-            db.session.add(mesa)
+        MesaEstadoService.transicionar_varias(Mesa.zona_id == zona_id, 'fuera_servicio', motivo='bloqueo')
 
     @staticmethod
     def _bloquear_piso(piso_id: int):
         """Bloquear todas las mesas de un piso"""
-        zonas = Zona.query.filter_by(piso_id=piso_id).all()
-        for zona in zonas:
-            BloqueoService._bloquear_zona(zona.id)
+        MesaEstadoService.transicionar_varias(
+            Mesa.zona_id.in_(select(Zona.id).where(Zona.piso_id == piso_id)), 'fuera_servicio', motivo='bloqueo'
+        )
 
     @staticmethod
     def check_conflictos_reservas(mesa_id: Optional[int], zona_id: Optional[int],
@@ -0,0 +1,335 @@
+"""
+Búsqueda de productos del menú con índice invertido en memoria.
+
+Indexa nombre, etiquetas, ingredientes, descripción y nombre de categoría (con pesos
+decrecientes) normalizados sin tildes ni mayúsculas, sin palabras vacías y con el
+plural simple en -s recortado. Cada término de la consulta debe coincidir (AND) de
+forma exacta, por prefijo (el último término, para buscar mientras se escribe) o con
+errores de tipeo: distancia de edición 1 para términos de 4 a 7 letras y 2 desde 8,
+resuelta con un diccionario de borrados (SymSpell) en lugar de recorrer el vocabulario.
+
+Cada proceso mantiene su índice. Se construye completo en la primera búsqueda y se
+actualiza por incrementos: cada INDICE_BUSQUEDA_VERIFICACION segundos (o en la búsqueda
+siguiente a una escritura de productos en este proceso) se compara COUNT/MAX(actualizado_en)
+de producto y se reindexan solo los productos modificados. Cada
+INDICE_BUSQUEDA_RECONSTRUCCION segundos se reconstruye completo (cambios de categorías).
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db
+from models.menu import Categoria, Producto
+
+_TERMINO = re.compile(r'[a-z0-9]+')
+
+PALABRAS_VACIAS = frozenset(
+    'a al con de del e el en la las lo los o para por sin su sus un una unos unas y'.split()
+)
+
+PESOS_CAMPOS = (
+    ('nombre', 3.0),
+    ('etiquetas', 2.0),
+    ('ingredientes', 1.5),
+    ('categoria_nombre', 1.0),
+    ('descripcion', 1.0),
+)
+
+FACTOR_EXACTO = 1.0
+FACTOR_PREFIJO = 0.8
+FACTOR_APROXIMADO = 0.6
+MAX_EXPANSIONES_PREFIJO = 100
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas y sin tildes ni diéresis (ñ -> n)."""
+    texto = unicodedata.normalize('NFKD', texto or '').lower()
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _raiz(termino: str) -> str:
+    # Plural simple: 'ceviches' -> 'ceviche'; 'camarones' -> 'camarone' queda a distancia 1 de 'camaron'
+    if len(termino) > 3 and termino.endswith('s') and not termino.endswith('ss'):
+        return termino[:-1]
+    return termino
+
+
+def terminos(texto: Optional[str], conservar_ultimo: bool = False) -> List[str]:
+    """Términos indexables de un texto; conservar_ultimo no descarta el último ('su' -> 'suspiro')."""
+    palabras = _TERMINO.findall(normalizar(texto))
+    return [
+        _raiz(t) for i, t in enumerate(palabras)
+        if (t not in PALABRAS_VACIAS and (len(t) > 1 or t.isdigit())) or (conservar_ultimo and i == len(palabras) - 1)
+    ]
+
+
+def _max_distancia(termino: str) -> int:
+    if len(termino) < 4:
+        return 0
+    return 1 if len(termino) < 8 else 2
+
+
+def _borrados(termino: str, distancia: int) -> Set[str]:
+    """El término y todas sus variantes con hasta `distancia` letras borradas."""
+    variantes = {termino}
+    frontera = {termino}
+    for _ in range(distancia):
+        frontera = {p[:i] + p[i + 1:] for p in frontera if len(p) > 1 for i in range(len(p))}
+        variantes |= frontera
+    return variantes
+
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """Damerau-Levenshtein (transposiciones adyacentes); devuelve maximo + 1 si lo supera."""
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior2, anterior = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if anterior2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                actual[j] = min(actual[j], anterior2[j - 2] + 1)
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior2, anterior = anterior, actual
+    return anterior[len(b)]
+
+
+class IndiceProductos:
+    """Índice invertido de productos con diccionario de borrados para errores de tipeo."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._terminos_doc: Dict[int, Dict[str, float]] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._borrados: Dict[str, Set[str]] = {}
+        self._vocabulario: Optional[List[str]] = None
+
+        # Estado de sincronización con la base (lo gestiona BusquedaProductoService)
+        self.construido_en: Optional[float] = None
+        self.verificado_en = 0.0
+        self.version: Optional[tuple] = None
+        self.cambios_locales = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    @property
+    def ids(self) -> Set[int]:
+        return set(self._docs)
+
+    # --- Escritura (con el lock tomado) ---
+
+    def _agregar_termino(self, termino: str, producto_id: int, peso: float):
+        postings = self._postings.get(termino)
+        if postings is None:
+            postings = self._postings[termino] = {}
+            for variante in _borrados(termino, _max_distancia(termino)):
+                self._borrados.setdefault(variante, set()).add(termino)
+            self._vocabulario = None
+        postings[producto_id] = peso
+
+    def _quitar(self, producto_id: int):
+        self._docs.pop(producto_id, None)
+        for termino in self._terminos_doc.pop(producto_id, {}):
+            postings = self._postings.get(termino)
+            if postings is None:
+                continue
+            postings.pop(producto_id, None)
+            if not postings:
+                del self._postings[termino]
+                for variante in _borrados(termino, _max_distancia(termino)):
+                    terminos_variante = self._borrados.get(variante)
+                    if terminos_variante is not None:
+                        terminos_variante.discard(termino)
+                        if not terminos_variante:
+                            del self._borrados[variante]
+                self._vocabulario = None
+
+    def _indexar(self, doc: Dict[str, Any]):
+        producto_id = doc['id']
+        self._quitar(producto_id)
+        pesos: Dict[str, float] = {}
+        for campo, peso in PESOS_CAMPOS:
+            for termino in terminos(doc.get(campo)):
+                pesos[termino] = max(pesos.get(termino, 0.0), peso)
+        self._docs[producto_id] = {k: v for k, v in doc.items() if k not in ('ingredientes', 'descripcion')}
+        self._terminos_doc[producto_id] = pesos
+        for termino, peso in pesos.items():
+            self._agregar_termino(termino, producto_id, peso)
+
+    def actualizar(self, docs: Iterable[Dict[str, Any]], eliminados: Iterable[int] = ()):
+        with self._lock:
+            for producto_id in eliminados:
+                self._quitar(producto_id)
+            for doc in docs:
+                self._indexar(doc)
+
+    def reemplazar(self, docs: Iterable[Dict[str, Any]]):
+        """Construye un índice nuevo aparte y lo intercambia (las búsquedas no esperan)."""
+        nuevo = IndiceProductos()
+        for doc in docs:
+            nuevo._indexar(doc)
+        with self._lock:
+            self._docs, self._terminos_doc = nuevo._docs, nuevo._terminos_doc
+            self._postings, self._borrados = nuevo._postings, nuevo._borrados
+            self._vocabulario = None
+
+    # --- Lectura ---
+
+    def _coincidencias(self, termino: str, prefijo: bool) -> Dict[int, float]:
+        """producto_id -> puntaje del término de la consulta (con el lock tomado)."""
+        candidatos: Dict[str, float] = {}
+        if termino in self._postings:
+            candidatos[termino] = FACTOR_EXACTO
+
+        if prefijo:
+            if self._vocabulario is None:
+                self._vocabulario = sorted(self._postings)
+            i = bisect_left(self._vocabulario, termino)
+            for termino_indice in self._vocabulario[i:i + MAX_EXPANSIONES_PREFIJO]:
+                if not termino_indice.startswith(termino):
+                    break
+                candidatos.setdefault(termino_indice, FACTOR_PREFIJO)
+
+        maximo = _max_distancia(termino)
+        if maximo:
+            vistos = set()
+            for variante in _borrados(termino, maximo):
+                for termino_indice in self._borrados.get(variante, ()):
+                    if termino_indice in candidatos or termino_indice in vistos:
+                        continue
+                    vistos.add(termino_indice)
+                    if distancia_edicion(termino, termino_indice, maximo) <= maximo:
+                        candidatos[termino_indice] = FACTOR_APROXIMADO
+
+        puntajes: Dict[int, float] = {}
+        for termino_indice, factor in candidatos.items():
+            for producto_id, peso in self._postings[termino_indice].items():
+                puntaje = peso * factor
+                if puntaje > puntajes.get(producto_id, 0.0):
+                    puntajes[producto_id] = puntaje
+        return puntajes
+
+    def buscar(self, consulta: str, limite: int = 20, solo_disponibles: bool = True,
+               categoria_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        # El último término se completa por prefijo salvo que la consulta termine en espacio
+        prefijo_ultimo = not consulta[-1:].isspace()
+        consulta_terminos = terminos(consulta, conservar_ultimo=prefijo_ultimo)
+        if not consulta_terminos:
+            return []
+
+        with self._lock:
+            total: Optional[Dict[int, float]] = None
+            for posicion, termino in enumerate(consulta_terminos):
+                puntajes = self._coincidencias(termino, prefijo_ultimo and posicion == len(consulta_terminos) - 1)
+                if total is None:
+                    total = puntajes
+                else:
+                    total = {pid: total[pid] + p for pid, p in puntajes.items() if pid in total}
+                if not total:
+                    return []
+
+            resultados = []
+            for producto_id, puntaje in total.items():
+                doc = self._docs[producto_id]
+                if solo_disponibles and not doc['disponible']:
+                    continue
+                if categoria_id is not None and doc['categoria_id'] != categoria_id:
+                    continue
+                resultados.append((puntaje + (0.5 if doc['es_favorito'] else 0.0), doc))
+
+        resultados.sort(key=lambda r: (-r[0], r[1]['nombre']))
+        return [{**doc, 'puntaje': round(puntaje, 3)} for puntaje, doc in resultados[:limite]]
+
+
+indice_productos = IndiceProductos()
+
+
+class BusquedaProductoService:
+    """Servicio de búsqueda de productos sobre el índice en memoria del proceso"""
+
+    @staticmethod
+    def _documentos(desde=None, ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        consulta = select(
+            Producto.id, Producto.nombre, Producto.descripcion, Producto.precio, Producto.categoria_id,
+            Categoria.nombre.label('categoria_nombre'), Producto.tipo_estacion, Producto.ingredientes,
+            Producto.etiquetas, Producto.disponible, Producto.es_favorito, Producto.imagen_url,
+            Producto.tiempo_preparacion
+        ).outerjoin(Categoria, Categoria.id == Producto.categoria_id)
+        if desde is not None:
+            consulta = consulta.where(Producto.actualizado_en >= desde)
+        if ids is not None:
+            consulta = consulta.where(Producto.id.in_(list(ids)))
+        return [dict(fila._mapping) for fila in db.session.execute(consulta)]
+
+    @staticmethod
+    def _version() -> tuple:
+        return tuple(db.session.execute(select(func.count(Producto.id), func.max(Producto.actualizado_en))).one())
+
+    @staticmethod
+    def sincronizar(forzar: bool = False):
+        """Pone al día el índice del proceso con la tabla producto"""
+        indice = indice_productos
+        ahora = monotonic()
+        reconstruccion = current_app.config.get('INDICE_BUSQUEDA_RECONSTRUCCION', 600)
+
+        if forzar or indice.construido_en is None or ahora - indice.construido_en > reconstruccion:
+            version = BusquedaProductoService._version()
+            indice.reemplazar(BusquedaProductoService._documentos())
+            indice.version, indice.construido_en, indice.verificado_en = version, ahora, ahora
+            indice.cambios_locales = False
+            return
+
+        if not indice.cambios_locales and ahora - indice.verificado_en < current_app.config.get('INDICE_BUSQUEDA_VERIFICACION', 5):
+            return
+
+        indice.cambios_locales = False
+        indice.verificado_en = ahora
+        version = BusquedaProductoService._version()
+        if version == indice.version:
+            return
+
+        # actualizado_en tiene resolución de segundos: >= re-indexa los del último segundo visto
+        marca = indice.version[1] if indice.version else None
+        modificados = BusquedaProductoService._documentos(desde=marca) if marca is not None else BusquedaProductoService._documentos()
+        indice.actualizar(modificados)
+        eliminados = ()
+        if version[0] != len(indice):
+            eliminados = indice.ids - set(db.session.execute(select(Producto.id)).scalars())
+            indice.actualizar((), eliminados)
+        indice.version = version
+
+    @staticmethod
+    def registrar_cambio(producto_id: Optional[int] = None):
+        """
+        Escritura de productos en este proceso: reindexa el producto (o fuerza la
+        verificación en la próxima búsqueda si no se conoce cuál cambió)
+        """
+        if indice_productos.construido_en is None:
+            return
+        if producto_id is not None:
+            docs = BusquedaProductoService._documentos(ids=[producto_id])
+            indice_productos.actualizar(docs, eliminados=() if docs else (producto_id,))
+        indice_productos.cambios_locales = True
+
+    @staticmethod
+    def invalidar():
+        """Reconstrucción completa en la próxima búsqueda (p. ej. tras cambiar categorías)"""
+        indice_productos.construido_en = None
+
+    @staticmethod
+    def buscar(consulta: str, limite: int = 20, solo_disponibles: bool = True,
+               categoria_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Productos que coinciden con la consulta, ordenados por relevancia"""
+        BusquedaProductoService.sincronizar()
+        return indice_productos.buscar(consulta, limite, solo_disponibles, categoria_id)
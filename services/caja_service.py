@@ -4,6 +4,8 @@ from models.user import Usuario
 from models.local import Mesa
 from datetime import datetime
 from decimal import Decimal
+from services.mesa_estado_service import MesaEstadoService
+from services.orden_service import OrdenService
 
 class CajaService:
     """Servicio para la lógica de negocio de la interfaz de caja."""
@@ -39,42 +41,8 @@ class CajaService:
 
     @staticmethod
     def procesar_pago(orden_id, metodo, monto=None):
-        """Procesa el pago de una orden"""
-        try:
-            orden = Orden.query.get(orden_id)
-            if not orden:
-                raise ValueError("Orden no encontrada")
-
-            if orden.estado != 'servida':
-                raise ValueError("Solo se pueden pagar órdenes servidas")
-
-            # Usar monto de la orden si no se especifica
-            monto_pago = monto or orden.monto_total
-
-            # Crear registro de pago
-            pago = Pago(
-                orden_id=orden_id,
-                monto=Decimal(str(monto_pago)),
-                metodo=metodo,
-                estado='pagado'
-            )
-
-            db.session.add(pago)
-
-            # Marcar orden como pagada
-            orden.estado = 'pagada'
-
-            # Liberar mesa
-            if orden.mesa:
-                orden.mesa.estado = 'disponible'
-
-            db.session.commit()
-
-            return pago
-
-        except Exception as e:
-            db.session.rollback()
-            raise e
+        """Procesa el pago de una orden (mismo comando que OrdenService.procesar_pago)"""
+        return OrdenService.procesar_pago(orden_id, metodo, monto)
 
     @staticmethod
     def obtener_pagos_activos():
@@ -116,15 +84,18 @@ class CajaService:
             if not pago:
                 raise ValueError("Pago no encontrado")
 
+            # Bloquear la orden antes de validar: pagos y anulaciones de una misma orden
+            # se serializan sobre su fila, y el pago se relee tras obtener el bloqueo
+            try:
+                orden = OrdenService._bloquear_orden(pago.orden_id)
+            except ValueError:
+                raise ValueError("La orden asociada al pago no existe")
+            db.session.refresh(pago)
+
             # Validar que el pago esté en estado pagado
             if pago.estado != 'pagado':
                 raise ValueError("Solo se pueden anular pagos que estén en estado 'pagado'")
 
-            # Validar que la orden existe
-            orden = Orden.query.get(pago.orden_id)
-            if not orden:
-                raise ValueError("La orden asociada al pago no existe")
-
             # Validar que no haya nuevos pedidos/items después del pago
             # (Esto previene fraudes por modificación de pedidos después del pago)
             if orden.actualizado_en > pago.fecha:
@@ -143,9 +114,9 @@ class CajaService:
             # Revertir estado de la orden a servida
             orden.estado = 'servida'
 
-            # Marcar mesa como ocupada nuevamente
+            # Marcar mesa como ocupada nuevamente; falla si ya se sentó otro grupo
             if orden.mesa:
-                orden.mesa.estado = 'ocupada'
+                MesaEstadoService.transicionar(orden.mesa, 'ocupada', desde=('disponible',), motivo='pago_anulado')
 
             db.session.commit()
 
@@ -1,15 +1,57 @@
 from models.menu import Categoria, Producto
 from models import db
 from services.error_handler import ErrorHandler, ValidationError, BusinessLogicError
+from flask import current_app
+from sqlalchemy import func, select
+from threading import Lock
+from time import monotonic
 from typing import List, Dict, Any, Optional
 
+# Mapa id -> categoría serializada que comparte la serialización de productos
+# (Producto.to_dict). Se invalida con las escrituras de categorías y productos de
+# este proceso; los demás workers lo refrescan tras CATEGORIAS_CACHE_TTL segundos.
+_mapa_categorias: Dict[str, Any] = {'mapa': None, 'expira': 0.0}
+_mapa_lock = Lock()
+
 class CategoriaService:
+    @staticmethod
+    def _consultar_categorias(categoria_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Categorías con su cantidad de productos en una sola consulta (GROUP BY en subconsulta)"""
+        conteos = select(
+            Producto.categoria_id,
+            func.count(Producto.id).label('cantidad')
+        ).group_by(Producto.categoria_id).subquery()
+
+        query = db.session.query(Categoria, func.coalesce(conteos.c.cantidad, 0)).outerjoin(
+            conteos, conteos.c.categoria_id == Categoria.id
+        )
+        if categoria_id is not None:
+            query = query.filter(Categoria.id == categoria_id)
+        return [categoria.to_dict(cantidad_productos=cantidad) for categoria, cantidad in query.order_by(Categoria.id).all()]
+
+    @staticmethod
+    def mapa_categorias() -> Dict[int, Dict[str, Any]]:
+        """Mapa id -> categoría serializada, en caché del proceso"""
+        ahora = monotonic()
+        mapa = _mapa_categorias['mapa']
+        if mapa is not None and ahora < _mapa_categorias['expira']:
+            return mapa
+        mapa = {categoria['id']: categoria for categoria in CategoriaService._consultar_categorias()}
+        with _mapa_lock:
+            _mapa_categorias['mapa'] = mapa
+            _mapa_categorias['expira'] = ahora + current_app.config.get('CATEGORIAS_CACHE_TTL', 30)
+        return mapa
+
+    @staticmethod
+    def invalidar_mapa():
+        with _mapa_lock:
+            _mapa_categorias['mapa'] = None
+
     @staticmethod
     def get_categorias() -> List[Dict[str, Any]]:
         """Obtener todas las categorías"""
         try:
-            categorias = Categoria.query.all()
-            return [categoria.to_dict() for categoria in categorias]
+            return CategoriaService._consultar_categorias()
         except Exception as e:
             return ErrorHandler.handle_service_error(e, 'obtener categorías')
 
@@ -17,10 +59,8 @@ class CategoriaService:
     def get_categoria_by_id(categoria_id: int) -> Optional[Dict[str, Any]]:
         """Obtener una categoría por ID"""
         try:
-            categoria = Categoria.query.get(categoria_id)
-            if not categoria:
-                return None
-            return categoria.to_dict()
+            categorias = CategoriaService._consultar_categorias(categoria_id)
+            return categorias[0] if categorias else None
         except Exception as e:
             return ErrorHandler.handle_service_error(e, 'obtener categoría')
 
@@ -51,8 +91,9 @@ class CategoriaService:
             
             db.session.add(categoria)
             db.session.commit()
+            CategoriaService.invalidar_mapa()
             
-            return True, categoria.to_dict()
+            return True, categoria.to_dict(cantidad_productos=0)
             
         except (ValidationError, BusinessLogicError) as e:
             return False, {'error': str(e)}
@@ -98,6 +139,7 @@ class CategoriaService:
                 categoria.activo = data['activo']
 
             db.session.commit()
+            CategoriaService.invalidar_mapa()
 
             return True, categoria.to_dict()
             
@@ -121,6 +163,7 @@ class CategoriaService:
             
             db.session.delete(categoria)
             db.session.commit()
+            CategoriaService.invalidar_mapa()
             
             return True, {'message': 'Categoría eliminada exitosamente'}
             
@@ -137,7 +180,8 @@ class CategoriaService:
             if not categoria:
                 return None
             
-            categoria_data = categoria.to_dict()
+            productos = Producto.query.filter_by(categoria_id=categoria_id).all()
+            categoria_data = categoria.to_dict(cantidad_productos=len(productos))
             categoria_data['productos'] = [
                 {
                     'id': producto.id,
@@ -146,7 +190,7 @@ class CategoriaService:
                     'disponible': producto.disponible,
                     'tipo_estacion': producto.tipo_estacion
                 }
-                for producto in categoria.productos
+                for producto in productos
             ]
             
             return categoria_data
@@ -4,7 +4,11 @@ from models.local import Mesa
 from collections import defaultdict
 from sqlalchemy import asc, and_
 from datetime import datetime, timedelta
+from math import ceil
 from typing import List, Dict, Any, Optional
+from services.orden_service import OrdenService
+from services.analitica_cocina_service import AnaliticaCocinaService
+from services.estimador_cocina_service import estimador_cocina
 
 class CocinaService:
     """Servicio para la lógica de negocio de la interfaz de cocina."""
@@ -45,7 +49,8 @@ class CocinaService:
     def get_mesas_with_items_by_station(estacion: str) -> List[Dict[str, Any]]:
         """
         Devuelve las mesas que tienen ítems activos para una estación específica,
-        agrupadas con sus ítems y información de prioridad.
+        agrupadas con sus ítems, la hora estimada de listo de cada uno y su prioridad
+        según el retraso previsto (ver EstimadorCocina). Las más urgentes van primero.
         """
         try:
             # Obtener ítems activos de la estación
@@ -55,6 +60,7 @@ class CocinaService:
                     ItemOrden.estado.in_(['en_cola', 'preparando', 'listo'])
                 )
             ).order_by(asc(ItemOrden.creado_en)).all()
+            estimaciones = estimador_cocina.estimar(items)
 
             # Agrupar por mesa
             mesas_dict = {}
@@ -72,17 +78,25 @@ class CocinaService:
                         "piso_nombre": mesa.zona.piso.nombre if mesa and mesa.zona and mesa.zona.piso else 'Llevar',
                         "items": [],
                         "tiempo_total_espera": 0,
-                        "prioridad_maxima": 'baja'
+                        "prioridad_maxima": 'baja',
+                        "lista_en_minutos": 0,
+                        "retraso_previsto": None
                     }
                 
                 # Calcular tiempo de espera del item
                 tiempo_espera = CocinaService._calcular_tiempo_espera_item(item)
                 mesas_dict[mesa_id]["tiempo_total_espera"] += tiempo_espera
                 
-                # Determinar prioridad del item
-                prioridad_item = CocinaService._determinar_prioridad_item(item, tiempo_espera)
+                # Prioridad y hora de listo estimadas con la carga actual de la estación
+                estimacion = estimaciones[item.id]
+                prioridad_item = estimacion['prioridad']
+                minutos_restantes = ceil(estimacion['restante'] / 60)
+                retraso = round(estimacion['retraso'] / 60, 1)
                 if CocinaService._es_prioridad_mayor(prioridad_item, mesas_dict[mesa_id]["prioridad_maxima"]):
                     mesas_dict[mesa_id]["prioridad_maxima"] = prioridad_item
+                mesas_dict[mesa_id]["lista_en_minutos"] = max(mesas_dict[mesa_id]["lista_en_minutos"], minutos_restantes)
+                if mesas_dict[mesa_id]["retraso_previsto"] is None or retraso > mesas_dict[mesa_id]["retraso_previsto"]:
+                    mesas_dict[mesa_id]["retraso_previsto"] = retraso
                 
                 # Agregar item a la mesa
                 item_data = {
@@ -93,15 +107,18 @@ class CocinaService:
                     "estado": item.estado,
                     "tiempo_espera": tiempo_espera,
                     "prioridad": prioridad_item,
+                    "listo_estimado": estimacion['listo_estimado'].isoformat(),
+                    "minutos_restantes": minutos_restantes,
+                    "retraso_previsto": retraso,
                     "creado_en": item.creado_en.isoformat() if item.creado_en else None,
                     "cliente_nombre": item.orden.cliente_nombre if item.orden else None,
                     "notas": item.notas
                 }
                 mesas_dict[mesa_id]["items"].append(item_data)
             
-            # Convertir a lista y ordenar por prioridad
+            # Convertir a lista y ordenar por prioridad (y retraso previsto), más urgentes primero
             mesas = list(mesas_dict.values())
-            mesas.sort(key=lambda x: CocinaService._get_prioridad_orden(x["prioridad_maxima"]))
+            mesas.sort(key=lambda x: (-CocinaService._get_prioridad_orden(x["prioridad_maxima"]), -x["retraso_previsto"]))
             
             return mesas
         except Exception as e:
@@ -118,21 +135,6 @@ class CocinaService:
         tiempo_transcurrido = datetime.utcnow() - item.creado_en
         return int(tiempo_transcurrido.total_seconds() / 60)
 
-    @staticmethod
-    def _determinar_prioridad_item(item: ItemOrden, tiempo_espera: int) -> str:
-        """
-        Determina la prioridad de un ítem basado en tiempo de espera y otros factores.
-        """
-        # Prioridad basada en tiempo de espera
-        if tiempo_espera >= 30:  # 30+ minutos
-            return 'urgente'
-        elif tiempo_espera >= 20:  # 20+ minutos
-            return 'alta'
-        elif tiempo_espera >= 10:  # 10+ minutos
-            return 'media'
-        else:
-            return 'baja'
-
     @staticmethod
     def _es_prioridad_mayor(prioridad1: str, prioridad2: str) -> bool:
         """
@@ -151,62 +153,27 @@ class CocinaService:
 
     @staticmethod
     def update_item_status(item_id: int, nuevo_estado: str):
-        """Actualiza el estado de un ítem de orden."""
-        try:
-            item = ItemOrden.query.get(item_id)
-            if not item:
-                return None, {"error": "Ítem no encontrado."}
-            
-            # Validar que el nuevo estado sea uno de los permitidos
-            estados_validos = ['en_cola', 'preparando', 'listo', 'servido', 'cancelado']
-            if nuevo_estado not in estados_validos:
-                return None, {"error": "Estado no válido."}
-
-            item.estado = nuevo_estado
-            item.actualizado_en = datetime.utcnow()
-            db.session.commit()
-            
-            # Verificar si todos los ítems de la orden están listos
-            if nuevo_estado == 'listo':
-                CocinaService._verificar_orden_completa(item.orden_id)
-            
-            return item, None
-        except Exception as e:
-            db.session.rollback()
-            return None, {"error": f"Error actualizando ítem: {str(e)}"}
-
-    @staticmethod
-    def _verificar_orden_completa(orden_id: int):
         """
-        Verifica si todos los ítems de una orden están listos y actualiza el estado de la orden.
+        Actualiza el estado de un ítem de orden. El estado de la orden (lista cuando
+        todos sus ítems están listos) se ajusta en la misma transacción.
         """
-        try:
-            orden = Orden.query.get(orden_id)
-            if not orden:
-                return
+        # Validar que el nuevo estado sea uno de los permitidos
+        estados_validos = ['en_cola', 'preparando', 'listo', 'servido', 'cancelado']
+        if nuevo_estado not in estados_validos:
+            return None, {"error": "Estado no válido."}
 
-            # Contar ítems por estado
-            items_activos = ItemOrden.query.filter(
-                and_(
-                    ItemOrden.orden_id == orden_id,
-                    ItemOrden.estado.in_(['en_cola', 'preparando', 'listo'])
-                )
-            ).all()
-
-            items_listos = [item for item in items_activos if item.estado == 'listo']
-            
-            # Si todos los ítems están listos, marcar orden como lista para servir
-            if len(items_listos) == len(items_activos) and len(items_activos) > 0:
-                orden.estado = 'listo_para_servir'
-                orden.actualizado_en = datetime.utcnow()
-                db.session.commit()
+        try:
+            return OrdenService.actualizar_estado_item(item_id, nuevo_estado), None
+        except ValueError as e:
+            return None, {"error": str(e)}
         except Exception as e:
-            db.session.rollback()
+            return None, {"error": f"Error actualizando ítem: {str(e)}"}
 
     @staticmethod
     def get_estadisticas_estacion(estacion: str) -> Dict[str, Any]:
         """
-        Obtiene estadísticas de una estación de cocina.
+        Obtiene estadísticas de una estación de cocina. Los tiempos de las últimas 24 horas
+        salen de los histogramas de AnaliticaCocinaService, sin cargar los ítems.
         """
         try:
             # Items por estado
@@ -217,32 +184,26 @@ class CocinaService:
                 ItemOrden.estacion == estacion
             ).group_by(ItemOrden.estado).all()
 
-            # Tiempo promedio de preparación
-            items_completados = ItemOrden.query.filter(
-                and_(
-                    ItemOrden.estacion == estacion,
-                    ItemOrden.estado == 'servido',
-                    ItemOrden.creado_en >= datetime.utcnow() - timedelta(hours=24)
-                )
-            ).all()
+            tiempos = AnaliticaCocinaService.resumen_estacion(estacion, horas=24)
+            preparacion = tiempos.get('preparacion') or {}
+            pase = tiempos.get('pase') or {}
 
-            tiempo_promedio = 0
-            if items_completados:
-                tiempos = []
-                for item in items_completados:
-                    if item.creado_en and item.actualizado_en:
-                        tiempo = (item.actualizado_en - item.creado_en).total_seconds() / 60
-                        tiempos.append(tiempo)
-                
-                if tiempos:
-                    tiempo_promedio = sum(tiempos) / len(tiempos)
+            # Mesas con ítems de la estación servidos en las últimas 24 horas
+            mesas_activas = db.session.query(db.func.count(db.distinct(Orden.mesa_id))).join(
+                ItemOrden, ItemOrden.orden_id == Orden.id
+            ).filter(
+                ItemOrden.estacion == estacion,
+                ItemOrden.estado == 'servido',
+                ItemOrden.fecha_servido >= datetime.utcnow() - timedelta(hours=24)
+            ).scalar()
 
             return {
                 "estacion": estacion,
                 "items_por_estado": {estado: count for estado, count in items_por_estado},
-                "tiempo_promedio_preparacion": round(tiempo_promedio, 2),
-                "items_completados_hoy": len(items_completados),
-                "mesas_activas": len(set(item.orden.mesa_id for item in items_completados if item.orden.mesa_id))
+                "tiempo_promedio_preparacion": round((preparacion.get('promedio') or 0) / 60, 2),
+                "items_completados_hoy": pase.get('cantidad', 0),
+                "mesas_activas": mesas_activas or 0,
+                "tiempos": tiempos
             }
         except Exception as e:
             return {
@@ -250,22 +211,27 @@ class CocinaService:
                 "items_por_estado": {},
                 "tiempo_promedio_preparacion": 0,
                 "items_completados_hoy": 0,
-                "mesas_activas": 0
+                "mesas_activas": 0,
+                "tiempos": {}
             }
 
     @staticmethod
     def get_items_urgentes(estacion: str) -> List[Dict[str, Any]]:
         """
-        Obtiene ítems urgentes (tiempo de espera > 20 minutos) de una estación.
+        Obtiene los ítems de una estación con prioridad alta o urgente según el retraso
+        previsto con la carga actual, los más retrasados primero.
         """
         try:
             items = ItemOrden.query.filter(
                 and_(
                     ItemOrden.estacion == estacion,
-                    ItemOrden.estado.in_(['en_cola', 'preparando']),
-                    ItemOrden.creado_en <= datetime.utcnow() - timedelta(minutes=20)
+                    ItemOrden.estado.in_(['en_cola', 'preparando'])
                 )
             ).order_by(asc(ItemOrden.creado_en)).all()
+            estimaciones = estimador_cocina.estimar(items)
+
+            urgentes = [item for item in items if estimaciones[item.id]['prioridad'] in ('alta', 'urgente')]
+            urgentes.sort(key=lambda item: -estimaciones[item.id]['retraso'])
 
             return [
                 {
@@ -274,9 +240,13 @@ class CocinaService:
                     "cantidad": item.cantidad,
                     "mesa_numero": item.orden.mesa.numero if item.orden.mesa else 'Llevar',
                     "tiempo_espera": CocinaService._calcular_tiempo_espera_item(item),
+                    "prioridad": estimaciones[item.id]['prioridad'],
+                    "listo_estimado": estimaciones[item.id]['listo_estimado'].isoformat(),
+                    "minutos_restantes": ceil(estimaciones[item.id]['restante'] / 60),
+                    "retraso_previsto": round(estimaciones[item.id]['retraso'] / 60, 1),
                     "cliente_nombre": item.orden.cliente_nombre if item.orden else None,
                     "creado_en": item.creado_en.isoformat() if item.creado_en else None
-                } for item in items
+                } for item in urgentes
             ]
         except Exception as e:
             return []
@@ -0,0 +1,132 @@
+"""
+Esquemas de serialización por modelo (ver services/serializacion.py).
+
+Las vistas 'default' reproducen los campos de los to_dict correspondientes,
+sin las relaciones, que se declaran aparte y se cargan por lote.
+"""
+from models import db
+from models.menu import Categoria, Producto, ProductoImagen, Ingrediente, TipoIngrediente, ProductoIngrediente
+from services.serializacion import Esquema, Relacion, valor, decimal, fecha
+
+
+class CategoriaEsquema(Esquema):
+    modelo = Categoria
+    campos = {
+        'id': valor('id'),
+        'nombre': valor('nombre'),
+        'descripcion': valor('descripcion'),
+        'icono': valor('icono'),
+        'color': valor('color'),
+        'activo': valor('activo'),
+        'cantidad_productos': lambda obj, ctx: ctx.get('conteos', {}).get(obj.id, 0),
+        'creado_en': fecha('creado_en'),
+        'actualizado_en': fecha('actualizado_en')
+    }
+    vistas = {
+        'resumen': ('id', 'nombre', 'icono', 'color', 'activo')
+    }
+
+    @classmethod
+    def preparar(cls, objetos, vista='default'):
+        if 'cantidad_productos' not in cls.campos_de(vista) or not objetos:
+            return {}
+        ids = [obj.id for obj in objetos]
+        conteos = db.session.query(Producto.categoria_id, db.func.count(Producto.id)).filter(
+            Producto.categoria_id.in_(ids)
+        ).group_by(Producto.categoria_id).all()
+        return {'conteos': dict(conteos)}
+
+
+class ProductoImagenEsquema(Esquema):
+    modelo = ProductoImagen
+    campos = {
+        'id': valor('id'),
+        'producto_id': valor('producto_id'),
+        'imagen_url': valor('imagen_url'),
+        'orden': valor('orden'),
+        'es_principal': valor('es_principal'),
+        'descripcion': valor('descripcion'),
+        'creado_en': fecha('creado_en')
+    }
+
+
+class ProductoEsquema(Esquema):
+    modelo = Producto
+    campos = {
+        'id': valor('id'),
+        'nombre': valor('nombre'),
+        'descripcion': valor('descripcion'),
+        'precio': decimal('precio', 0),
+        'categoria_id': valor('categoria_id'),
+        'tipo_estacion': valor('tipo_estacion'),
+        'tiempo_preparacion': valor('tiempo_preparacion'),
+        'nivel_picante': valor('nivel_picante'),
+        'ingredientes': valor('ingredientes'),
+        'etiquetas': valor('etiquetas'),
+        'disponible': valor('disponible'),
+        'stock': valor('stock'),
+        'alerta_stock': valor('alerta_stock'),
+        'es_favorito': valor('es_favorito'),
+        'imagen_url': valor('imagen_url'),
+        'creado_en': fecha('creado_en'),
+        'actualizado_en': fecha('actualizado_en')
+    }
+    vistas = {
+        'resumen': ('id', 'nombre', 'precio', 'categoria_id', 'tipo_estacion', 'disponible', 'imagen_url')
+    }
+    relaciones = {
+        'categoria': Relacion('CategoriaEsquema', 'categorias', fk='categoria_id'),
+        'imagenes': Relacion('ProductoImagenEsquema', 'imagenes', inversa='producto_id', orden='orden')
+    }
+
+
+class TipoIngredienteEsquema(Esquema):
+    modelo = TipoIngrediente
+    campos = {
+        'id': valor('id'),
+        'nombre': valor('nombre'),
+        'descripcion': valor('descripcion'),
+        'color': valor('color')
+    }
+
+
+class IngredienteEsquema(Esquema):
+    modelo = Ingrediente
+    campos = {
+        'id': valor('id'),
+        'nombre': valor('nombre'),
+        'descripcion': valor('descripcion'),
+        'stock': decimal('stock', 0.0),
+        'stock_minimo': decimal('stock_minimo', 0.0),
+        'unidad': valor('unidad'),
+        'precio_unitario': decimal('precio_unitario', 0.0),
+        'tipo_ingrediente_id': valor('tipo_ingrediente_id'),
+        'activo': valor('activo'),
+        'fecha_vencimiento': fecha('fecha_vencimiento'),
+        'proveedor': valor('proveedor'),
+        'codigo_barras': valor('codigo_barras'),
+        'ubicacion_almacen': valor('ubicacion_almacen'),
+        'ratio_stock': decimal('ratio_stock'),
+        'creado_en': fecha('creado_en'),
+        'actualizado_en': fecha('actualizado_en')
+    }
+    vistas = {
+        'resumen': ('id', 'nombre', 'stock', 'unidad', 'tipo_ingrediente_id', 'activo')
+    }
+    relaciones = {
+        'tipo': Relacion('TipoIngredienteEsquema', 'tipos_ingrediente', fk='tipo_ingrediente_id', anidado='tipo_ingrediente')
+    }
+
+
+class ProductoIngredienteEsquema(Esquema):
+    modelo = ProductoIngrediente
+    campos = {
+        'id': valor('id'),
+        'producto_id': valor('producto_id'),
+        'ingrediente_id': valor('ingrediente_id'),
+        'cantidad': decimal('cantidad', 0.0)
+    }
+    relaciones = {
+        'producto': Relacion('ProductoEsquema', 'productos', fk='producto_id'),
+        'ingrediente': Relacion('IngredienteEsquema', 'ingredientes', fk='ingrediente_id')
+    }
@@ -0,0 +1,255 @@
+"""
+Estimación de tiempos de preparación para priorizar la cocina.
+
+Una tarea periódica (COCINA_ESTIMADOR_INTERVALO) entrena un modelo pequeño con los
+histogramas de AnaliticaCocinaService de los últimos COCINA_ESTIMADOR_VENTANA_DIAS:
+
+- preparación por estación y producto: la mediana observada, acercada al valor previo
+  (Producto.tiempo_preparacion o, si falta, la mediana de la estación) cuando hay pocas
+  mediciones: (n * mediana + k * previo) / (n + k), con k = COCINA_ESTIMADOR_PESO_PREVIO;
+- cola típica de cada estación (mediana de la fase de cola);
+- capacidad de cada estación: ítems en preparación simultánea en sus horas de más trabajo
+  (percentil 90 de los segundos de preparación por hora, divididos por 3600).
+
+Con el modelo en memoria, la hora estimada de "listo" de los ítems activos sale de una
+simulación FIFO por estación con un heap de puestos: O(n log c) y sin consultas, así que
+se recalcula en cada actualización de la cola. El retraso previsto de un ítem (su hora
+estimada de listo frente a creado_en + cola típica + preparación estimada) define su
+prioridad.
+"""
+import heapq
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from math import ceil
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import current_app
+from sqlalchemy import select
+
+from models import db
+from models.menu import Producto
+from models.order import Orden, ItemOrden
+from services.analitica_cocina_service import AnaliticaCocinaService, SIN_ESTACION
+
+logger = logging.getLogger(__name__)
+
+PRIORIDADES = ('baja', 'media', 'alta', 'urgente')
+# Retraso previsto (minutos) a partir del cual un ítem sube a cada prioridad
+UMBRALES_RETRASO = (('urgente', 10), ('alta', 5), ('media', 2))
+# Ítems que todavía ocupan la cocina o esperan en ella
+ESTADOS_ITEM_COCINA = ('pendiente', 'en_cola', 'preparando', 'listo')
+ESTADOS_ORDEN_ABIERTA = ('pendiente', 'confirmada', 'preparando', 'lista', 'servida')
+
+
+def _config(clave: str, por_defecto):
+    return current_app.config.get(clave, por_defecto)
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class _Modelo:
+    """Duraciones y capacidades aprendidas (segundos), inmutable una vez construido."""
+    __slots__ = ('preparacion', 'previos', 'preparacion_estacion', 'cola', 'capacidad', 'mediciones',
+                 'entrenado_en', 'entrenado_en_utc')
+
+    def __init__(self, preparacion, previos, preparacion_estacion, cola, capacidad, mediciones):
+        self.preparacion: Dict[tuple, float] = preparacion
+        self.previos: Dict[int, float] = previos
+        self.preparacion_estacion: Dict[str, float] = preparacion_estacion
+        self.cola: Dict[str, float] = cola
+        self.capacidad: Dict[str, int] = capacidad
+        self.mediciones: int = mediciones
+        self.entrenado_en = monotonic()
+        self.entrenado_en_utc = datetime.utcnow()
+
+    def duracion(self, estacion: str, producto_id: int) -> float:
+        duracion = self.preparacion.get((estacion, producto_id))
+        if duracion is None:
+            duracion = self.previos.get(producto_id) or self.preparacion_estacion.get(estacion)
+        return duracion or _config('COCINA_TIEMPO_PREPARACION_DEFECTO', 10) * 60
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'entrenado_en': self.entrenado_en_utc.isoformat(),
+            'mediciones': self.mediciones,
+            'estaciones': {
+                estacion: {
+                    'preparacion_mediana': round(self.preparacion_estacion.get(estacion, 0), 1),
+                    'cola_tipica': round(self.cola.get(estacion, 0), 1),
+                    'capacidad': self.capacidad.get(estacion)
+                }
+                for estacion in sorted(set(self.preparacion_estacion) | set(self.capacidad))
+            },
+            'productos': [
+                {'estacion': estacion, 'producto_id': producto_id, 'preparacion_estimada': round(segundos, 1)}
+                for (estacion, producto_id), segundos in sorted(self.preparacion.items())
+            ]
+        }
+
+
+class EstimadorCocina:
+    """Modelo de tiempos en caché del proceso y simulación de la cola de cada estación."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._modelo: Optional[_Modelo] = None
+
+    def entrenar(self) -> _Modelo:
+        """Reconstruye el modelo desde los histogramas (tarea periódica; cuatro consultas)"""
+        horas = _config('COCINA_ESTIMADOR_VENTANA_DIAS', 14) * 24
+        peso = _config('COCINA_ESTIMADOR_PESO_PREVIO', 5)
+
+        por_estacion = AnaliticaCocinaService.histogramas('estacion', horas)
+        por_producto = AnaliticaCocinaService.histogramas('producto', horas)
+        por_hora = AnaliticaCocinaService.histogramas('hora', horas)
+        previos = {
+            producto_id: minutos * 60
+            for producto_id, minutos in db.session.execute(
+                select(Producto.id, Producto.tiempo_preparacion).where(Producto.tiempo_preparacion > 0)
+            )
+        }
+
+        preparacion_estacion, cola, mediciones = {}, {}, 0
+        for (estacion,), fases in por_estacion.items():
+            if 'preparacion' in fases:
+                preparacion_estacion[estacion] = fases['preparacion'].percentil(50)
+                mediciones += sum(fases['preparacion'].cantidades)
+            if 'cola' in fases:
+                cola[estacion] = fases['cola'].percentil(50)
+
+        preparacion = {}
+        for (estacion, producto_id, _), fases in por_producto.items():
+            histograma = fases.get('preparacion')
+            if histograma is None:
+                continue
+            n = sum(histograma.cantidades)
+            previo = previos.get(producto_id) or preparacion_estacion.get(estacion) or histograma.percentil(50)
+            preparacion[(estacion, producto_id)] = (n * histograma.percentil(50) + peso * previo) / (n + peso)
+
+        cargas = defaultdict(list)
+        for (estacion, _), fases in por_hora.items():
+            if 'preparacion' in fases:
+                cargas[estacion].append(sum(fases['preparacion'].sumas) / 3600)
+        capacidad = {estacion: max(1, ceil(_percentil(valores, 90))) for estacion, valores in cargas.items()}
+
+        modelo = _Modelo(preparacion, previos, preparacion_estacion, cola, capacidad, mediciones)
+        with self._lock:
+            self._modelo = modelo
+        return modelo
+
+    def modelo(self) -> _Modelo:
+        modelo = self._modelo
+        intervalo = _config('COCINA_ESTIMADOR_INTERVALO', 300)
+        # Sin tarea periódica (o si se detuvo) el modelo se entrena al usarlo
+        if modelo is None or (intervalo > 0 and monotonic() - modelo.entrenado_en > 2 * intervalo):
+            modelo = self.entrenar()
+        return modelo
+
+    def invalidar(self):
+        with self._lock:
+            self._modelo = None
+
+    def estimar(self, items: Iterable[Any], ahora: Optional[datetime] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Estima la hora de listo, el tiempo restante, el retraso previsto (segundos) y la
+        prioridad de cada ítem. `items` son ItemOrden o filas con los mismos atributos y
+        deben ser todos los ítems activos de sus estaciones: el orden de la cola depende
+        de los demás.
+        """
+        modelo = self.modelo()
+        ahora = ahora or datetime.utcnow()
+
+        por_estacion: Dict[str, List[Any]] = defaultdict(list)
+        for item in items:
+            por_estacion[item.estacion or SIN_ESTACION].append(item)
+
+        resultado = {}
+        for estacion, lista in por_estacion.items():
+            lista.sort(key=lambda i: (i.creado_en or ahora, i.id))
+            puestos: List[datetime] = []  # heap con el instante en que se libera cada puesto
+            en_cola = []
+            for item in lista:
+                duracion = modelo.duracion(estacion, item.producto_id)
+                if item.estado == 'listo':
+                    listo = item.fecha_listo or ahora
+                elif item.estado == 'preparando':
+                    inicio = item.fecha_inicio or ahora
+                    # Pasado lo previsto se espera que termine pronto, no en el pasado
+                    listo = max(inicio + timedelta(seconds=duracion), ahora + timedelta(seconds=0.1 * duracion))
+                    heapq.heappush(puestos, listo)
+                else:
+                    en_cola.append((item, duracion))
+                    continue
+                resultado[item.id] = self._evaluar(modelo, estacion, item, duracion, listo, ahora)
+
+            for _ in range(modelo.capacidad.get(estacion, _config('COCINA_CAPACIDAD_DEFECTO', 2)) - len(puestos)):
+                heapq.heappush(puestos, ahora)
+            for item, duracion in en_cola:
+                inicio = max(ahora, heapq.heappop(puestos))
+                listo = inicio + timedelta(seconds=duracion)
+                heapq.heappush(puestos, listo)
+                resultado[item.id] = self._evaluar(modelo, estacion, item, duracion, listo, ahora)
+        return resultado
+
+    @staticmethod
+    def _evaluar(modelo: _Modelo, estacion: str, item, duracion: float, listo: datetime,
+                 ahora: datetime) -> Dict[str, Any]:
+        esperado = (item.creado_en or ahora) + timedelta(seconds=modelo.cola.get(estacion, 0) + duracion)
+        retraso = (listo - esperado).total_seconds()
+        prioridad = 'baja'
+        for nivel, minutos in UMBRALES_RETRASO:
+            if retraso >= minutos * 60:
+                prioridad = nivel
+                break
+        return {
+            'listo_estimado': listo,
+            'restante': max(0.0, (listo - ahora).total_seconds()),
+            'retraso': retraso,
+            'prioridad': prioridad
+        }
+
+    def estimar_mesa(self, mesa_id: int) -> Dict[str, Any]:
+        """Cuándo estarán listos los ítems de las órdenes abiertas de una mesa"""
+        filas = db.session.execute(
+            select(
+                ItemOrden.id, ItemOrden.orden_id, ItemOrden.producto_id, ItemOrden.estacion, ItemOrden.estado,
+                ItemOrden.creado_en, ItemOrden.fecha_inicio, ItemOrden.fecha_listo, Orden.mesa_id
+            ).join(Orden, Orden.id == ItemOrden.orden_id).where(
+                ItemOrden.estado.in_(ESTADOS_ITEM_COCINA),
+                Orden.estado.in_(ESTADOS_ORDEN_ABIERTA)
+            )
+        ).all()
+        estaciones = {fila.estacion for fila in filas if fila.mesa_id == mesa_id}
+        estimaciones = self.estimar(fila for fila in filas if fila.estacion in estaciones)
+
+        ordenes: Dict[int, Dict[str, Any]] = {}
+        for fila in filas:
+            if fila.mesa_id != mesa_id:
+                continue
+            estimacion = estimaciones[fila.id]
+            orden = ordenes.setdefault(fila.orden_id, {'orden_id': fila.orden_id, 'lista_en_minutos': 0, 'items': []})
+            minutos = ceil(estimacion['restante'] / 60)
+            orden['lista_en_minutos'] = max(orden['lista_en_minutos'], minutos)
+            orden['items'].append({
+                'id': fila.id,
+                'producto_id': fila.producto_id,
+                'estado': fila.estado,
+                'listo_estimado': estimacion['listo_estimado'].isoformat(),
+                'minutos_restantes': minutos,
+                'prioridad': estimacion['prioridad']
+            })
+
+        return {
+            'mesa_id': mesa_id,
+            'lista_en_minutos': max((orden['lista_en_minutos'] for orden in ordenes.values()), default=0),
+            'ordenes': list(ordenes.values())
+        }
+
+
+estimador_cocina = EstimadorCocina()
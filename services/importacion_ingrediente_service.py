@@ -0,0 +1,281 @@
+"""
+Importación masiva de ingredientes y conciliación de conteos de inventario.
+
+Las filas se validan contra mapas de búsqueda precargados (nombres, códigos de barras
+y tipos) y se escriben en lotes con executemany, en una sola transacción.
+"""
+from models.menu import Ingrediente, TipoIngrediente
+from models import db
+from services.recepcion_ingrediente_service import RecepcionIngredienteService
+from sqlalchemy import insert, update
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, List, Dict, Any, Optional
+
+# Campos que se pueden importar y su tipo de conversión
+CAMPOS_TEXTO = {
+    'nombre': 100,
+    'descripcion': None,
+    'unidad': 20,
+    'proveedor': 100,
+    'codigo_barras': 50,
+    'ubicacion_almacen': 50
+}
+CAMPOS_NUMERICOS = {
+    'stock': 3,
+    'stock_minimo': 3,
+    'precio_unitario': 2
+}
+VALORES_VERDADEROS = {'1', 'true', 'si', 'sí', 'yes', 'x'}
+
+
+class FilaInvalida(Exception):
+    """Error de validación de una fila concreta del archivo importado"""
+    pass
+
+
+class ImportacionIngredienteService:
+    """Servicio para importar ingredientes en bloque y devolver un diff de conciliación."""
+
+    TAMANO_LOTE = 500
+
+    @staticmethod
+    def _normalizar(texto: Optional[str]) -> str:
+        return (texto or '').strip().lower()
+
+    @staticmethod
+    def _cargar_mapas() -> Dict[str, Any]:
+        """Precarga ingredientes y tipos en memoria con dos consultas de columnas planas."""
+        columnas = ['id', 'nombre', 'descripcion', 'stock', 'stock_minimo', 'unidad', 'precio_unitario',
+                    'tipo_ingrediente_id', 'activo', 'fecha_vencimiento', 'proveedor', 'codigo_barras',
+                    'ubicacion_almacen']
+        filas = db.session.query(*[getattr(Ingrediente, c) for c in columnas]).all()
+
+        por_id, por_nombre, por_codigo = {}, {}, {}
+        for fila in filas:
+            actual = dict(zip(columnas, fila))
+            por_id[actual['id']] = actual
+            por_nombre[ImportacionIngredienteService._normalizar(actual['nombre'])] = actual['id']
+            if actual['codigo_barras']:
+                por_codigo[actual['codigo_barras'].strip()] = actual['id']
+
+        tipos = db.session.query(TipoIngrediente.id, TipoIngrediente.nombre).all()
+        return {
+            'por_id': por_id,
+            'por_nombre': por_nombre,
+            'por_codigo': por_codigo,
+            'tipos_por_id': {tipo_id for tipo_id, _ in tipos},
+            'tipos_por_nombre': {ImportacionIngredienteService._normalizar(nombre): tipo_id for tipo_id, nombre in tipos}
+        }
+
+    @staticmethod
+    def _convertir_fila(fila: Dict[str, Any], mapas: Dict[str, Any]) -> Dict[str, Any]:
+        """Convierte y valida los valores de una fila. Los campos vacíos se ignoran."""
+        valores = {}
+
+        for campo, longitud in CAMPOS_TEXTO.items():
+            valor = fila.get(campo)
+            if valor is None or str(valor).strip() == '':
+                continue
+            valor = str(valor).strip()
+            if longitud and len(valor) > longitud:
+                raise FilaInvalida(f"El campo '{campo}' no puede exceder {longitud} caracteres")
+            valores[campo] = valor
+
+        for campo, decimales in CAMPOS_NUMERICOS.items():
+            valor = fila.get(campo)
+            if valor is None or str(valor).strip() == '':
+                continue
+            try:
+                numero = round(float(str(valor).replace(',', '.')), decimales)
+            except (ValueError, TypeError):
+                raise FilaInvalida(f"El campo '{campo}' debe ser un número válido")
+            if numero < 0:
+                raise FilaInvalida(f"El campo '{campo}' no puede ser negativo")
+            valores[campo] = numero
+
+        if fila.get('fecha_vencimiento') not in (None, ''):
+            try:
+                valores['fecha_vencimiento'] = date.fromisoformat(str(fila['fecha_vencimiento']).strip()[:10])
+            except ValueError:
+                raise FilaInvalida('Fecha de vencimiento no válida (use AAAA-MM-DD)')
+
+        if fila.get('activo') not in (None, ''):
+            activo = fila['activo']
+            valores['activo'] = activo if isinstance(activo, bool) else str(activo).strip().lower() in VALORES_VERDADEROS
+
+        # Tipo por ID o por nombre, validado contra el mapa de tipos
+        tipo_id = fila.get('tipo_ingrediente_id')
+        tipo_nombre = fila.get('tipo') or fila.get('tipo_ingrediente')
+        if tipo_id not in (None, ''):
+            try:
+                tipo_id = int(tipo_id)
+            except (ValueError, TypeError):
+                raise FilaInvalida('tipo_ingrediente_id debe ser un entero')
+            if tipo_id not in mapas['tipos_por_id']:
+                raise FilaInvalida(f'Tipo de ingrediente no válido: {tipo_id}')
+            valores['tipo_ingrediente_id'] = tipo_id
+        elif tipo_nombre not in (None, ''):
+            tipo_id = mapas['tipos_por_nombre'].get(ImportacionIngredienteService._normalizar(str(tipo_nombre)))
+            if tipo_id is None:
+                raise FilaInvalida(f'Tipo de ingrediente no válido: {tipo_nombre}')
+            valores['tipo_ingrediente_id'] = tipo_id
+
+        return valores
+
+    @staticmethod
+    def _resolver_id(valores: Dict[str, Any], fila: Dict[str, Any], mapas: Dict[str, Any]) -> Optional[int]:
+        """Identifica el ingrediente existente por id, código de barras o nombre (en ese orden)."""
+        if fila.get('id') not in (None, ''):
+            try:
+                ingrediente_id = int(fila['id'])
+            except (ValueError, TypeError):
+                raise FilaInvalida('id debe ser un entero')
+            if ingrediente_id not in mapas['por_id']:
+                raise FilaInvalida(f'Ingrediente no encontrado: {ingrediente_id}')
+            return ingrediente_id
+
+        id_por_codigo = mapas['por_codigo'].get(valores['codigo_barras']) if 'codigo_barras' in valores else None
+        id_por_nombre = mapas['por_nombre'].get(ImportacionIngredienteService._normalizar(valores.get('nombre')))
+
+        if id_por_codigo and id_por_nombre and id_por_codigo != id_por_nombre:
+            raise FilaInvalida('El código de barras y el nombre corresponden a ingredientes distintos')
+        return id_por_codigo or id_por_nombre
+
+    @staticmethod
+    def _calcular_cambios(actual: Dict[str, Any], valores: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        cambios = {}
+        for campo, nuevo in valores.items():
+            anterior = actual.get(campo)
+            if isinstance(anterior, Decimal):
+                anterior = float(anterior)
+            if campo in CAMPOS_NUMERICOS and anterior is not None:
+                iguales = round(anterior, CAMPOS_NUMERICOS[campo]) == nuevo
+            else:
+                iguales = anterior == nuevo
+            if not iguales:
+                cambio = {
+                    'antes': anterior.isoformat() if isinstance(anterior, date) else anterior,
+                    'despues': nuevo.isoformat() if isinstance(nuevo, date) else nuevo
+                }
+                if campo in CAMPOS_NUMERICOS:
+                    cambio['diferencia'] = round(nuevo - (anterior or 0), CAMPOS_NUMERICOS[campo])
+                cambios[campo] = cambio
+        return cambios
+
+    @staticmethod
+    def _escribir_lote(actualizaciones: List[Dict[str, Any]], inserciones: List[Dict[str, Any]]):
+        """Escribe un lote con executemany (UPDATE por clave primaria e INSERT masivo)."""
+        if actualizaciones:
+            db.session.execute(update(Ingrediente), actualizaciones)
+            actualizaciones.clear()
+        if inserciones:
+            db.session.execute(insert(Ingrediente), inserciones)
+            inserciones.clear()
+
+    @staticmethod
+    def importar(filas: Iterable[Dict[str, Any]], simular: bool = False,
+                 crear_nuevos: bool = True) -> tuple[bool, Dict[str, Any]]:
+        """
+        Procesa las filas en streaming, hace upsert en lotes y devuelve el diff de conciliación.
+
+        Args:
+            filas: iterable de diccionarios (filas CSV o JSON)
+            simular: si es True calcula el diff sin confirmar cambios
+            crear_nuevos: si es False las filas sin ingrediente existente se reportan como error
+
+        Returns:
+            Tuple (success, resultado)
+        """
+        try:
+            mapas = ImportacionIngredienteService._cargar_mapas()
+            tamano_lote = ImportacionIngredienteService.TAMANO_LOTE
+
+            actualizaciones, inserciones = [], []
+            vistos = set()
+            resumen = {'filas': 0, 'creados': 0, 'actualizados': 0, 'sin_cambios': 0, 'errores': 0}
+            diff = {'creados': [], 'actualizados': [], 'errores': []}
+
+            for numero_fila, fila in enumerate(filas, start=1):
+                resumen['filas'] += 1
+                try:
+                    if not isinstance(fila, dict):
+                        raise FilaInvalida('Formato de fila no válido')
+
+                    valores = ImportacionIngredienteService._convertir_fila(fila, mapas)
+                    ingrediente_id = ImportacionIngredienteService._resolver_id(valores, fila, mapas)
+
+                    clave = ingrediente_id or ImportacionIngredienteService._normalizar(valores.get('nombre'))
+                    if clave in vistos:
+                        raise FilaInvalida('Ingrediente duplicado en el archivo')
+                    vistos.add(clave)
+
+                    if ingrediente_id is None:
+                        if not crear_nuevos:
+                            raise FilaInvalida('Ingrediente no encontrado')
+                        if 'nombre' not in valores:
+                            raise FilaInvalida('El nombre del ingrediente es obligatorio')
+                        if valores.get('codigo_barras') in mapas['por_codigo']:
+                            raise FilaInvalida('El código de barras ya pertenece a otro ingrediente')
+
+                        valores.setdefault('activo', True)
+                        inserciones.append(valores)
+                        # Reservar nombre y código para detectar conflictos en filas posteriores
+                        mapas['por_nombre'][ImportacionIngredienteService._normalizar(valores['nombre'])] = None
+                        if valores.get('codigo_barras'):
+                            mapas['por_codigo'][valores['codigo_barras']] = None
+                        resumen['creados'] += 1
+                        diff['creados'].append({
+                            'fila': numero_fila,
+                            'nombre': valores['nombre'],
+                            'valores': {k: (v.isoformat() if isinstance(v, date) else v) for k, v in valores.items()}
+                        })
+                    else:
+                        actual = mapas['por_id'][ingrediente_id]
+
+                        # Un cambio de nombre o código no puede chocar con otro ingrediente
+                        if 'nombre' in valores:
+                            otro = mapas['por_nombre'].get(ImportacionIngredienteService._normalizar(valores['nombre']), ingrediente_id)
+                            if otro != ingrediente_id:
+                                raise FilaInvalida('Ya existe otro ingrediente con este nombre')
+                        if 'codigo_barras' in valores:
+                            otro = mapas['por_codigo'].get(valores['codigo_barras'], ingrediente_id)
+                            if otro != ingrediente_id:
+                                raise FilaInvalida('El código de barras ya pertenece a otro ingrediente')
+
+                        cambios = ImportacionIngredienteService._calcular_cambios(actual, valores)
+                        if not cambios:
+                            resumen['sin_cambios'] += 1
+                            continue
+
+                        actualizaciones.append({'id': ingrediente_id, **{c: valores[c] for c in cambios}})
+                        resumen['actualizados'] += 1
+                        diff['actualizados'].append({
+                            'fila': numero_fila,
+                            'ingrediente_id': ingrediente_id,
+                            'nombre': actual['nombre'],
+                            'cambios': cambios
+                        })
+
+                except FilaInvalida as e:
+                    resumen['errores'] += 1
+                    diff['errores'].append({'fila': numero_fila, 'error': str(e)})
+                    continue
+
+                if len(actualizaciones) + len(inserciones) >= tamano_lote:
+                    ImportacionIngredienteService._escribir_lote(actualizaciones, inserciones)
+
+            ImportacionIngredienteService._escribir_lote(actualizaciones, inserciones)
+
+            if simular:
+                db.session.rollback()
+            else:
+                db.session.commit()
+                if resumen['actualizados']:
+                    RecepcionIngredienteService.invalidar_cache()
+
+            return True, {'simulado': simular, 'resumen': resumen, 'diff': diff}
+
+        except Exception as e:
+            db.session.rollback()
+            return False, {'error': f'Error importando ingredientes: {str(e)}'}
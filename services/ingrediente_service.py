@@ -1,16 +1,27 @@
 from models.menu import Ingrediente, TipoIngrediente, ProductoIngrediente
 from models import db
+from sqlalchemy.orm import joinedload
 from services.error_handler import ErrorHandler, ValidationError, BusinessLogicError
+from services.recepcion_ingrediente_service import RecepcionIngredienteService
+from services.alerta_ingrediente_service import AlertaIngredienteService
+from services.serializacion import Serializador
+from services.esquemas import IngredienteEsquema
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 class IngredienteService:
     @staticmethod
-    def get_ingredientes() -> List[Dict[str, Any]]:
-        """Obtener todos los ingredientes"""
+    def get_ingredientes(plano: bool = False) -> Any:
+        """
+        Obtener todos los ingredientes.
+        Con plano=True los tipos se devuelven aparte en 'incluidos' en vez de anidados.
+        """
         try:
-            ingredientes = Ingrediente.query.all()
-            return [ingrediente.to_dict() for ingrediente in ingredientes]
+            ingredientes = Serializador.consulta(IngredienteEsquema).order_by(Ingrediente.id).all()
+            resultado = Serializador.serializar(ingredientes, IngredienteEsquema, incluir=('tipo',))
+            if plano:
+                return resultado
+            return Serializador.anidar(resultado, IngredienteEsquema, ('tipo',))
         except Exception as e:
             return ErrorHandler.handle_service_error(e, 'obtener ingredientes')
 
@@ -183,6 +194,7 @@ class IngredienteService:
                 ingrediente.proveedor = data['proveedor'].strip() if data['proveedor'] else None
 
             if 'codigo_barras' in data:
+                RecepcionIngredienteService.invalidar_cache(ingrediente.codigo_barras)
                 ingrediente.codigo_barras = data['codigo_barras'].strip() if data['codigo_barras'] else None
 
             if 'ubicacion_almacen' in data:
@@ -210,6 +222,7 @@ class IngredienteService:
             if productos_count > 0:
                 raise BusinessLogicError(f'No se puede eliminar el ingrediente porque está asociado a {productos_count} producto(s). Elimine primero las asociaciones.')
 
+            RecepcionIngredienteService.invalidar_cache(ingrediente.codigo_barras)
             db.session.delete(ingrediente)
             db.session.commit()
 
@@ -249,9 +262,10 @@ class IngredienteService:
     def get_ingredientes_bajos_stock() -> List[Dict[str, Any]]:
         """Obtener ingredientes con stock bajo"""
         try:
-            ingredientes_bajos = Ingrediente.query.filter(
-                Ingrediente.stock <= Ingrediente.stock_minimo,
-                Ingrediente.activo == True
+            # stock <= stock_minimo sobre la columna derivada ratio_stock (indexada con activo)
+            ingredientes_bajos = Ingrediente.query.options(joinedload(Ingrediente.tipo)).filter(
+                Ingrediente.activo == True,
+                AlertaIngredienteService.filtro_stock_bajo()
             ).all()
 
             return [ingrediente.to_dict() for ingrediente in ingredientes_bajos]
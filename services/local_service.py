@@ -1,9 +1,159 @@
 from models import db
 from models.local import Piso, Zona, Mesa
-from typing import Optional, Dict, Any, List
-from sqlalchemy import and_, or_
+from typing import Optional, Dict, Any, List, Tuple
+from sqlalchemy import and_, or_, func, select
+from flask import current_app, g, has_request_context
+from threading import Lock
+from time import monotonic
+import hashlib
+import json
 import uuid
 from services.error_handler import ErrorHandler, BusinessLogicError
+from services.mesa_estado_service import MesaEstadoService, TransicionMesaError, ESTADOS_MESA
+
+
+def _firma(valor: Any) -> str:
+    """Huella estable entre procesos (a diferencia de hash()) de un valor serializable"""
+    return hashlib.blake2b(json.dumps(valor, sort_keys=True, default=str).encode(), digest_size=12).hexdigest()
+
+
+class _Plano:
+    """Instantánea inmutable de pisos, zonas y mesas ya serializados (sin estado de mesas)."""
+    __slots__ = ('pisos', 'zonas', 'mesas', 'zonas_por_piso', 'mesas_por_zona', 'construido_en', 'firma')
+
+    def __init__(self, pisos, zonas, mesas, zonas_por_piso, mesas_por_zona):
+        self.pisos: List[Dict[str, Any]] = pisos
+        self.zonas: Dict[int, Dict[str, Any]] = zonas
+        self.mesas: Dict[int, Dict[str, Any]] = mesas
+        self.zonas_por_piso: Dict[int, List[int]] = zonas_por_piso
+        self.mesas_por_zona: Dict[int, List[int]] = mesas_por_zona
+        self.construido_en = monotonic()
+        self.firma = _firma([pisos, zonas, mesas])
+
+
+class _Estados:
+    """Mapa inmutable id -> (estado, version) de las mesas, con su huella."""
+    __slots__ = ('mesas', 'cargado_en', 'firma')
+
+    def __init__(self, mesas: Dict[int, Tuple[str, int]], cargado_en: float):
+        self.mesas = mesas
+        self.cargado_en = cargado_en
+        self.firma = _firma(sorted(mesas.items()))
+
+    def estado(self, mesa_id: int, por_defecto: Optional[str] = None) -> Optional[str]:
+        actual = self.mesas.get(mesa_id)
+        return actual[0] if actual else por_defecto
+
+
+class PlanoLocal:
+    """
+    Plano del local en caché del proceso.
+
+    La estructura (pisos, zonas, mesas y conteos) se construye con tres consultas planas y se
+    reutiliza hasta que una escritura de este proceso la invalida o pasan PLANO_CACHE_TTL
+    segundos. El estado de las mesas, que cambia a cada rato, va aparte en un mapa
+    id -> (estado, version) de una sola consulta (PLANO_ESTADOS_TTL) que se superpone al
+    construir la respuesta. Si el mapa trae mesas que la instantánea no conoce (creadas o
+    borradas en otro worker), la instantánea se reconstruye.
+
+    La instantánea puede ir por detrás de la base de datos (cambios de otros workers dentro
+    del TTL), así que el ETag del mapa sale de la huella de lo que se sirve (version_mapa) y
+    la vista elegida para calcularlo se reutiliza en el resto de la petición: el cuerpo y su
+    ETag corresponden siempre a la misma instantánea.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._plano: Optional[_Plano] = None
+        self._estados: Optional[_Estados] = None
+
+    @staticmethod
+    def _construir() -> _Plano:
+        from models.order import Orden
+        pisos = Piso.query.order_by(Piso.orden, Piso.id).all()
+        zonas = Zona.query.order_by(Zona.id).all()
+        conteo_ordenes = select(
+            Orden.mesa_id, func.count(Orden.id).label('total')
+        ).group_by(Orden.mesa_id).subquery()
+        mesas = db.session.query(Mesa, func.coalesce(conteo_ordenes.c.total, 0)).outerjoin(
+            conteo_ordenes, conteo_ordenes.c.mesa_id == Mesa.id
+        ).order_by(Mesa.id).all()
+
+        zonas_por_piso: Dict[int, List[int]] = {}
+        for zona in zonas:
+            zonas_por_piso.setdefault(zona.piso_id, []).append(zona.id)
+        mesas_por_zona: Dict[int, List[int]] = {}
+        for mesa, _ in mesas:
+            mesas_por_zona.setdefault(mesa.zona_id, []).append(mesa.id)
+
+        # zona.piso y mesa.zona se resuelven desde el mapa de identidad (ya cargados)
+        return _Plano(
+            pisos=[piso.to_dict(total_zonas=len(zonas_por_piso.get(piso.id, ()))) for piso in pisos],
+            zonas={
+                zona.id: zona.to_dict(total_mesas=len(mesas_por_zona.get(zona.id, ())), mesas_ocupadas=0)
+                for zona in zonas
+            },
+            mesas={mesa.id: mesa.to_dict(total_ordenes=total) for mesa, total in mesas},
+            zonas_por_piso=zonas_por_piso,
+            mesas_por_zona=mesas_por_zona
+        )
+
+    def _cargar_estados(self) -> _Estados:
+        filas = db.session.execute(select(Mesa.id, Mesa.estado, Mesa.version)).all()
+        estados = _Estados({mesa_id: (estado, version) for mesa_id, estado, version in filas}, monotonic())
+        with self._lock:
+            self._estados = estados
+        return estados
+
+    def vista(self) -> Tuple[_Plano, _Estados]:
+        """Instantánea vigente y mapa de estados de mesas (la misma durante toda la petición)"""
+        if has_request_context() and '_plano_vista' in g:
+            return g._plano_vista
+
+        config = current_app.config
+        ahora = monotonic()
+        estados = self._estados
+        if estados is None or ahora - estados.cargado_en > config.get('PLANO_ESTADOS_TTL', 1):
+            estados = self._cargar_estados()
+
+        plano = self._plano
+        if (plano is None or ahora - plano.construido_en > config.get('PLANO_CACHE_TTL', 30)
+                or len(estados.mesas) != len(plano.mesas)
+                or any(mesa_id not in plano.mesas for mesa_id in estados.mesas)):
+            plano = self._construir()
+            with self._lock:
+                self._plano = plano
+
+        if has_request_context():
+            g._plano_vista = (plano, estados)
+        return plano, estados
+
+    def invalidar(self):
+        """Descarta la instantánea y los estados (cambió la estructura del local)"""
+        with self._lock:
+            self._plano = None
+            self._estados = None
+        if has_request_context():
+            g.pop('_plano_vista', None)
+
+    def aplicar_evento(self, evento: Dict[str, Any]):
+        """Suscriptor de MesaEstadoService: aplica el cambio confirmado al mapa de estados"""
+        mesa_id, version = evento['mesa_id'], evento['version']
+        with self._lock:
+            estados = self._estados
+            if estados is None:
+                return
+            actual = estados.mesas.get(mesa_id)
+            # Los eventos de transacciones concurrentes pueden llegar desordenados
+            if actual is not None and actual[1] is not None and version is not None and actual[1] >= version:
+                return
+            self._estados = _Estados({**estados.mesas, mesa_id: (evento['estado_nuevo'], version)},
+                                     estados.cargado_en)
+
+
+plano_local = PlanoLocal()
+MesaEstadoService.suscribir(plano_local.aplicar_evento)
+
 
 class LocalService:
     """Servicio para gestión de pisos, zonas y mesas"""
@@ -239,14 +389,19 @@ class LocalService:
             mesa.numero = data.get('numero', mesa.numero)
             mesa.capacidad = data.get('capacidad', mesa.capacidad)
             mesa.zona_id = data.get('zona_id', mesa.zona_id)
-            mesa.estado = data.get('estado', mesa.estado)
             mesa.posicion_x = data.get('posicion_x', mesa.posicion_x)
             mesa.posicion_y = data.get('posicion_y', mesa.posicion_y)
             mesa.activo = data.get('activo', mesa.activo)
             mesa.notas = data.get('notas', mesa.notas)
+            if 'estado' in data:
+                # Edición de administrador: fuera de la tabla de transiciones, pero condicional
+                MesaEstadoService.transicionar(mesa, data['estado'], forzar=True, motivo='edicion')
             
             db.session.commit()
             return mesa, None
+        except TransicionMesaError as e:
+            db.session.rollback()
+            return None, e.to_dict()
         except Exception as e:
             db.session.rollback()
             return None, {"error": f"Error actualizando mesa: {str(e)}"}
@@ -285,25 +440,36 @@ class LocalService:
             if not mesa:
                 return False, {"error": "Mesa no encontrada"}
             
-            estados_validos = ['disponible', 'ocupada', 'limpieza', 'reservada', 'fuera_servicio']
-            if nuevo_estado not in estados_validos:
-                return False, {"error": f"Estado inválido. Estados válidos: {', '.join(estados_validos)}"}
+            if nuevo_estado not in ESTADOS_MESA:
+                return False, {"error": f"Estado inválido. Estados válidos: {', '.join(ESTADOS_MESA)}"}
             
-            mesa.estado = nuevo_estado
+            MesaEstadoService.transicionar(mesa, nuevo_estado, motivo='manual')
             db.session.commit()
             
             return True, None
+        except TransicionMesaError as e:
+            db.session.rollback()
+            return False, e.to_dict()
         except Exception as e:
             db.session.rollback()
             return False, {"error": f"Error cambiando estado de mesa: {str(e)}"}
     
     # --- MÉTODOS DE CONSULTA AVANZADA ---
     
+    @staticmethod
+    def _mesa_con_estado(plano: _Plano, estados: _Estados, mesa_id: int) -> Dict[str, Any]:
+        mesa = dict(plano.mesas[mesa_id])
+        actual = estados.mesas.get(mesa_id)
+        if actual is not None:
+            mesa['estado'], mesa['version'] = actual
+        return mesa
+
     @staticmethod
     def get_estadisticas_zonas() -> Dict[str, Any]:
         """Obtener estadísticas de las zonas"""
         try:
-            zonas = Zona.query.filter(Zona.activo == True).all()
+            plano, estados = plano_local.vista()
+            zonas = [zona for zona in plano.zonas.values() if zona['activo']]
             estadisticas = {
                 'total_zonas': len(zonas),
                 'zonas_por_tipo': {},
@@ -316,20 +482,22 @@ class LocalService:
             
             for zona in zonas:
                 # Contar por tipo
-                if zona.tipo not in estadisticas['zonas_por_tipo']:
-                    estadisticas['zonas_por_tipo'][zona.tipo] = 0
-                estadisticas['zonas_por_tipo'][zona.tipo] += 1
+                if zona['tipo'] not in estadisticas['zonas_por_tipo']:
+                    estadisticas['zonas_por_tipo'][zona['tipo']] = 0
+                estadisticas['zonas_por_tipo'][zona['tipo']] += 1
                 
                 # Contar mesas
-                mesas_zona = [m for m in zona.mesas if m.activo]
+                mesas_zona = [plano.mesas[m] for m in plano.mesas_por_zona.get(zona['id'], ()) if plano.mesas[m]['activo']]
                 estadisticas['total_mesas'] += len(mesas_zona)
                 
                 for mesa in mesas_zona:
-                    estadisticas['capacidad_total'] += mesa.capacidad
-                    if mesa.estado == 'ocupada':
+                    capacidad = mesa['capacidad'] or 0
+                    estado = estados.estado(mesa['id'], mesa['estado'])
+                    estadisticas['capacidad_total'] += capacidad
+                    if estado == 'ocupada':
                         estadisticas['mesas_ocupadas'] += 1
-                        estadisticas['capacidad_ocupada'] += mesa.capacidad
-                    elif mesa.estado == 'libre':
+                        estadisticas['capacidad_ocupada'] += capacidad
+                    elif estado == 'libre':
                         estadisticas['mesas_libres'] += 1
             
             return estadisticas
@@ -340,28 +508,33 @@ class LocalService:
     def get_mapa_restaurante() -> Dict[str, Any]:
         """Obtener datos para el mapa del restaurante"""
         try:
-            pisos = Piso.query.filter(Piso.activo == True).order_by(Piso.orden).all()
+            plano, estados = plano_local.vista()
             mapa = {
                 'pisos': [],
                 'total_mesas': 0,
                 'mesas_ocupadas': 0
             }
             
-            for piso in pisos:
-                piso_data = piso.to_dict()
+            for piso in plano.pisos:
+                if not piso['activo']:
+                    continue
+                piso_data = dict(piso)
                 piso_data['zonas'] = []
                 
-                for zona in piso.zonas:
-                    if zona.activo:
-                        zona_data = zona.to_dict()
+                for zona_id in plano.zonas_por_piso.get(piso['id'], ()):
+                    zona = plano.zonas[zona_id]
+                    if zona['activo']:
+                        zona_data = dict(zona)
                         zona_data['mesas'] = []
+                        mesas_zona = plano.mesas_por_zona.get(zona_id, ())
+                        zona_data['mesas_ocupadas'] = sum(1 for m in mesas_zona if estados.estado(m) == 'ocupada')
                         
-                        for mesa in zona.mesas:
-                            if mesa.activo:
-                                mesa_data = mesa.to_dict()
+                        for mesa_id in mesas_zona:
+                            if plano.mesas[mesa_id]['activo']:
+                                mesa_data = LocalService._mesa_con_estado(plano, estados, mesa_id)
                                 zona_data['mesas'].append(mesa_data)
                                 mapa['total_mesas'] += 1
-                                if mesa.estado == 'ocupada':
+                                if mesa_data['estado'] == 'ocupada':
                                     mapa['mesas_ocupadas'] += 1
                         
                         piso_data['zonas'].append(zona_data)
@@ -371,3 +544,44 @@ class LocalService:
             return mapa
         except Exception as e:
             return {"error": f"Error obteniendo mapa: {str(e)}"}
+
+    @staticmethod
+    def get_mesas_por_zona() -> List[Dict[str, Any]]:
+        """Mesas de cada zona (activas o no) con el conteo por estado, desde el plano en caché"""
+        plano, estados = plano_local.vista()
+        resultado = []
+        for zona_id, zona in plano.zonas.items():
+            mesas = [LocalService._mesa_con_estado(plano, estados, m) for m in plano.mesas_por_zona.get(zona_id, ())]
+            estados_count: Dict[str, int] = {}
+            for mesa in mesas:
+                estados_count[mesa['estado']] = estados_count.get(mesa['estado'], 0) + 1
+            resultado.append({
+                "zona_id": zona_id,
+                "zona_nombre": zona['nombre'],
+                "piso_nombre": zona['piso_nombre'],
+                "total_mesas": len(mesas),
+                "estados": estados_count,
+                "mesas": [
+                    {
+                        "id": mesa['id'],
+                        "numero": mesa['numero'],
+                        "estado": mesa['estado'],
+                        "capacidad": mesa['capacidad']
+                    } for mesa in mesas
+                ]
+            })
+        return resultado
+
+    @staticmethod
+    def version_mapa() -> Optional[str]:
+        """
+        Token de versión del mapa (para ETag) sin serializar la respuesta: huella de la
+        instantánea y del mapa de estados que se van a servir en esta petición. Derivarlo
+        de la base de datos en vivo guardaría un cuerpo viejo (instantánea en caché) bajo
+        un ETag nuevo. None si no se puede calcular.
+        """
+        try:
+            plano, estados = plano_local.vista()
+            return f'{plano.firma}|{estados.firma}'
+        except Exception:
+            return None
@@ -0,0 +1,256 @@
+"""
+Máquina de estados de las mesas.
+
+Todos los cambios de `mesa.estado` pasan por MesaEstadoService.transicionar:
+
+- TRANSICIONES define qué estados se alcanzan desde cada estado.
+- El cambio es un UPDATE condicional (`WHERE estado = ? AND version = ?`) que incrementa
+  `mesa.version`; si otro proceso cambió la mesa entre la lectura y la escritura no se
+  actualiza ninguna fila. El reintento relee solo (estado, version) de esa mesa con bloqueo
+  de fila y vuelve a validar la transición, así dos mozos no pueden sentar a dos grupos en
+  la misma mesa.
+- El UPDATE no confirma: corre en la transacción del llamador (la orden, el pago o la
+  reserva que motiva el cambio) y se confirma o se revierte con ella.
+- Cada cambio registra un EventoMesa en la misma transacción. Tras el commit se avisa a
+  los suscriptores del proceso (cachés como el plano del local); los clientes en tiempo
+  real y los otros workers leen la tabla `evento_mesa` por id creciente.
+- El id de un evento se asigna al insertarlo, pero las transacciones confirman en otro
+  orden: una orden puede tener el evento N sin confirmar mientras un pago confirma N+1.
+  Por eso el cursor de lectura (eventos_desde) solo avanza sobre eventos con más de
+  MESA_EVENTOS_MARGEN segundos; los más recientes se releen en cada consulta y el lector
+  descarta los repetidos por (mesa_id, version).
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from flask import current_app
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db
+from models.local import Mesa, EventoMesa
+from utils.replica import SesionEnrutada
+
+logger = logging.getLogger(__name__)
+
+TRANSICIONES: Dict[str, frozenset] = {
+    'disponible': frozenset({'ocupada', 'reservada', 'limpieza', 'fuera_servicio'}),
+    'reservada': frozenset({'ocupada', 'disponible', 'fuera_servicio'}),
+    'ocupada': frozenset({'disponible', 'limpieza'}),
+    'limpieza': frozenset({'disponible', 'fuera_servicio'}),
+    'fuera_servicio': frozenset({'disponible'}),
+}
+ESTADOS_MESA = tuple(TRANSICIONES)
+
+_suscriptores: List[Callable[[Dict[str, Any]], None]] = []
+
+
+class TransicionMesaError(ValueError):
+    """Transición no permitida o perdida frente a otro cambio concurrente"""
+
+    def __init__(self, mensaje: str, mesa_id: int, estado_actual: Optional[str], estado_nuevo: str,
+                 conflicto: bool = False):
+        super().__init__(mensaje)
+        self.mesa_id = mesa_id
+        self.estado_actual = estado_actual
+        self.estado_nuevo = estado_nuevo
+        self.conflicto = conflicto
+
+    @property
+    def code(self) -> str:
+        return 'CONFLICTO_ESTADO_MESA' if self.conflicto else 'TRANSICION_MESA_INVALIDA'
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"error": str(self), "code": self.code}
+
+
+@event.listens_for(SesionEnrutada, 'after_commit')
+def _notificar_eventos(sesion):
+    eventos = sesion.info.pop('eventos_mesa', None)
+    for evento in eventos or ():
+        for suscriptor in _suscriptores:
+            try:
+                suscriptor(evento)
+            except Exception:
+                logger.exception("Error notificando cambio de estado de mesa %s", evento['mesa_id'])
+
+
+@event.listens_for(SesionEnrutada, 'after_rollback')
+def _descartar_eventos(sesion):
+    sesion.info.pop('eventos_mesa', None)
+
+
+class MesaEstadoService:
+    """Cambios de estado de mesas con concurrencia optimista"""
+
+    @staticmethod
+    def suscribir(funcion: Callable[[Dict[str, Any]], None]):
+        """Registra una función que recibe cada evento confirmado de este proceso"""
+        if funcion not in _suscriptores:
+            _suscriptores.append(funcion)
+
+    @staticmethod
+    def _leer(mesa_id: int, bloquear: bool = False):
+        consulta = select(Mesa.estado, Mesa.version).where(Mesa.id == mesa_id)
+        if bloquear:
+            # Lectura bloqueante: ve el último valor confirmado aunque la transacción ya haya leído la fila
+            consulta = consulta.with_for_update()
+        return db.session.execute(consulta).first()
+
+    @staticmethod
+    def _sincronizar_instancia(mesa_id: int, estado: str, version: int):
+        """Refleja el cambio en la instancia Mesa cargada en la sesión, si la hay, sin marcarla sucia"""
+        clave = db.inspect(Mesa).identity_key_from_primary_key((mesa_id,))
+        instancia = db.session.identity_map.get(clave)
+        if instancia is not None:
+            set_committed_value(instancia, 'estado', estado)
+            set_committed_value(instancia, 'version', version)
+            db.session.expire(instancia, ['actualizado_en'])
+
+    @staticmethod
+    def transicionar(mesa: Union[Mesa, int], nuevo_estado: str, desde: Optional[Iterable[str]] = None,
+                     estricto: bool = True, forzar: bool = False, motivo: Optional[str] = None) -> bool:
+        """
+        Cambia el estado de una mesa dentro de la transacción en curso (no hace commit).
+
+        desde: restringe los estados de origen, además de la tabla de transiciones (p. ej.
+        liberar una mesa solo si sigue 'reservada'). estricto=False devuelve False en lugar de
+        lanzar TransicionMesaError cuando la mesa no está en un estado de origen válido.
+        forzar=True omite la tabla de transiciones (edición de administrador), pero el
+        cambio sigue siendo condicional. Devuelve True si cambió el estado.
+        """
+        if isinstance(mesa, Mesa):
+            # Primer intento con lo que ya está en memoria: sin lecturas si nadie cambió la mesa
+            return MesaEstadoService._transicionar(
+                mesa.id, (mesa.estado, mesa.version or 0), nuevo_estado, desde, estricto, forzar, motivo
+            )
+        return MesaEstadoService._transicionar(
+            mesa, MesaEstadoService._leer(mesa), nuevo_estado, desde, estricto, forzar, motivo
+        )
+
+    @staticmethod
+    def _transicionar(mesa_id: int, fila, nuevo_estado: str, desde, estricto: bool, forzar: bool,
+                      motivo: Optional[str]) -> bool:
+        if nuevo_estado not in TRANSICIONES:
+            raise ValueError(f"Estado inválido. Estados válidos: {', '.join(ESTADOS_MESA)}")
+        desde = frozenset(desde) if desde is not None else None
+
+        reintentos = current_app.config.get('MESA_TRANSICION_REINTENTOS', 3)
+        for intento in range(reintentos + 1):
+            if fila is None:
+                raise ValueError("Mesa no encontrada")
+            actual, version = fila
+
+            if actual == nuevo_estado and (desde is None or actual in desde):
+                return False
+            permitida = (desde is None or actual in desde) and (forzar or nuevo_estado in TRANSICIONES.get(actual, ()))
+            if not permitida:
+                if not estricto:
+                    return False
+                if intento:
+                    # Otro usuario cambió la mesa entre la lectura y el UPDATE
+                    raise TransicionMesaError(
+                        f"La mesa pasó a '{actual}' mientras se procesaba la solicitud", mesa_id, actual,
+                        nuevo_estado, conflicto=True
+                    )
+                raise TransicionMesaError(
+                    f"La mesa no puede pasar de '{actual}' a '{nuevo_estado}'", mesa_id, actual, nuevo_estado
+                )
+
+            resultado = db.session.execute(
+                update(Mesa)
+                .where(Mesa.id == mesa_id, Mesa.estado == actual, Mesa.version == version)
+                .values(estado=nuevo_estado, version=Mesa.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if resultado.rowcount == 1:
+                MesaEstadoService._sincronizar_instancia(mesa_id, nuevo_estado, version + 1)
+                MesaEstadoService._registrar_evento(mesa_id, actual, nuevo_estado, version + 1, motivo)
+                return True
+
+            fila = MesaEstadoService._leer(mesa_id, bloquear=True)
+
+        actual = fila[0] if fila else None
+        raise TransicionMesaError(
+            "La mesa fue modificada por otro usuario, intente nuevamente", mesa_id, actual, nuevo_estado, conflicto=True
+        )
+
+    @staticmethod
+    def transicionar_varias(condicion, nuevo_estado: str, desde: Optional[Iterable[str]] = None,
+                            motivo: Optional[str] = None) -> List[int]:
+        """
+        Cambia el estado de las mesas que cumplen `condicion` (p. ej. Mesa.zona_id == 3) y omite
+        las que no admiten la transición. Devuelve los ids cambiados.
+        """
+        filas = db.session.execute(
+            select(Mesa.id, Mesa.estado, Mesa.version).where(condicion).order_by(Mesa.id)
+        ).all()
+        cambiadas = []
+        for mesa_id, estado, version in filas:
+            # La fila ya leída sirve de primer intento
+            if MesaEstadoService._transicionar(mesa_id, (estado, version), nuevo_estado, desde,
+                                               estricto=False, forzar=False, motivo=motivo):
+                cambiadas.append(mesa_id)
+        return cambiadas
+
+    @staticmethod
+    def _registrar_evento(mesa_id: int, anterior: str, nuevo: str, version: int, motivo: Optional[str]):
+        resultado = db.session.execute(insert(EventoMesa).values(
+            mesa_id=mesa_id, estado_anterior=anterior, estado_nuevo=nuevo, version=version, motivo=motivo
+        ))
+        db.session.info.setdefault('eventos_mesa', []).append({
+            'id': resultado.inserted_primary_key[0],
+            'mesa_id': mesa_id,
+            'estado_anterior': anterior,
+            'estado_nuevo': nuevo,
+            'version': version,
+            'motivo': motivo
+        })
+
+    @staticmethod
+    def _corte_margen() -> datetime:
+        """
+        Instante antes del cual un evento ya no puede aparecer con un id menor, con el
+        reloj de la base (el mismo que llena creado_en)
+        """
+        ahora = db.session.execute(select(db.func.now())).scalar()
+        return ahora - timedelta(seconds=current_app.config.get('MESA_EVENTOS_MARGEN', 10))
+
+    @staticmethod
+    def eventos_desde(cursor: int = 0, limite: int = 200) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Eventos con id mayor que cursor, en orden (consulta por rango de clave primaria), y
+        el cursor para la siguiente lectura. El cursor avanza solo mientras los eventos
+        tengan más de MESA_EVENTOS_MARGEN segundos: un id menor todavía sin confirmar puede
+        aparecer detrás de los recientes, que por eso se vuelven a devolver. Los repetidos
+        se reconocen por (mesa_id, version).
+        """
+        corte = MesaEstadoService._corte_margen()
+        eventos = EventoMesa.query.filter(EventoMesa.id > cursor).order_by(EventoMesa.id).limit(limite).all()
+        for evento in eventos:
+            if evento.creado_en is None or evento.creado_en >= corte:
+                break
+            cursor = evento.id
+        return [evento.to_dict() for evento in eventos], cursor
+
+    @staticmethod
+    def cursor_actual() -> int:
+        """Cursor para empezar a seguir los eventos desde ahora (ver eventos_desde)"""
+        corte = MesaEstadoService._corte_margen()
+        return db.session.execute(
+            select(db.func.max(EventoMesa.id)).where(EventoMesa.creado_en < corte)
+        ).scalar() or 0
+
+    @staticmethod
+    def purgar_eventos() -> int:
+        """Elimina eventos más antiguos que MESA_EVENTOS_RETENCION_HORAS (tarea periódica)"""
+        try:
+            limite = datetime.utcnow() - timedelta(hours=current_app.config.get('MESA_EVENTOS_RETENCION_HORAS', 24))
+            resultado = db.session.execute(delete(EventoMesa).where(EventoMesa.creado_en < limite))
+            db.session.commit()
+            return resultado.rowcount
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error purgando eventos de mesas")
+            return 0
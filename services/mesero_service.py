@@ -2,6 +2,8 @@ from models import db
 from models.local import Piso, Zona, Mesa
 from models.order import Orden, ItemOrden
 from models.reserva import Reserva
+from services.local_service import LocalService
+from services.mesa_estado_service import MesaEstadoService, TransicionMesaError, ESTADOS_MESA
 from sqlalchemy import func, and_
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
@@ -182,15 +184,16 @@ class MeseroService:
                 return False, {"error": "Mesa no encontrada"}
 
             # Validar estado
-            estados_validos = ['disponible', 'ocupada', 'reservada', 'limpieza', 'fuera_servicio']
-            if nuevo_estado not in estados_validos:
+            if nuevo_estado not in ESTADOS_MESA:
                 return False, {"error": "Estado no válido"}
 
-            mesa.estado = nuevo_estado
-            mesa.actualizado_en = datetime.utcnow()
+            MesaEstadoService.transicionar(mesa, nuevo_estado, motivo='manual')
             db.session.commit()
             
             return True, None
+        except TransicionMesaError as e:
+            db.session.rollback()
+            return False, e.to_dict()
         except Exception as e:
             db.session.rollback()
             return False, {"error": f"Error actualizando mesa: {str(e)}"}
@@ -293,33 +296,6 @@ class MeseroService:
         Obtiene mesas agrupadas por zona con estadísticas.
         """
         try:
-            zonas = Zona.query.all()
-            resultado = []
-            
-            for zona in zonas:
-                mesas = Mesa.query.filter_by(zona_id=zona.id).all()
-                estados_count = {}
-                
-                for mesa in mesas:
-                    estado = mesa.estado
-                    estados_count[estado] = estados_count.get(estado, 0) + 1
-                
-                resultado.append({
-                    "zona_id": zona.id,
-                    "zona_nombre": zona.nombre,
-                    "piso_nombre": zona.piso.nombre if zona.piso else None,
-                    "total_mesas": len(mesas),
-                    "estados": estados_count,
-                    "mesas": [
-                        {
-                            "id": mesa.id,
-                            "numero": mesa.numero,
-                            "estado": mesa.estado,
-                            "capacidad": mesa.capacidad
-                        } for mesa in mesas
-                    ]
-                })
-            
-            return resultado
+            return LocalService.get_mesas_por_zona()
         except Exception as e:
             return []
@@ -1,12 +1,38 @@
 from models.order import Orden, ItemOrden, Pago
 from models import db
 from datetime import datetime
+from decimal import Decimal
 import random
 import string
+from collections import Counter
+from sqlalchemy import func, select, update
 from services.error_handler import ErrorHandler
+from services.analitica_cocina_service import AnaliticaCocinaService
+from services.mesa_estado_service import MesaEstadoService
+
+# Estados de orden cuyo estado se deriva del avance de sus ítems
+ESTADOS_ORDEN_EN_CURSO = ('confirmada', 'preparando', 'lista', 'servida')
+# Ítems que siguen en cocina o esperando ser servidos
+ESTADOS_ITEM_ACTIVOS = ('pendiente', 'en_cola', 'preparando', 'listo')
 
 class OrdenService:
-    """Servicio para gestión de órdenes/pedidos"""
+    """
+    Servicio para gestión de órdenes/pedidos.
+
+    Cada operación del ciclo de vida (abrir, agregar ítems, avance en cocina, servir,
+    pagar, cancelar) es un comando que corre en una sola transacción y hace un único
+    commit. Los comandos que modifican una orden existente bloquean primero solo la
+    fila de la orden (SELECT ... FOR UPDATE): las operaciones concurrentes sobre la
+    misma orden se serializan y los ítems y la mesa se modifican siempre después de la
+    orden, así no hay interbloqueos. La mesa no se bloquea: su cambio de estado es
+    condicional (MesaEstadoService).
+
+    Con REPEATABLE READ (el aislamiento por defecto de MySQL) una lectura simple
+    después del bloqueo sigue viendo la foto tomada por la primera lectura de la
+    transacción, anterior a la espera. Por eso todo lo que se lee de los ítems tras
+    bloquear la orden se lee también con FOR UPDATE (_items_bloqueados), que en InnoDB
+    devuelve siempre la última versión confirmada.
+    """
 
     @staticmethod
     def generar_numero_orden():
@@ -16,42 +42,50 @@ class OrdenService:
             if not Orden.query.filter_by(numero=numero).first():
                 return numero
 
+    @staticmethod
+    def _abrir_orden(mesa_id, mozo_id, tipo='local', cliente_nombre=None, num_comensales=1):
+        """Crea la orden y ocupa la mesa en la transacción en curso (no hace commit)"""
+        # Validar que la mesa existe y está disponible
+        from models.local import Mesa
+        mesa = Mesa.query.get(mesa_id)
+        if not mesa:
+            raise ValueError("Mesa no encontrada")
+        if mesa.estado != 'disponible':
+            raise ValueError("Mesa no disponible")
+
+        # Validar que num_comensales no exceda la capacidad de la mesa
+        if num_comensales > mesa.capacidad:
+            raise ValueError(f"Número de comensales ({num_comensales}) excede la capacidad de la mesa ({mesa.capacidad})")
+
+        # Crear número único
+        numero = OrdenService.generar_numero_orden()
+
+        # Crear orden
+        orden = Orden(
+            numero=numero,
+            mesa_id=mesa_id,
+            mozo_id=mozo_id,
+            tipo=tipo,
+            estado='pendiente',
+            monto_total=0.0,
+            num_comensales=num_comensales,
+            cliente_nombre=cliente_nombre
+        )
+
+        db.session.add(orden)
+
+        # Marcar mesa como ocupada en la misma transacción: si otro mozo la ocupó
+        # mientras tanto, la transición falla y la orden no se crea
+        MesaEstadoService.transicionar(mesa, 'ocupada', desde=('disponible',), motivo='orden')
+        db.session.flush()
+
+        return orden
+
     @staticmethod
     def crear_orden(mesa_id, mozo_id, tipo='local', cliente_nombre=None, num_comensales=1):
         """Crea una nueva orden"""
         try:
-            # Validar que la mesa existe y está disponible
-            from models.local import Mesa
-            mesa = Mesa.query.get(mesa_id)
-            if not mesa:
-                raise ValueError("Mesa no encontrada")
-            if mesa.estado != 'disponible':
-                raise ValueError("Mesa no disponible")
-
-            # Validar que num_comensales no exceda la capacidad de la mesa
-            if num_comensales > mesa.capacidad:
-                raise ValueError(f"Número de comensales ({num_comensales}) excede la capacidad de la mesa ({mesa.capacidad})")
-
-            # Crear número único
-            numero = OrdenService.generar_numero_orden()
-
-            # Crear orden
-            orden = Orden(
-                numero=numero,
-                mesa_id=mesa_id,
-                mozo_id=mozo_id,
-                tipo=tipo,
-                estado='pendiente',
-                monto_total=0.0,
-                num_comensales=num_comensales,
-                cliente_nombre=cliente_nombre
-            )
-
-            db.session.add(orden)
-            db.session.commit()
-
-            # Marcar mesa como ocupada
-            mesa.estado = 'ocupada'
+            orden = OrdenService._abrir_orden(mesa_id, mozo_id, tipo, cliente_nombre, num_comensales)
             db.session.commit()
 
             return orden
@@ -81,6 +115,81 @@ class OrdenService:
         except Exception as e:
             raise e
 
+    @staticmethod
+    def _bloquear_orden(orden_id):
+        """
+        Lee la orden bloqueando solo su fila hasta el commit. populate_existing descarta
+        lo que la sesión tuviera en memoria: los comandos validan sobre el último valor
+        confirmado.
+        """
+        orden = db.session.get(Orden, orden_id, with_for_update=True, populate_existing=True)
+        if not orden:
+            raise ValueError("Orden no encontrada")
+        return orden
+
+    @staticmethod
+    def _items_bloqueados(orden_id):
+        """
+        Ítems de la orden (ya bloqueada) leídos con FOR UPDATE: lectura actual y no la
+        foto de la transacción, con lo que haya confirmado el comando que tenía el bloqueo
+        """
+        return db.session.execute(
+            select(ItemOrden).where(ItemOrden.orden_id == orden_id).order_by(ItemOrden.id)
+            .with_for_update().execution_options(populate_existing=True)
+        ).scalars().all()
+
+    @staticmethod
+    def _bloquear_orden_de_item(item_id):
+        """
+        Devuelve (item, orden) con la orden del ítem bloqueada. El ítem se vuelve a leer
+        después del bloqueo, junto con los demás ítems de la orden: lo leído antes puede
+        ser de un comando concurrente que ya confirmó (cantidad, estado) o haberse borrado
+        mientras se esperaba el bloqueo.
+        """
+        orden_id = db.session.execute(
+            select(ItemOrden.orden_id).where(ItemOrden.id == item_id)
+        ).scalar_one_or_none()
+        if orden_id is None:
+            raise ValueError("Item no encontrado")
+        orden = OrdenService._bloquear_orden(orden_id)
+        item = next((i for i in OrdenService._items_bloqueados(orden.id) if i.id == item_id), None)
+        if item is None:
+            raise ValueError("Item no encontrado")
+        return item, orden
+
+    @staticmethod
+    def _estado_por_items(orden_id):
+        """
+        Estado que corresponde a la orden según sus ítems no cancelados (None si no le
+        quedan ítems): todos servidos -> servida; todos listos o servidos -> lista; todos
+        sin empezar -> confirmada; en otro caso -> preparando. Lectura con FOR UPDATE (la
+        orden ya está bloqueada) para contar los cambios confirmados por otras estaciones.
+        """
+        conteos = Counter(db.session.execute(
+            select(ItemOrden.estado)
+            .where(ItemOrden.orden_id == orden_id, ItemOrden.estado != 'cancelado')
+            .with_for_update()
+        ).scalars())
+        total = sum(conteos.values())
+        if not total:
+            return None
+        if conteos.get('servido', 0) == total:
+            return 'servida'
+        if conteos.get('listo', 0) + conteos.get('servido', 0) == total:
+            return 'lista'
+        if conteos.get('pendiente', 0) + conteos.get('en_cola', 0) == total:
+            return 'confirmada'
+        return 'preparando'
+
+    @staticmethod
+    def _sincronizar_estado_orden(orden):
+        """Ajusta el estado de una orden en curso al avance de sus ítems (misma transacción)"""
+        if orden.estado not in ESTADOS_ORDEN_EN_CURSO:
+            return
+        estado = OrdenService._estado_por_items(orden.id)
+        if estado and estado != orden.estado:
+            orden.estado = estado
+
     @staticmethod
     def obtener_ordenes_por_mozo(mozo_id):
         """Obtiene órdenes de un mozo específico"""
@@ -101,7 +210,7 @@ class OrdenService:
     def agregar_producto_a_orden(orden_id, producto_id, cantidad, precio_unitario, estacion=None, notas=None):
         """Agrega un producto a una orden existente"""
         try:
-            orden = OrdenService.obtener_orden_por_id(orden_id)
+            orden = OrdenService._bloquear_orden(orden_id)
 
             # Verificar que la orden no esté en estado final
             if orden.estado in ['pagada', 'cancelada']:
@@ -115,6 +224,9 @@ class OrdenService:
             if not producto.disponible:
                 raise ValueError("Producto no disponible")
 
+            # El frontend envía el precio como número JSON (float); monto_total es Numeric
+            precio_unitario = Decimal(str(precio_unitario))
+
             # Crear item de orden
             item = ItemOrden(
                 orden_id=orden_id,
@@ -148,12 +260,14 @@ class OrdenService:
 
     @staticmethod
     def actualizar_estado_item(item_id, estado):
-        """Actualiza el estado de un item de orden"""
+        """
+        Actualiza el estado de un item de orden y, en la misma transacción, el estado
+        de la orden según el avance de todos sus ítems.
+        """
         try:
-            item = ItemOrden.query.get(item_id)
-            if not item:
-                raise ValueError("Item no encontrado")
+            item, orden = OrdenService._bloquear_orden_de_item(item_id)
 
+            estado_anterior = item.estado
             item.estado = estado
 
             # Actualizar timestamps según el estado
@@ -164,16 +278,12 @@ class OrdenService:
             elif estado == 'servido':
                 item.fecha_servido = datetime.utcnow()
 
-            # Si todos los items están servidos, marcar orden como servida
-            if estado == 'servido':
-                items_pendientes = ItemOrden.query.filter_by(
-                    orden_id=item.orden_id,
-                    estado='pendiente'
-                ).count()
+            # Tiempo de la fase que terminó, en el histograma de su estación y producto
+            AnaliticaCocinaService.registrar_cambio_estado(item, estado_anterior)
 
-                if items_pendientes == 0:
-                    orden = Orden.query.get(item.orden_id)
-                    orden.estado = 'servida'
+            # Con la orden bloqueada, dos estaciones que terminan a la vez los últimos
+            # ítems ven el estado de la otra y la orden no queda atrás
+            OrdenService._sincronizar_estado_orden(orden)
 
             db.session.commit()
             return item
@@ -186,7 +296,7 @@ class OrdenService:
     def actualizar_estado_orden(orden_id, estado):
         """Actualiza el estado de una orden completa"""
         try:
-            orden = OrdenService.obtener_orden_por_id(orden_id)
+            orden = OrdenService._bloquear_orden(orden_id)
 
             # Validar transiciones de estado
             estados_validos = {
@@ -202,7 +312,11 @@ class OrdenService:
             if estado not in estados_validos.get(orden.estado, []):
                 raise ValueError(f"No se puede cambiar de {orden.estado} a {estado}")
 
-            orden.estado = estado
+            if estado == 'cancelada':
+                # Cancelar por cambio de estado libera mesa e ítems igual que cancelar_orden
+                OrdenService._cancelar(orden)
+            else:
+                orden.estado = estado
             db.session.commit()
 
             return orden
@@ -211,22 +325,32 @@ class OrdenService:
             db.session.rollback()
             raise e
 
+    @staticmethod
+    def _cancelar(orden):
+        """Cancela la orden, sus ítems pendientes y libera la mesa (sin commit)"""
+        orden.estado = 'cancelada'
+
+        # Los ítems que no se sirvieron salen de cocina en la misma transacción
+        db.session.execute(
+            update(ItemOrden)
+            .where(ItemOrden.orden_id == orden.id, ItemOrden.estado.in_(ESTADOS_ITEM_ACTIVOS))
+            .values(estado='cancelado')
+        )
+
+        # Liberar mesa (si sigue ocupada)
+        if orden.mesa:
+            MesaEstadoService.transicionar(orden.mesa, 'disponible', desde=('ocupada',), estricto=False, motivo='orden_cancelada')
+
     @staticmethod
     def cancelar_orden(orden_id):
         """Cancela una orden y libera la mesa"""
         try:
-            orden = OrdenService.obtener_orden_por_id(orden_id)
+            orden = OrdenService._bloquear_orden(orden_id)
 
             if orden.estado == 'pagada':
                 raise ValueError("No se puede cancelar una orden pagada")
 
-            # Marcar orden como cancelada
-            orden.estado = 'cancelada'
-
-            # Liberar mesa
-            if orden.mesa:
-                orden.mesa.estado = 'disponible'
-
+            OrdenService._cancelar(orden)
             db.session.commit()
 
             return orden
@@ -270,7 +394,8 @@ class OrdenService:
     def procesar_pago(orden_id, metodo, monto=None):
         """Procesa el pago de una orden"""
         try:
-            orden = OrdenService.obtener_orden_por_id(orden_id)
+            # La orden bloqueada impide que dos cajas cobren la misma orden
+            orden = OrdenService._bloquear_orden(orden_id)
 
             if orden.estado != 'servida':
                 raise ValueError("Solo se pueden pagar órdenes servidas")
@@ -281,7 +406,7 @@ class OrdenService:
             # Crear registro de pago
             pago = Pago(
                 orden_id=orden_id,
-                monto=monto_pago,
+                monto=Decimal(str(monto_pago)),
                 metodo=metodo,
                 estado='pagado'
             )
@@ -291,9 +416,9 @@ class OrdenService:
             # Marcar orden como pagada
             orden.estado = 'pagada'
 
-            # Liberar mesa
+            # Liberar mesa (si sigue ocupada)
             if orden.mesa:
-                orden.mesa.estado = 'disponible'
+                MesaEstadoService.transicionar(orden.mesa, 'disponible', desde=('ocupada',), estricto=False, motivo='pago')
 
             db.session.commit()
 
@@ -307,7 +432,7 @@ class OrdenService:
     def editar_orden(orden_id, data):
         """Edita una orden existente"""
         try:
-            orden = OrdenService.obtener_orden_por_id(orden_id)
+            orden = OrdenService._bloquear_orden(orden_id)
 
             # Verificar que la orden no esté en estado final
             if orden.estado in ['pagada', 'cancelada']:
@@ -337,15 +462,15 @@ class OrdenService:
     def eliminar_orden(orden_id):
         """Elimina una orden (solo si está pendiente o cancelada)"""
         try:
-            orden = OrdenService.obtener_orden_por_id(orden_id)
+            orden = OrdenService._bloquear_orden(orden_id)
 
             # Solo permitir eliminar órdenes pendientes o canceladas
             if orden.estado not in ['pendiente', 'cancelada']:
                 raise ValueError("Solo se pueden eliminar órdenes pendientes o canceladas")
 
             # Liberar mesa si está ocupada
-            if orden.mesa and orden.mesa.estado == 'ocupada':
-                orden.mesa.estado = 'disponible'
+            if orden.mesa:
+                MesaEstadoService.transicionar(orden.mesa, 'disponible', desde=('ocupada',), estricto=False, motivo='orden_eliminada')
 
             db.session.delete(orden)
             db.session.commit()
@@ -369,11 +494,7 @@ class OrdenService:
     def editar_item_orden(item_id, data):
         """Edita un item de orden específico"""
         try:
-            item = ItemOrden.query.get(item_id)
-            if not item:
-                raise ValueError("Item no encontrado")
-
-            orden = Orden.query.get(item.orden_id)
+            item, orden = OrdenService._bloquear_orden_de_item(item_id)
             if orden.estado in ['pagada', 'cancelada']:
                 raise ValueError("No se puede editar items de una orden pagada o cancelada")
 
@@ -387,13 +508,14 @@ class OrdenService:
             if 'cantidad' in data:
                 item.precio_unitario = item.precio_unitario  # Mantener precio actual
                 # Actualizar total de la orden considerando comensales
+                items = OrdenService._items_bloqueados(orden.id)
                 if orden.num_comensales > 1:
                     orden.monto_total = sum(
-                        item.cantidad * item.precio_unitario * orden.num_comensales for item in orden.items
+                        i.cantidad * i.precio_unitario * orden.num_comensales for i in items
                     )
                 else:
                     orden.monto_total = sum(
-                        item.cantidad * item.precio_unitario for item in orden.items
+                        i.cantidad * i.precio_unitario for i in items
                     )
 
             db.session.commit()
@@ -407,11 +529,7 @@ class OrdenService:
     def eliminar_item_orden(item_id):
         """Elimina un item de orden"""
         try:
-            item = ItemOrden.query.get(item_id)
-            if not item:
-                raise ValueError("Item no encontrado")
-
-            orden = Orden.query.get(item.orden_id)
+            item, orden = OrdenService._bloquear_orden_de_item(item_id)
             if orden.estado in ['pagada', 'cancelada']:
                 raise ValueError("No se puede eliminar items de una orden pagada o cancelada")
 
@@ -426,9 +544,11 @@ class OrdenService:
             # Actualizar total de la orden
             orden.monto_total -= precio_item
 
-            # Si no quedan items, cambiar estado a pendiente
-            if len(orden.items) == 0:
+            # Si no quedan items, cambiar estado a pendiente; si no, el estado sigue a los que quedan
+            if OrdenService._estado_por_items(orden.id) is None:
                 orden.estado = 'pendiente'
+            else:
+                OrdenService._sincronizar_estado_orden(orden)
 
             db.session.commit()
 
@@ -2,8 +2,70 @@ from models import db
 from models.core import PermisoTemporal, Auditoria
 from models.user import Usuario
 from sqlalchemy import and_, or_
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from time import monotonic
+from typing import List, Dict, Optional, FrozenSet
+from flask import current_app
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _utc_naive(fecha: Optional[datetime]) -> Optional[datetime]:
+    """expira_en puede llegar con zona horaria desde la API; se compara en UTC sin zona."""
+    if fecha is not None and fecha.tzinfo is not None:
+        return fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+
+class EvaluadorPermisos:
+    """
+    Permisos efectivos de cada usuario en caché del proceso.
+
+    Cada entrada vale hasta el próximo vencimiento entre sus permisos, o como máximo
+    PERMISOS_CACHE_TTL segundos para ver concesiones y revocaciones hechas en otros
+    workers. Las de este proceso invalidan la entrada al confirmarse.
+    """
+
+    def __init__(self):
+        self._entradas: Dict[int, tuple] = {}
+        self._lock = Lock()
+
+    def permisos(self, user_id: int) -> FrozenSet[str]:
+        """Permisos activos y no vencidos del usuario."""
+        user_id = int(user_id)
+        ahora = datetime.utcnow()
+        entrada = self._entradas.get(user_id)
+        if entrada is not None:
+            permisos, proximo_vencimiento, valido_hasta = entrada
+            if monotonic() < valido_hasta and (proximo_vencimiento is None or ahora < proximo_vencimiento):
+                return permisos
+
+        filas = db.session.query(PermisoTemporal.permiso, PermisoTemporal.expira_en).filter(
+            PermisoTemporal.usuario_id == user_id,
+            PermisoTemporal.activo == True,
+            or_(PermisoTemporal.expira_en.is_(None), PermisoTemporal.expira_en > ahora)
+        ).all()
+        vencimientos = [_utc_naive(fila.expira_en) for fila in filas if fila.expira_en is not None]
+        permisos = frozenset(fila.permiso for fila in filas)
+        ttl = current_app.config.get('PERMISOS_CACHE_TTL', 30)
+        with self._lock:
+            self._entradas[user_id] = (permisos, min(vencimientos, default=None), monotonic() + ttl)
+        return permisos
+
+    def tiene(self, user_id: int, permiso: str) -> bool:
+        return permiso in self.permisos(user_id)
+
+    def invalidar(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(int(user_id), None)
+
+
+evaluador_permisos = EvaluadorPermisos()
 
 class PermissionService:
     """Servicio para gestión de permisos temporales"""
@@ -106,7 +168,7 @@ class PermissionService:
             return result
             
         except Exception as e:
-            print(f"Error getting user permissions: {e}")
+            logger.exception("Error getting user permissions")
             return []
     
     @staticmethod
@@ -171,6 +233,7 @@ class PermissionService:
             db.session.add(audit)
             
             db.session.commit()
+            evaluador_permisos.invalidar(user_id)
             
             return {
                 'success': True,
@@ -180,7 +243,7 @@ class PermissionService:
             
         except Exception as e:
             db.session.rollback()
-            print(f"Error granting permissions: {e}")
+            logger.exception("Error granting permissions")
             return {'success': False, 'message': f'Error al conceder permisos: {str(e)}'}
     
     @staticmethod
@@ -221,6 +284,7 @@ class PermissionService:
                 db.session.add(audit)
             
             db.session.commit()
+            evaluador_permisos.invalidar(user_id)
             
             return {
                 'success': True,
@@ -230,53 +294,36 @@ class PermissionService:
             
         except Exception as e:
             db.session.rollback()
-            print(f"Error revoking permissions: {e}")
+            logger.exception("Error revoking permissions")
             return {'success': False, 'message': f'Error al revocar permisos: {str(e)}'}
     
     @staticmethod
     def check_user_permission(user_id: int, permission: str) -> bool:
         """
-        Verifica si un usuario tiene un permiso específico activo
+        Verifica si un usuario tiene un permiso específico activo (caché por proceso)
         """
         try:
-            now = datetime.utcnow()
-            permission_obj = PermisoTemporal.query.filter(
-                and_(
-                    PermisoTemporal.usuario_id == user_id,
-                    PermisoTemporal.permiso == permission,
-                    PermisoTemporal.activo == True,
-                    or_(
-                        PermisoTemporal.expira_en.is_(None),
-                        PermisoTemporal.expira_en > now
-                    )
-                )
-            ).first()
-            
-            return permission_obj is not None
+            return evaluador_permisos.tiene(user_id, permission)
             
         except Exception as e:
-            print(f"Error checking permission: {e}")
+            logger.exception("Error checking permission")
             return False
     
     @staticmethod
     def cleanup_expired_permissions() -> int:
         """
-        Limpia permisos expirados automáticamente
+        Limpia permisos expirados con un único UPDATE masivo (lo ejecuta
+        periódicamente la tarea 'permisos-expirados', ver create_app)
         """
         try:
             now = datetime.utcnow()
-            expired_permissions = PermisoTemporal.query.filter(
+            count = PermisoTemporal.query.filter(
                 and_(
                     PermisoTemporal.activo == True,
                     PermisoTemporal.expira_en.isnot(None),
                     PermisoTemporal.expira_en <= now
                 )
-            ).all()
-            
-            count = 0
-            for perm in expired_permissions:
-                perm.activo = False
-                count += 1
+            ).update({PermisoTemporal.activo: False}, synchronize_session=False)
             
             if count > 0:
                 # Registrar en auditoría
@@ -292,7 +339,7 @@ class PermissionService:
             
         except Exception as e:
             db.session.rollback()
-            print(f"Error cleaning up expired permissions: {e}")
+            logger.exception("Error cleaning up expired permissions")
             return 0
     
     @staticmethod
@@ -319,7 +366,7 @@ class PermissionService:
             }
             
         except Exception as e:
-            print(f"Error getting permissions summary: {e}")
+            logger.exception("Error getting permissions summary")
             return {
                 'total_permissions': 0,
                 'active_permissions': 0,
@@ -1,16 +1,34 @@
-import traceback
+import logging
 from models.menu import ProductoIngrediente, Producto, Ingrediente
 from models import db
 from services.error_handler import ErrorHandler, ValidationError, BusinessLogicError
+from services.serializacion import Serializador
+from services.esquemas import ProductoIngredienteEsquema
 from typing import List, Dict, Any, Optional
 
+logger = logging.getLogger(__name__)
+
 class ProductoIngredienteService:
+    # Plan de carga del listado: una consulta por relación, sin cargas perezosas por fila
+    INCLUIR_LISTADO = ('producto', 'producto.categoria', 'producto.imagenes', 'ingrediente', 'ingrediente.tipo')
+
     @staticmethod
-    def get_productos_ingredientes() -> List[Dict[str, Any]]:
-        """Obtener todas las asociaciones producto-ingrediente"""
+    def get_productos_ingredientes(plano: bool = False) -> Any:
+        """
+        Obtener todas las asociaciones producto-ingrediente.
+        Con plano=True devuelve {'data': [...], 'incluidos': {...}} con los productos
+        e ingredientes referenciados una sola vez; si no, el formato anidado de to_dict.
+        """
         try:
-            asociaciones = ProductoIngrediente.query.all()
-            return [asociacion.to_dict() for asociacion in asociaciones]
+            asociaciones = Serializador.consulta(ProductoIngredienteEsquema).order_by(ProductoIngrediente.id).all()
+            incluir = ProductoIngredienteService.INCLUIR_LISTADO
+            if plano:
+                return Serializador.serializar(
+                    asociaciones, ProductoIngredienteEsquema, incluir=incluir,
+                    vistas={'producto': 'resumen', 'producto.categoria': 'resumen', 'ingrediente': 'resumen'}
+                )
+            resultado = Serializador.serializar(asociaciones, ProductoIngredienteEsquema, incluir=incluir)
+            return Serializador.anidar(resultado, ProductoIngredienteEsquema, incluir)
         except Exception as e:
             return ErrorHandler.handle_service_error(e, 'obtener asociaciones producto-ingrediente')
 
@@ -198,22 +216,16 @@ class ProductoIngredienteService:
     def verificar_stock_suficiente(producto_id: int, cantidad_necesaria: int = 1) -> tuple[bool, Dict[str, Any]]:
         """Verificar si hay stock suficiente para producir un producto"""
         try:
-            print(f"[SERVICE DEBUG] Verificando stock para producto {producto_id}")
             producto = Producto.query.get(producto_id)
-            print(f"[SERVICE DEBUG] Producto encontrado: {producto}")
             if not producto:
-                print(f"[SERVICE DEBUG] Producto no encontrado: {producto_id}")
                 return False, {'error': 'Producto no encontrado'}
 
             ingredientes_insuficientes = []
-            print(f"[SERVICE DEBUG] Producto tiene {len(producto.ingredientes_asociados)} ingredientes asociados")
 
             for asociacion in producto.ingredientes_asociados:
                 stock_necesario = float(asociacion.cantidad) * cantidad_necesaria
                 stock_disponible = float(asociacion.ingrediente.stock)
 
-                print(f"[SERVICE DEBUG] Ingrediente {asociacion.ingrediente.nombre}: stock_disponible={stock_disponible}, stock_necesario={stock_necesario}")
-
                 if stock_disponible < stock_necesario:
                     ingredientes_insuficientes.append({
                         'ingrediente_id': asociacion.ingrediente.id,
@@ -225,16 +237,14 @@ class ProductoIngredienteService:
                     })
 
             if ingredientes_insuficientes:
-                print(f"[SERVICE DEBUG] Stock insuficiente para {len(ingredientes_insuficientes)} ingredientes")
+                logger.debug("Stock insuficiente para producto %s: %d ingrediente(s)", producto_id, len(ingredientes_insuficientes))
                 return False, {
                     'error': 'Stock insuficiente',
                     'ingredientes_insuficientes': ingredientes_insuficientes
                 }
 
-            print("[SERVICE DEBUG] Stock suficiente disponible")
             return True, {'message': 'Stock suficiente disponible'}
 
         except Exception as e:
-            print(f"[SERVICE DEBUG] Error en verificar_stock_suficiente: {str(e)}")
-            print(f"[SERVICE DEBUG] Traceback: {traceback.format_exc()}")
+            logger.exception("Error verificando stock del producto %s", producto_id)
             return False, {'error': f'Error verificando stock: {str(e)}'}
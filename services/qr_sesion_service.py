@@ -0,0 +1,462 @@
+"""
+Sesiones QR de mesa y wishlist de los comensales.
+
+Un comensal escanea el QR de la mesa y obtiene un id de sesión firmado
+(`<mesa_id>-<aleatorio>-<hmac>`) que identifica su wishlist sin estado en el servidor:
+cualquier worker puede atenderlo y nadie puede fabricar uno sin escanear el QR.
+
+- IndiceQR: qr_code -> mesa y productos disponibles en caché del proceso (QR_INDICE_TTL),
+  para no consultar la base en cada toque del comensal.
+- AlmacenWishlist: wishlists por sesión en memoria, acotado (QR_SESIONES_MAX, QR_SESION_TTL).
+  Los toques se acumulan como cambios pendientes y se vuelcan a la tabla `wishlist` en lote
+  (tarea periódica 'wishlist-volcado', al cerrar el worker y antes de leer para el mesero).
+  Cada sesión combina una copia de la base (refrescada cada QR_SESION_REFRESCO segundos, así
+  se ven los cambios volcados por otros workers) con los cambios pendientes de este proceso.
+- QRSesionService.convertir_en_orden: el mesero convierte la wishlist en ítems de la orden
+  abierta de la mesa (o de una nueva) en una sola transacción.
+
+La tabla `wishlist` no tiene cantidad: cada unidad es una fila.
+"""
+import hashlib
+import hmac
+import logging
+import secrets
+from collections import Counter, OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+
+from models import db
+from models.local import Mesa
+from models.menu import Producto
+from models.order import Orden, ItemOrden, Wishlist
+from services.orden_service import OrdenService
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_ORDEN_ABIERTA = ('pendiente', 'confirmada', 'preparando', 'lista', 'servida')
+
+# Un QR o producto desconocido recarga el índice como mucho una vez cada N segundos
+_RECARGA_MINIMA = 5.0
+
+
+def _config(clave: str, por_defecto):
+    return current_app.config.get(clave, por_defecto)
+
+
+class IndiceQR:
+    """Mesas activas por QR e id, y productos disponibles, en caché del proceso."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._cargado_en: Optional[float] = None
+        self._mesas_por_qr: Dict[str, Dict[str, Any]] = {}
+        self._mesas_por_id: Dict[int, Dict[str, Any]] = {}
+        self._productos: Dict[int, Dict[str, Any]] = {}
+
+    def _cargar(self):
+        mesas = db.session.execute(
+            select(Mesa.id, Mesa.numero, Mesa.qr_code, Mesa.zona_id, Mesa.capacidad).where(Mesa.activo == True)
+        ).all()
+        productos = db.session.execute(
+            select(Producto.id, Producto.nombre, Producto.precio, Producto.tipo_estacion).where(Producto.disponible == True)
+        ).all()
+
+        por_id = {
+            m.id: {'mesa_id': m.id, 'numero': m.numero, 'zona_id': m.zona_id, 'capacidad': m.capacidad}
+            for m in mesas
+        }
+        with self._lock:
+            self._mesas_por_id = por_id
+            self._mesas_por_qr = {m.qr_code: por_id[m.id] for m in mesas if m.qr_code}
+            self._productos = {
+                p.id: {'producto_id': p.id, 'nombre': p.nombre, 'precio': p.precio, 'tipo_estacion': p.tipo_estacion}
+                for p in productos
+            }
+            self._cargado_en = monotonic()
+
+    def _buscar(self, tabla: str, clave):
+        edad = None if self._cargado_en is None else monotonic() - self._cargado_en
+        if edad is None or edad > _config('QR_INDICE_TTL', 60):
+            self._cargar()
+        valor = getattr(self, tabla).get(clave)
+        if valor is None and edad is not None and edad > _RECARGA_MINIMA:
+            # Puede ser una mesa o un producto recién creado
+            self._cargar()
+            valor = getattr(self, tabla).get(clave)
+        return valor
+
+    def mesa_por_qr(self, qr_code: str) -> Optional[Dict[str, Any]]:
+        return self._buscar('_mesas_por_qr', qr_code)
+
+    def mesa_por_id(self, mesa_id: int) -> Optional[Dict[str, Any]]:
+        return self._buscar('_mesas_por_id', mesa_id)
+
+    def producto(self, producto_id: int) -> Optional[Dict[str, Any]]:
+        return self._buscar('_productos', producto_id)
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado_en = None
+
+
+class SesionWishlist:
+    """Copia de la base (`base`) más los cambios de este proceso aún no volcados."""
+    __slots__ = ('mesa_id', 'base', 'base_en', 'generacion', 'agregados', 'quitados', 'en_vuelo', 'usado_en')
+
+    def __init__(self, mesa_id: int):
+        self.mesa_id = mesa_id
+        self.base: Counter = Counter()
+        self.base_en: Optional[float] = None
+        self.generacion = 0
+        self.agregados: Counter = Counter()
+        self.quitados: Counter = Counter()
+        self.en_vuelo: Optional[Tuple[Counter, Counter]] = None
+        self.usado_en = monotonic()
+
+    @property
+    def pendiente(self) -> bool:
+        return bool(self.agregados or self.quitados or self.en_vuelo)
+
+    def contenido(self) -> Counter:
+        total = self.base + self.agregados
+        total.subtract(self.quitados)
+        if self.en_vuelo:
+            total.update(self.en_vuelo[0])
+            total.subtract(self.en_vuelo[1])
+        return +total
+
+
+class AlmacenWishlist:
+    """Wishlists por sesión QR en memoria con volcado diferido a la tabla `wishlist`."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._sesiones: 'OrderedDict[str, SesionWishlist]' = OrderedDict()
+
+    def _sesion(self, sesion_id: str, mesa_id: int) -> SesionWishlist:
+        """Sesión en memoria (con el lock tomado); expulsa las más antiguas sin cambios pendientes."""
+        sesion = self._sesiones.get(sesion_id)
+        if sesion is None:
+            sesion = self._sesiones[sesion_id] = SesionWishlist(mesa_id)
+            exceso = len(self._sesiones) - _config('QR_SESIONES_MAX', 5000)
+            for antigua in list(self._sesiones)[:max(0, exceso)]:
+                if not self._sesiones[antigua].pendiente:
+                    del self._sesiones[antigua]
+        else:
+            self._sesiones.move_to_end(sesion_id)
+        sesion.usado_en = monotonic()
+        return sesion
+
+    def _refrescar(self, sesion_id: str, mesa_id: int) -> SesionWishlist:
+        with self._lock:
+            sesion = self._sesion(sesion_id, mesa_id)
+            if sesion.base_en is not None and monotonic() - sesion.base_en < _config('QR_SESION_REFRESCO', 10):
+                return sesion
+            generacion = sesion.generacion
+
+        filas = db.session.execute(
+            select(Wishlist.producto_id, func.count(Wishlist.id))
+            .where(Wishlist.qr_sesion_id == sesion_id)
+            .group_by(Wishlist.producto_id)
+        ).all()
+
+        with self._lock:
+            # Un volcado terminado mientras se leía ya aplicó sus cambios a la base
+            if sesion.generacion == generacion:
+                sesion.base = Counter({producto_id: cantidad for producto_id, cantidad in filas})
+                sesion.base_en = monotonic()
+        return sesion
+
+    def contenido(self, sesion_id: str, mesa_id: int) -> Counter:
+        sesion = self._refrescar(sesion_id, mesa_id)
+        with self._lock:
+            return sesion.contenido()
+
+    def agregar(self, sesion_id: str, mesa_id: int, producto_id: int, cantidad: int) -> Counter:
+        sesion = self._refrescar(sesion_id, mesa_id)
+        with self._lock:
+            if sum(sesion.contenido().values()) + cantidad > _config('QR_WISHLIST_MAX_ITEMS', 50):
+                raise ValueError("La wishlist alcanzó el máximo de productos")
+            sesion.agregados[producto_id] += cantidad
+            return sesion.contenido()
+
+    def quitar(self, sesion_id: str, mesa_id: int, producto_id: int, cantidad: Optional[int] = None) -> Counter:
+        """Quita `cantidad` unidades del producto (todas si es None)."""
+        sesion = self._refrescar(sesion_id, mesa_id)
+        with self._lock:
+            disponibles = sesion.contenido()[producto_id]
+            cantidad = disponibles if cantidad is None else max(0, min(cantidad, disponibles))
+            # Primero se descuentan los toques aún no volcados: no llegan a la base
+            sin_volcar = min(cantidad, sesion.agregados[producto_id])
+            sesion.agregados[producto_id] -= sin_volcar
+            sesion.quitados[producto_id] += cantidad - sin_volcar
+            sesion.agregados, sesion.quitados = +sesion.agregados, +sesion.quitados
+            return sesion.contenido()
+
+    def olvidar(self, sesion_id: str):
+        with self._lock:
+            self._sesiones.pop(sesion_id, None)
+
+    def volcar(self) -> int:
+        """Escribe en lote los cambios pendientes; devuelve las filas insertadas o borradas."""
+        with self._lock:
+            lote = []
+            for sesion_id, sesion in self._sesiones.items():
+                if (sesion.agregados or sesion.quitados) and sesion.en_vuelo is None:
+                    sesion.en_vuelo = (sesion.agregados, sesion.quitados)
+                    sesion.agregados, sesion.quitados = Counter(), Counter()
+                    lote.append((sesion_id, sesion))
+            self._expirar()
+
+        if not lote:
+            return 0
+
+        try:
+            ahora = datetime.utcnow()
+            nuevas = [
+                {'qr_sesion_id': sesion_id, 'mesa_id': sesion.mesa_id, 'producto_id': producto_id, 'creado_en': ahora}
+                for sesion_id, sesion in lote
+                for producto_id, cantidad in sesion.en_vuelo[0].items()
+                for _ in range(cantidad)
+            ]
+            if nuevas:
+                db.session.execute(insert(Wishlist), nuevas)
+
+            quitados = {sesion_id: Counter(sesion.en_vuelo[1]) for sesion_id, sesion in lote if sesion.en_vuelo[1]}
+            borrar = []
+            if quitados:
+                filas = db.session.execute(
+                    select(Wishlist.id, Wishlist.qr_sesion_id, Wishlist.producto_id)
+                    .where(Wishlist.qr_sesion_id.in_(list(quitados)))
+                    .order_by(Wishlist.id.desc())
+                ).all()
+                for fila in filas:
+                    if quitados[fila.qr_sesion_id][fila.producto_id] > 0:
+                        quitados[fila.qr_sesion_id][fila.producto_id] -= 1
+                        borrar.append(fila.id)
+                if borrar:
+                    db.session.execute(delete(Wishlist).where(Wishlist.id.in_(borrar)))
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                for _, sesion in lote:
+                    sesion.agregados.update(sesion.en_vuelo[0])
+                    sesion.quitados.update(sesion.en_vuelo[1])
+                    sesion.en_vuelo = None
+            raise
+
+        with self._lock:
+            for _, sesion in lote:
+                agregados, quitados_sesion = sesion.en_vuelo
+                sesion.base.update(agregados)
+                sesion.base.subtract(quitados_sesion)
+                sesion.base = +sesion.base
+                sesion.en_vuelo = None
+                sesion.generacion += 1
+        return len(nuevas) + len(borrar)
+
+    def _expirar(self):
+        """Descarta (con el lock tomado) las sesiones inactivas sin cambios pendientes."""
+        limite = monotonic() - _config('QR_SESION_TTL', 4 * 3600)
+        for sesion_id in [s for s, sesion in self._sesiones.items() if sesion.usado_en < limite and not sesion.pendiente]:
+            del self._sesiones[sesion_id]
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'sesiones': len(self._sesiones),
+                'pendientes': sum(1 for s in self._sesiones.values() if s.pendiente)
+            }
+
+
+indice_qr = IndiceQR()
+almacen_wishlist = AlmacenWishlist()
+
+
+class QRSesionService:
+    """Servicio de sesiones QR de mesa y sus wishlists"""
+
+    @staticmethod
+    def _firmar(cuerpo: str) -> str:
+        clave = current_app.config['SECRET_KEY'].encode()
+        return hmac.new(clave, f'qr-sesion:{cuerpo}'.encode(), hashlib.sha256).hexdigest()[:32]
+
+    @staticmethod
+    def iniciar_sesion(qr_code: str) -> Dict[str, Any]:
+        """
+        Resuelve el QR de la mesa y crea un id de sesión para el comensal:
+        `<mesa_id>-<aleatorio>-<firma>`, con la firma HMAC de SECRET_KEY. El id no se
+        guarda en ningún lado, pero no se puede fabricar sin haber escaneado el QR.
+        """
+        mesa = indice_qr.mesa_por_qr(qr_code)
+        if not mesa:
+            raise ValueError("Mesa no encontrada")
+        cuerpo = f"{mesa['mesa_id']}-{secrets.token_urlsafe(16)}"
+        return {'sesion_id': f"{cuerpo}-{QRSesionService._firmar(cuerpo)}", 'mesa': mesa}
+
+    @staticmethod
+    def mesa_de_sesion(sesion_id: str) -> Dict[str, Any]:
+        """Mesa codificada en el id de sesión, tras verificar su firma"""
+        cuerpo, _, firma = (sesion_id or '').rpartition('-')
+        mesa_id, _, aleatorio = cuerpo.partition('-')
+        valida = (
+            mesa_id.isdigit() and len(aleatorio) >= 16
+            and hmac.compare_digest(firma, QRSesionService._firmar(cuerpo))
+        )
+        mesa = indice_qr.mesa_por_id(int(mesa_id)) if valida else None
+        if not mesa:
+            raise ValueError("Sesión QR inválida")
+        return mesa
+
+    @staticmethod
+    def _detalle(contenido: Counter) -> List[Dict[str, Any]]:
+        detalle = []
+        for producto_id, cantidad in sorted(contenido.items()):
+            producto = indice_qr.producto(producto_id) or {'producto_id': producto_id, 'nombre': None, 'precio': None}
+            detalle.append({
+                'producto_id': producto_id,
+                'nombre': producto['nombre'],
+                'precio': producto['precio'],
+                'cantidad': cantidad,
+                'disponible': producto['nombre'] is not None
+            })
+        return detalle
+
+    @staticmethod
+    def obtener_wishlist(sesion_id: str) -> Dict[str, Any]:
+        """Wishlist de la sesión (memoria del proceso más lo ya volcado)"""
+        mesa = QRSesionService.mesa_de_sesion(sesion_id)
+        contenido = almacen_wishlist.contenido(sesion_id, mesa['mesa_id'])
+        return {'sesion_id': sesion_id, 'mesa': mesa, 'items': QRSesionService._detalle(contenido)}
+
+    @staticmethod
+    def agregar_producto(sesion_id: str, producto_id: int, cantidad: int = 1) -> Dict[str, Any]:
+        """Agrega unidades de un producto disponible a la wishlist (sin escribir en la base)"""
+        mesa = QRSesionService.mesa_de_sesion(sesion_id)
+        if cantidad < 1:
+            raise ValueError("La cantidad debe ser al menos 1")
+        if not indice_qr.producto(producto_id):
+            raise ValueError("Producto no disponible")
+        contenido = almacen_wishlist.agregar(sesion_id, mesa['mesa_id'], producto_id, cantidad)
+        return {'sesion_id': sesion_id, 'mesa': mesa, 'items': QRSesionService._detalle(contenido)}
+
+    @staticmethod
+    def quitar_producto(sesion_id: str, producto_id: int, cantidad: Optional[int] = None) -> Dict[str, Any]:
+        """Quita unidades de un producto de la wishlist (todas si no se indica cantidad)"""
+        mesa = QRSesionService.mesa_de_sesion(sesion_id)
+        if cantidad is not None and cantidad < 1:
+            raise ValueError("La cantidad debe ser al menos 1")
+        contenido = almacen_wishlist.quitar(sesion_id, mesa['mesa_id'], producto_id, cantidad)
+        return {'sesion_id': sesion_id, 'mesa': mesa, 'items': QRSesionService._detalle(contenido)}
+
+    @staticmethod
+    def volcar_wishlists() -> int:
+        """Escribe en la base los cambios pendientes de este proceso"""
+        return almacen_wishlist.volcar()
+
+    @staticmethod
+    def wishlists_de_mesa(mesa_id: int) -> List[Dict[str, Any]]:
+        """Wishlists de todas las sesiones de una mesa, para el mesero"""
+        almacen_wishlist.volcar()
+        filas = db.session.execute(
+            select(Wishlist.qr_sesion_id, Wishlist.producto_id, func.count(Wishlist.id), func.min(Wishlist.creado_en))
+            .where(Wishlist.mesa_id == mesa_id)
+            .group_by(Wishlist.qr_sesion_id, Wishlist.producto_id)
+        ).all()
+
+        sesiones: Dict[str, Dict[str, Any]] = {}
+        for sesion_id, producto_id, cantidad, creado_en in filas:
+            sesion = sesiones.setdefault(sesion_id, {'sesion_id': sesion_id, 'contenido': Counter(), 'creado_en': creado_en})
+            sesion['contenido'][producto_id] = cantidad
+            sesion['creado_en'] = min(sesion['creado_en'], creado_en)
+
+        return [
+            {
+                'sesion_id': sesion['sesion_id'],
+                'creado_en': sesion['creado_en'].isoformat() if sesion['creado_en'] else None,
+                'items': QRSesionService._detalle(sesion['contenido'])
+            }
+            for sesion in sorted(sesiones.values(), key=lambda s: s['creado_en'] or datetime.min)
+        ]
+
+    @staticmethod
+    def convertir_en_orden(sesion_id: str, mozo_id: int, orden_id: Optional[int] = None,
+                           num_comensales: int = 1) -> Tuple[Orden, List[int]]:
+        """
+        Convierte la wishlist en ítems de una orden en una sola transacción: la orden
+        indicada, la orden abierta de la mesa o una nueva. Devuelve la orden y los
+        productos omitidos por no estar disponibles.
+        """
+        mesa = QRSesionService.mesa_de_sesion(sesion_id)
+        almacen_wishlist.volcar()
+
+        contenido = dict(db.session.execute(
+            select(Wishlist.producto_id, func.count(Wishlist.id))
+            .where(Wishlist.qr_sesion_id == sesion_id)
+            .group_by(Wishlist.producto_id)
+        ).all())
+        if not contenido:
+            raise ValueError("La wishlist está vacía")
+
+        try:
+            if orden_id is None:
+                orden_id = db.session.execute(
+                    select(Orden.id).where(
+                        Orden.mesa_id == mesa['mesa_id'],
+                        Orden.estado.in_(ESTADOS_ORDEN_ABIERTA)
+                    ).order_by(Orden.creado_en.desc()).limit(1)
+                ).scalar()
+                if orden_id is None:
+                    # La orden nueva se confirma junto con sus ítems
+                    orden = OrdenService._abrir_orden(mesa['mesa_id'], mozo_id, num_comensales=num_comensales)
+            if orden_id is not None:
+                orden = OrdenService._bloquear_orden(orden_id)
+                if orden.mesa_id != mesa['mesa_id'] or orden.estado not in ESTADOS_ORDEN_ABIERTA:
+                    raise ValueError("La orden no está abierta en la mesa de la sesión")
+
+            productos = {
+                p.id: p for p in Producto.query.filter(Producto.id.in_(list(contenido)), Producto.disponible == True)
+            }
+            omitidos = sorted(set(contenido) - set(productos))
+            if not productos:
+                raise ValueError("Ningún producto de la wishlist está disponible")
+
+            ahora = datetime.utcnow()
+            total = Decimal('0')
+            for producto_id, cantidad in contenido.items():
+                producto = productos.get(producto_id)
+                if producto is None:
+                    continue
+                db.session.add(ItemOrden(
+                    orden_id=orden.id,
+                    producto_id=producto_id,
+                    cantidad=cantidad,
+                    precio_unitario=producto.precio,
+                    estado='en_cola',
+                    estacion=producto.tipo_estacion,
+                    fecha_inicio=ahora
+                ))
+                total += cantidad * producto.precio
+
+            # Misma regla que agregar_producto_a_orden: el total se multiplica por comensales
+            if orden.num_comensales > 1:
+                total *= orden.num_comensales
+            orden.monto_total = Decimal(str(orden.monto_total or 0)) + total
+            orden.estado = 'confirmada'
+
+            db.session.execute(delete(Wishlist).where(Wishlist.qr_sesion_id == sesion_id))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        almacen_wishlist.olvidar(sesion_id)
+        return orden, omitidos
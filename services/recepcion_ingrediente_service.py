@@ -0,0 +1,179 @@
+from models.menu import Ingrediente
+from models.core import Auditoria
+from models import db
+from sqlalchemy import update, bindparam
+from sqlalchemy.orm import joinedload
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Dict, Any, Optional, Iterable
+
+class RecepcionIngredienteService:
+    """Servicio de recepción de mercadería por código de barras (tablet de almacén)."""
+
+    # Caché en proceso código de barras -> id de ingrediente (LRU acotado)
+    _cache_codigos: "OrderedDict[str, int]" = OrderedDict()
+    _cache_lock = Lock()
+    CACHE_MAX = 10000
+
+    # --- Caché de códigos ---
+
+    @staticmethod
+    def _cache_get(codigo: str) -> Optional[int]:
+        with RecepcionIngredienteService._cache_lock:
+            ingrediente_id = RecepcionIngredienteService._cache_codigos.get(codigo)
+            if ingrediente_id is not None:
+                RecepcionIngredienteService._cache_codigos.move_to_end(codigo)
+            return ingrediente_id
+
+    @staticmethod
+    def _cache_set(codigo: str, ingrediente_id: int):
+        with RecepcionIngredienteService._cache_lock:
+            cache = RecepcionIngredienteService._cache_codigos
+            cache[codigo] = ingrediente_id
+            cache.move_to_end(codigo)
+            while len(cache) > RecepcionIngredienteService.CACHE_MAX:
+                cache.popitem(last=False)
+
+    @staticmethod
+    def invalidar_cache(codigo: Optional[str] = None):
+        """Invalida un código concreto o toda la caché (tras editar/eliminar/importar ingredientes)."""
+        with RecepcionIngredienteService._cache_lock:
+            if codigo is None:
+                RecepcionIngredienteService._cache_codigos.clear()
+            else:
+                RecepcionIngredienteService._cache_codigos.pop(codigo, None)
+
+    @staticmethod
+    def resolver_codigos(codigos: Iterable[str]) -> Dict[str, int]:
+        """
+        Resuelve códigos de barras a ids. Los que no están en caché se buscan
+        en una sola consulta sobre el índice único de codigo_barras.
+        """
+        resueltos, faltantes = {}, []
+        for codigo in set(codigos):
+            ingrediente_id = RecepcionIngredienteService._cache_get(codigo)
+            if ingrediente_id is None:
+                faltantes.append(codigo)
+            else:
+                resueltos[codigo] = ingrediente_id
+
+        if faltantes:
+            filas = db.session.query(Ingrediente.codigo_barras, Ingrediente.id).filter(
+                Ingrediente.codigo_barras.in_(faltantes)
+            ).all()
+            for codigo, ingrediente_id in filas:
+                RecepcionIngredienteService._cache_set(codigo, ingrediente_id)
+                resueltos[codigo] = ingrediente_id
+
+        return resueltos
+
+    # --- Consulta y recepción ---
+
+    @staticmethod
+    def buscar_por_codigo(codigo: str) -> Optional[Dict[str, Any]]:
+        """Obtener un ingrediente por código de barras"""
+        codigo = (codigo or '').strip()
+        if not codigo:
+            return None
+
+        ingrediente_id = RecepcionIngredienteService.resolver_codigos([codigo]).get(codigo)
+        if ingrediente_id is None:
+            return None
+
+        ingrediente = Ingrediente.query.options(joinedload(Ingrediente.tipo)).get(ingrediente_id)
+        if not ingrediente or ingrediente.codigo_barras != codigo:
+            # El código fue reasignado desde que se cacheó
+            RecepcionIngredienteService.invalidar_cache(codigo)
+            ingrediente = Ingrediente.query.options(joinedload(Ingrediente.tipo)).filter_by(codigo_barras=codigo).first()
+            if not ingrediente:
+                return None
+            RecepcionIngredienteService._cache_set(codigo, ingrediente.id)
+
+        return ingrediente.to_dict()
+
+    @staticmethod
+    def _normalizar_escaneos(escaneos: List[Dict[str, Any]]) -> tuple[Dict[str, float], List[Dict[str, Any]]]:
+        """Valida los escaneos y suma cantidades por código (un producto puede escanearse varias veces)."""
+        cantidades, errores = {}, []
+        for indice, escaneo in enumerate(escaneos):
+            codigo = str((escaneo or {}).get('codigo_barras') or '').strip()
+            if not codigo:
+                errores.append({'indice': indice, 'error': 'codigo_barras es obligatorio'})
+                continue
+            try:
+                cantidad = float(escaneo.get('cantidad', 1))
+            except (ValueError, TypeError):
+                errores.append({'indice': indice, 'codigo_barras': codigo, 'error': 'La cantidad debe ser un número válido'})
+                continue
+            if cantidad <= 0:
+                errores.append({'indice': indice, 'codigo_barras': codigo, 'error': 'La cantidad debe ser mayor a cero'})
+                continue
+            cantidades[codigo] = round(cantidades.get(codigo, 0) + cantidad, 3)
+        return cantidades, errores
+
+    @staticmethod
+    def recibir(escaneos: List[Dict[str, Any]], usuario_id: Optional[int] = None) -> tuple[bool, Dict[str, Any]]:
+        """
+        Aplica la recepción de una entrega completa en una transacción.
+        Cada línea incrementa el stock de forma atómica (stock = stock + cantidad)
+        condicionada al código de barras, sin leer-modificar-escribir en Python.
+        """
+        try:
+            if not escaneos:
+                return False, {'error': 'Debe enviar al menos un escaneo'}
+
+            cantidades, errores = RecepcionIngredienteService._normalizar_escaneos(escaneos)
+            resueltos = RecepcionIngredienteService.resolver_codigos(cantidades.keys())
+
+            for codigo in cantidades:
+                if codigo not in resueltos:
+                    errores.append({'codigo_barras': codigo, 'error': 'Código de barras no registrado'})
+
+            lineas = [
+                {'b_id': resueltos[codigo], 'b_codigo': codigo, 'b_cantidad': cantidad}
+                for codigo, cantidad in cantidades.items() if codigo in resueltos
+            ]
+            if not lineas:
+                return False, {'error': 'Ningún escaneo válido', 'errores': errores}
+
+            tabla = Ingrediente.__table__
+            stmt = update(tabla).where(
+                tabla.c.id == bindparam('b_id'),
+                tabla.c.codigo_barras == bindparam('b_codigo')
+            ).values(stock=tabla.c.stock + bindparam('b_cantidad'))
+            resultado = db.session.execute(stmt, lineas)
+
+            if resultado.rowcount != len(lineas):
+                # Algún código cambió de ingrediente: descartar y pedir reintento con caché limpia
+                db.session.rollback()
+                RecepcionIngredienteService.invalidar_cache()
+                return False, {'error': 'Los códigos de barras cambiaron durante la recepción, reintente'}
+
+            ids = [linea['b_id'] for linea in lineas]
+            stocks = dict(db.session.query(Ingrediente.id, Ingrediente.stock).filter(Ingrediente.id.in_(ids)).all())
+
+            recibidos = [
+                {
+                    'ingrediente_id': linea['b_id'],
+                    'codigo_barras': linea['b_codigo'],
+                    'cantidad_recibida': linea['b_cantidad'],
+                    'stock_actual': float(stocks.get(linea['b_id']) or 0)
+                }
+                for linea in lineas
+            ]
+
+            db.session.add(Auditoria(
+                usuario_id=usuario_id,
+                entidad='ingrediente',
+                accion='recepcion',
+                valores_nuevos={'lineas': [
+                    {'ingrediente_id': r['ingrediente_id'], 'cantidad': r['cantidad_recibida']} for r in recibidos
+                ]}
+            ))
+            db.session.commit()
+
+            return True, {'recibidos': recibidos, 'errores': errores}
+
+        except Exception as e:
+            db.session.rollback()
+            return False, {'error': f'Error registrando recepción: {str(e)}'}
@@ -0,0 +1,193 @@
+from models import db
+from models.menu import Producto
+from models.order import Resena, ResumenResena
+from sqlalchemy import case, func, select, update, delete
+from sqlalchemy.exc import IntegrityError
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_MODERACION = {'pendiente': None, 'aprobada': True, 'rechazada': False}
+
+
+class ResenaService:
+    """
+    Servicio de reseñas de productos.
+
+    Las reseñas llegan pendientes (aprobada = None) y solo las aprobadas cuentan en
+    el resumen por producto (cantidad, suma e histograma en `resumen_resena`). El
+    resumen se ajusta en la misma transacción que la moderación, con un UPDATE
+    incremental, y el menú lee todos los resúmenes en una sola consulta.
+    """
+
+    @staticmethod
+    def crear_resena(producto_id: int, puntuacion: Any, nombre_cliente: Optional[str] = None,
+                     comentario: Optional[str] = None) -> Resena:
+        """Registra una reseña pendiente de moderación"""
+        try:
+            try:
+                puntuacion = int(puntuacion)
+            except (TypeError, ValueError):
+                raise ValueError("La puntuación debe ser un número entero")
+            if not 1 <= puntuacion <= 5:
+                raise ValueError("La puntuación debe estar entre 1 y 5")
+
+            nombre_cliente = (nombre_cliente or '').strip() or None
+            if nombre_cliente and len(nombre_cliente) > 100:
+                raise ValueError("El nombre no puede exceder 100 caracteres")
+            comentario = (comentario or '').strip() or None
+            if comentario and len(comentario) > 1000:
+                raise ValueError("El comentario no puede exceder 1000 caracteres")
+
+            producto = Producto.query.get(producto_id)
+            if not producto:
+                raise ValueError("Producto no encontrado")
+
+            resena = Resena(
+                producto_id=producto_id,
+                puntuacion=puntuacion,
+                nombre_cliente=nombre_cliente,
+                comentario=comentario,
+                aprobada=None
+            )
+            db.session.add(resena)
+            db.session.commit()
+            return resena
+
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    @staticmethod
+    def _ajustar_resumen(producto_id: int, puntuacion: int, delta: int):
+        """Suma (delta=1) o resta (delta=-1) una reseña aprobada al resumen del producto"""
+        columna = getattr(ResumenResena, f'estrellas_{puntuacion}')
+        valores = {
+            ResumenResena.cantidad: ResumenResena.cantidad + delta,
+            ResumenResena.suma: ResumenResena.suma + delta * puntuacion,
+            columna: columna + delta
+        }
+        sentencia = update(ResumenResena).where(ResumenResena.producto_id == producto_id).values(valores)
+        if db.session.execute(sentencia).rowcount or delta < 0:
+            return
+
+        # Primera reseña aprobada del producto
+        try:
+            with db.session.begin_nested():
+                db.session.add(ResumenResena(
+                    producto_id=producto_id, cantidad=1, suma=puntuacion,
+                    **{f'estrellas_{estrellas}': int(estrellas == puntuacion) for estrellas in range(1, 6)}
+                ))
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            db.session.execute(sentencia)
+
+    @staticmethod
+    def _cambiar_aprobacion(resena_id: int, aprobada: bool, condicion) -> bool:
+        """UPDATE condicional de la moderación: True si esta transacción hizo el cambio"""
+        return bool(db.session.execute(
+            update(Resena).where(Resena.id == resena_id, condicion).values(aprobada=aprobada)
+        ).rowcount)
+
+    @staticmethod
+    def moderar_resena(resena_id: int, aprobada: bool) -> Resena:
+        """
+        Aprueba o rechaza una reseña y ajusta el resumen del producto. El cambio es un
+        UPDATE condicional sobre el valor anterior: de dos moderaciones concurrentes solo
+        la que cambia la fila ajusta el resumen.
+        """
+        try:
+            resena = Resena.query.get(resena_id)
+            if not resena:
+                raise ValueError("Reseña no encontrada")
+
+            if aprobada:
+                if ResenaService._cambiar_aprobacion(resena_id, True, Resena.aprobada.isnot(True)):
+                    ResenaService._ajustar_resumen(resena.producto_id, resena.puntuacion, 1)
+            elif ResenaService._cambiar_aprobacion(resena_id, False, Resena.aprobada.is_(True)):
+                ResenaService._ajustar_resumen(resena.producto_id, resena.puntuacion, -1)
+            else:
+                # Pendiente -> rechazada: no cuenta en el resumen
+                ResenaService._cambiar_aprobacion(resena_id, False, Resena.aprobada.is_(None))
+
+            db.session.commit()
+            db.session.refresh(resena)
+            return resena
+
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    @staticmethod
+    def eliminar_resena(resena_id: int) -> bool:
+        """Elimina una reseña (descontándola del resumen si estaba aprobada)"""
+        try:
+            # Bloqueada para que una moderación concurrente no cambie aprobada entre la lectura y el borrado
+            resena = db.session.get(Resena, resena_id, with_for_update=True, populate_existing=True)
+            if not resena:
+                raise ValueError("Reseña no encontrada")
+            if resena.aprobada:
+                ResenaService._ajustar_resumen(resena.producto_id, resena.puntuacion, -1)
+            db.session.delete(resena)
+            db.session.commit()
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    @staticmethod
+    def obtener_resenas(estado: Optional[str] = None, producto_id: Optional[int] = None,
+                        limite: int = 50, offset: int = 0) -> List[Resena]:
+        """Reseñas filtradas por estado de moderación y/o producto, más recientes primero"""
+        query = Resena.query
+        if estado is not None:
+            if estado not in ESTADOS_MODERACION:
+                raise ValueError(f"Estado inválido. Estados válidos: {', '.join(ESTADOS_MODERACION)}")
+            aprobada = ESTADOS_MODERACION[estado]
+            query = query.filter(Resena.aprobada.is_(None) if aprobada is None else Resena.aprobada == aprobada)
+        if producto_id is not None:
+            query = query.filter(Resena.producto_id == producto_id)
+        return query.order_by(Resena.creado_en.desc(), Resena.id.desc()).offset(offset).limit(limite).all()
+
+    @staticmethod
+    def resumen_producto(producto_id: int) -> Optional[Dict[str, Any]]:
+        """Resumen de reseñas aprobadas de un producto (None si no tiene)"""
+        resumen = ResumenResena.query.get(producto_id)
+        return resumen.to_dict() if resumen and resumen.cantidad else None
+
+    @staticmethod
+    def resumenes_por_producto() -> Dict[int, Dict[str, Any]]:
+        """Resúmenes de todos los productos con reseñas aprobadas, en una sola consulta"""
+        return {
+            resumen.producto_id: resumen.to_dict()
+            for resumen in ResumenResena.query.filter(ResumenResena.cantidad > 0).all()
+        }
+
+    @staticmethod
+    def recalcular_resumenes() -> int:
+        """Reconstruye todos los resúmenes desde las reseñas aprobadas (reparación o carga inicial)"""
+        try:
+            filas = db.session.execute(
+                select(
+                    Resena.producto_id,
+                    func.count(Resena.id),
+                    func.sum(Resena.puntuacion),
+                    *[func.sum(case((Resena.puntuacion == estrellas, 1), else_=0)) for estrellas in range(1, 6)]
+                ).where(Resena.aprobada == True, Resena.puntuacion.between(1, 5)).group_by(Resena.producto_id)
+            ).all()
+
+            db.session.execute(delete(ResumenResena))
+            for producto_id, cantidad, suma, *histograma in filas:
+                db.session.add(ResumenResena(
+                    producto_id=producto_id, cantidad=cantidad, suma=int(suma or 0),
+                    **{f'estrellas_{i + 1}': int(valor or 0) for i, valor in enumerate(histograma)}
+                ))
+            db.session.commit()
+            return len(filas)
+
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Error recalculando resúmenes de reseñas")
+            raise e
@@ -6,6 +6,10 @@ from models.reserva import Reserva
 from models.local import Mesa, Zona
 from services.audit_service import AuditService
 from services.error_handler import ErrorHandler, ValidationError, BusinessLogicError
+from services.mesa_estado_service import MesaEstadoService
+import logging
+
+logger = logging.getLogger(__name__)
 
 class ReservaService:
     
@@ -103,12 +107,11 @@ class ReservaService:
                 requerimientos_especiales=data.get('requerimientos_especiales')
             )
 
-            # Actualizar estado de la mesa a 'reservada' si se especificó una mesa
+            # Actualizar estado de la mesa a 'reservada' si se especificó una mesa (y está disponible)
             if data.get('mesa_id'):
                 mesa = Mesa.query.get(data['mesa_id'])
                 if mesa:
-                    mesa.estado = 'reservada'
-                    db.session.add(mesa)
+                    MesaEstadoService.transicionar(mesa, 'reservada', desde=('disponible',), estricto=False, motivo='reserva')
 
             # Actualizar estado de la zona si es necesario (opcional)
             # Podríamos marcar la zona como parcialmente ocupada
@@ -185,29 +188,18 @@ class ReservaService:
             if 'estado' in data:
                 reserva.estado = data['estado']
             if 'zona_id' in data:
-                print(f"🔍 Actualizando zona_id: {reserva.zona_id} -> {data['zona_id']}")
+                logger.debug("Reserva %s: zona_id %s -> %s", reserva.id, reserva.zona_id, data['zona_id'])
                 reserva.zona_id = data['zona_id']
             if 'mesa_id' in data:
-                print(f"🔍 Actualizando mesa_id: {reserva.mesa_id} -> {data['mesa_id']}")
+                logger.debug("Reserva %s: mesa_id %s -> %s", reserva.id, reserva.mesa_id, data['mesa_id'])
+                mesa_anterior_id = reserva.mesa_id
                 reserva.mesa_id = data['mesa_id']
 
-                # Actualizar estado de mesas
+                # Actualizar estado de mesas: liberar la anterior (si sigue reservada) y reservar la nueva
+                if mesa_anterior_id and mesa_anterior_id != reserva.mesa_id:
+                    MesaEstadoService.transicionar(mesa_anterior_id, 'disponible', desde=('reservada',), estricto=False, motivo='reserva')
                 if reserva.mesa_id:
-                    # Liberar mesa anterior si existía
-                    if reserva.mesa:
-                        reserva.mesa.estado = 'disponible'
-                        db.session.add(reserva.mesa)
-
-                    # Reservar nueva mesa
-                    nueva_mesa = Mesa.query.get(data['mesa_id'])
-                    if nueva_mesa:
-                        nueva_mesa.estado = 'reservada'
-                        db.session.add(nueva_mesa)
-                else:
-                    # Si se quita la mesa, liberar la mesa actual
-                    if reserva.mesa:
-                        reserva.mesa.estado = 'disponible'
-                        db.session.add(reserva.mesa)
+                    MesaEstadoService.transicionar(reserva.mesa_id, 'reservada', desde=('disponible',), estricto=False, motivo='reserva')
 
             if 'notas' in data:
                 reserva.notas = data['notas']
@@ -217,11 +209,7 @@ class ReservaService:
             reserva.actualizado_en = datetime.utcnow()
             db.session.commit()
             
-            print(f"✅ Reserva actualizada exitosamente:")
-            print(f"   - ID: {reserva.id}")
-            print(f"   - Zona ID: {reserva.zona_id}")
-            print(f"   - Mesa ID: {reserva.mesa_id}")
-            print(f"   - Cliente: {reserva.cliente_nombre}")
+            logger.info("Reserva %s actualizada (zona %s, mesa %s)", reserva.id, reserva.zona_id, reserva.mesa_id)
             
             # Registrar en auditoría
             AuditService.log_event(
@@ -248,8 +236,7 @@ class ReservaService:
 
             # Liberar la mesa si estaba reservada
             if reserva.mesa:
-                reserva.mesa.estado = 'disponible'
-                db.session.add(reserva.mesa)
+                MesaEstadoService.transicionar(reserva.mesa, 'disponible', desde=('reservada',), estricto=False, motivo='reserva')
 
             # Eliminar permanentemente de la base de datos
             db.session.delete(reserva)
@@ -412,8 +399,7 @@ class ReservaService:
 
             # Liberar la mesa si estaba reservada
             if reserva.mesa:
-                reserva.mesa.estado = 'disponible'
-                db.session.add(reserva.mesa)
+                MesaEstadoService.transicionar(reserva.mesa, 'disponible', desde=('reservada',), estricto=False, motivo='reserva')
 
             reserva.estado = 'cancelada'
             if motivo:
@@ -0,0 +1,198 @@
+"""
+Capa de serialización declarativa.
+
+Cada Esquema declara los campos de un modelo, las vistas (conjuntos de campos por
+endpoint) y sus relaciones. El Serializador produce respuestas planas: las filas
+principales llevan solo los ids referenciados y los objetos relacionados se
+devuelven una sola vez en diccionarios "incluidos" cargados con una consulta por
+relación. Así el número de consultas depende de las relaciones pedidas y no del
+número de filas.
+"""
+from sqlalchemy.orm import raiseload
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+TAMANO_BLOQUE_IN = 1000
+
+_ESQUEMAS: Dict[str, type] = {}
+
+
+# --- Conversores de campos ---
+
+def valor(atributo: str) -> Callable:
+    """Devuelve el atributo tal cual."""
+    return lambda obj, ctx: getattr(obj, atributo)
+
+def decimal(atributo: str, por_defecto: Optional[float] = None) -> Callable:
+    """Convierte Decimal/Numeric a float."""
+    def convertir(obj, ctx):
+        dato = getattr(obj, atributo)
+        return float(dato) if dato is not None else por_defecto
+    return convertir
+
+def fecha(atributo: str) -> Callable:
+    """Convierte date/datetime/time a ISO 8601."""
+    def convertir(obj, ctx):
+        dato = getattr(obj, atributo, None)
+        return dato.isoformat() if dato else None
+    return convertir
+
+
+class Relacion:
+    """
+    Relación de un esquema.
+
+    Args:
+        esquema: nombre del esquema relacionado
+        clave: clave en el diccionario de incluidos (p. ej. 'productos')
+        fk: atributo del objeto padre con el id del relacionado (muchos-a-uno)
+        inversa: columna del relacionado que apunta al padre (uno-a-muchos)
+        anidado: nombre del campo al anidar (por defecto el nombre de la relación)
+    """
+    def __init__(self, esquema: str, clave: str, fk: str = None, inversa: str = None,
+                 anidado: str = None, orden: str = 'id'):
+        self.esquema_nombre = esquema
+        self.clave = clave
+        self.fk = fk
+        self.inversa = inversa
+        self.anidado = anidado
+        self.orden = orden
+
+    @property
+    def esquema(self):
+        return _ESQUEMAS[self.esquema_nombre]
+
+
+class Esquema:
+    """Base de los esquemas declarativos."""
+    modelo = None
+    campos: Dict[str, Callable] = {}
+    vistas: Dict[str, Sequence[str]] = {}
+    relaciones: Dict[str, Relacion] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _ESQUEMAS[cls.__name__] = cls
+
+    @classmethod
+    def campos_de(cls, vista: str = 'default') -> Sequence[str]:
+        return cls.vistas.get(vista) or tuple(cls.campos)
+
+    @classmethod
+    def preparar(cls, objetos: List[Any], vista: str = 'default') -> Dict[str, Any]:
+        """Precalcula agregados para un lote de objetos (una consulta por lote, nunca por fila)."""
+        return {}
+
+    @classmethod
+    def a_dict(cls, obj: Any, vista: str = 'default', ctx: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        ctx = ctx if ctx is not None else {}
+        return {nombre: cls.campos[nombre](obj, ctx) for nombre in cls.campos_de(vista)}
+
+
+class Serializador:
+    """Serializa listas de objetos con un plan explícito de carga de relaciones."""
+
+    @staticmethod
+    def consulta(esquema: type):
+        """Consulta base que prohíbe cargas perezosas: toda relación debe venir del plan."""
+        return esquema.modelo.query.options(raiseload('*'))
+
+    @staticmethod
+    def _agrupar_rutas(rutas: Iterable[str]) -> Dict[str, List[str]]:
+        grupos: Dict[str, List[str]] = {}
+        for ruta in rutas:
+            cabeza, _, resto = ruta.partition('.')
+            grupos.setdefault(cabeza, [])
+            if resto:
+                grupos[cabeza].append(resto)
+        return grupos
+
+    @staticmethod
+    def _buscar(modelo, columna, valores: List[Any], orden: str):
+        resultado = []
+        for inicio in range(0, len(valores), TAMANO_BLOQUE_IN):
+            bloque = valores[inicio:inicio + TAMANO_BLOQUE_IN]
+            resultado.extend(
+                modelo.query.options(raiseload('*')).filter(columna.in_(bloque))
+                .order_by(getattr(modelo, orden)).all()
+            )
+        return resultado
+
+    @staticmethod
+    def _cargar(objetos: List[Any], esquema: type, rutas: Iterable[str], incluidos: Dict[str, Dict],
+                vistas: Dict[str, str], prefijo: str = ''):
+        for nombre, subrutas in Serializador._agrupar_rutas(rutas).items():
+            relacion = esquema.relaciones[nombre]
+            sub = relacion.esquema
+            destino = incluidos.setdefault(relacion.clave, {})
+
+            if relacion.fk:
+                ids = {getattr(o, relacion.fk) for o in objetos} - {None} - set(destino)
+                relacionados = Serializador._buscar(sub.modelo, sub.modelo.id, sorted(ids), relacion.orden) if ids else []
+            else:
+                ids = sorted({o.id for o in objetos})
+                relacionados = Serializador._buscar(
+                    sub.modelo, getattr(sub.modelo, relacion.inversa), ids, relacion.orden
+                ) if ids else []
+
+            ruta = f'{prefijo}{nombre}'
+            vista = vistas.get(ruta, 'default')
+            ctx = sub.preparar(relacionados, vista)
+            for relacionado in relacionados:
+                destino[relacionado.id] = sub.a_dict(relacionado, vista, ctx)
+
+            if subrutas:
+                Serializador._cargar(relacionados, sub, subrutas, incluidos, vistas, f'{ruta}.')
+
+    @staticmethod
+    def serializar(objetos: List[Any], esquema: type, vista: str = 'default',
+                   incluir: Sequence[str] = (), vistas: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Devuelve {'data': [...], 'incluidos': {clave: {id: {...}}}}.
+
+        Args:
+            objetos: objetos principales (ya consultados)
+            esquema: esquema de los objetos principales
+            vista: conjunto de campos de los objetos principales
+            incluir: rutas de relaciones a incluir, p. ej. ('producto', 'producto.categoria')
+            vistas: vista por ruta de relación, p. ej. {'producto': 'resumen'}
+        """
+        ctx = esquema.preparar(objetos, vista)
+        data = [esquema.a_dict(obj, vista, ctx) for obj in objetos]
+        incluidos: Dict[str, Dict] = {}
+        if incluir and objetos:
+            Serializador._cargar(objetos, esquema, incluir, incluidos, vistas or {})
+        return {'data': data, 'incluidos': incluidos}
+
+    @staticmethod
+    def anidar(resultado: Dict[str, Any], esquema: type, incluir: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """
+        Reconstruye el formato anidado (compatible con to_dict) a partir de un resultado plano,
+        sin consultas adicionales.
+        """
+        incluidos = resultado['incluidos']
+
+        def anidar_en(filas: List[Dict[str, Any]], esq: type, rutas: Iterable[str]) -> List[Dict[str, Any]]:
+            for nombre, subrutas in Serializador._agrupar_rutas(rutas).items():
+                relacion = esq.relaciones[nombre]
+                origen = incluidos.get(relacion.clave, {})
+                campo = relacion.anidado or nombre
+
+                if relacion.fk:
+                    for fila in filas:
+                        relacionado = origen.get(fila.get(relacion.fk))
+                        fila[campo] = dict(relacionado) if relacionado else None
+                    hijos = [fila[campo] for fila in filas if fila[campo]]
+                else:
+                    por_padre: Dict[Any, List[Dict[str, Any]]] = {}
+                    for relacionado in origen.values():
+                        por_padre.setdefault(relacionado.get(relacion.inversa), []).append(relacionado)
+                    hijos = []
+                    for fila in filas:
+                        fila[campo] = [dict(h) for h in por_padre.get(fila.get('id'), [])]
+                        hijos.extend(fila[campo])
+
+                if subrutas:
+                    anidar_en(hijos, relacion.esquema, subrutas)
+            return filas
+
+        return anidar_en([dict(fila) for fila in resultado['data']], esquema, incluir)
@@ -0,0 +1,143 @@
+"""
+Compresión de respuestas (gzip/brotli) y GET condicional (ETag / 304).
+
+Hook after_request registrado en create_app:
+    1. ETag débil en respuestas GET/HEAD 200. Si la vista declara una versión barata
+       (decorador etag_version) se usa esa; si no, un hash del cuerpo.
+    2. If-None-Match coincidente -> 304 sin cuerpo.
+    3. Compresión con la mejor codificación aceptada por el cliente (br si está
+       instalado brotli, si no gzip) para cuerpos de texto mayores que
+       COMPRESION_MINIMO_BYTES.
+
+Por ruta (decoradores aplicados debajo de @bp.route):
+    @sin_compresion       - no comprimir (p. ej. contenido ya comprimido)
+    @sin_etag             - no calcular ETag (respuestas que cambian en cada petición)
+    @etag_version(fn)     - fn() devuelve un token de versión barato (o None para usar el
+                            hash del cuerpo); con If-None-Match coincidente se responde 304
+                            sin ejecutar la vista. Debe ir debajo de los decoradores de
+                            autenticación para no responder 304 a peticiones no autorizadas.
+"""
+import gzip
+import hashlib
+from functools import wraps
+
+from flask import current_app, g, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+_ATRIBUTO = '_ceviche_http'
+
+TIPOS_COMPRIMIBLES = {
+    'application/json',
+    'application/javascript',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+    'image/svg+xml',
+}
+
+
+def _marcar(**opciones):
+    def decorador(vista):
+        # wraps() copia __dict__, así que la marca sobrevive a decoradores posteriores
+        setattr(vista, _ATRIBUTO, {**getattr(vista, _ATRIBUTO, {}), **opciones})
+        return vista
+    return decorador
+
+
+sin_compresion = _marcar(compresion=False)
+sin_etag = _marcar(etag=False)
+
+
+def _etag(texto) -> str:
+    if isinstance(texto, str):
+        texto = texto.encode('utf-8')
+    return hashlib.blake2b(texto, digest_size=12).hexdigest()
+
+
+def etag_version(obtener_version):
+    """ETag a partir de un token de versión barato en lugar del cuerpo completo."""
+    def decorador(vista):
+        @wraps(vista)
+        def wrapper(*args, **kwargs):
+            if request.method in ('GET', 'HEAD') and current_app.config.get('HTTP_ETAG_HABILITADO', True):
+                version = obtener_version()
+                if version is not None:
+                    g._etag_version = _etag(f'{request.full_path}|{version}')
+                    if request.if_none_match.contains_weak(g._etag_version):
+                        respuesta = current_app.response_class(status=304)
+                        respuesta.set_etag(g._etag_version, weak=True)
+                        return respuesta
+            return vista(*args, **kwargs)
+        return wrapper
+    return decorador
+
+
+def _opciones_vista() -> dict:
+    vista = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(vista, _ATRIBUTO, {})
+
+
+def _codificacion_aceptada() -> str:
+    disponibles = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(disponibles)
+
+
+def _comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    if codificacion == 'br':
+        return brotli.compress(cuerpo, quality=current_app.config.get('COMPRESION_NIVEL_BROTLI', 5))
+    return gzip.compress(cuerpo, compresslevel=current_app.config.get('COMPRESION_NIVEL_GZIP', 6), mtime=0)
+
+
+def procesar_respuesta(response):
+    """ETag, 304 y compresión de una respuesta ya construida."""
+    if response.direct_passthrough or response.is_streamed:
+        # Archivos (send_from_directory ya pone su propio ETag) y streams SSE
+        return response
+
+    opciones = _opciones_vista()
+
+    if (
+        request.method in ('GET', 'HEAD')
+        and response.status_code == 200
+        and 'ETag' not in response.headers
+        and opciones.get('etag', current_app.config.get('HTTP_ETAG_HABILITADO', True))
+    ):
+        response.set_etag(g.get('_etag_version') or _etag(response.get_data()), weak=True)
+        response.make_conditional(request.environ)
+        if response.status_code == 304:
+            return response
+
+    if (
+        not opciones.get('compresion', current_app.config.get('COMPRESION_HABILITADA', True))
+        or response.mimetype not in TIPOS_COMPRIMIBLES
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    cuerpo = response.get_data()
+    if len(cuerpo) < current_app.config.get('COMPRESION_MINIMO_BYTES', 1024):
+        return response
+
+    codificacion = _codificacion_aceptada()
+    if not codificacion:
+        return response
+
+    comprimido = _comprimir(cuerpo, codificacion)
+    if len(comprimido) >= len(cuerpo):
+        return response
+    response.set_data(comprimido)
+    response.headers['Content-Encoding'] = codificacion
+    return response
+
+
+def init_compresion(app):
+    """Registra el hook de ETag y compresión (se ejecuta después del de CORS)."""
+    app.after_request(procesar_respuesta)
@@ -0,0 +1,199 @@
+"""
+Gestión del pool de conexiones a la base de datos.
+
+- Dimensiona el pool a partir de variables de entorno según el tipo de worker de
+  gunicorn (sync/gthread atienden pocas peticiones a la vez; gevent muchas).
+- Recicla conexiones antes del wait_timeout de MySQL y hace pre-ping.
+- Evita compartir sockets entre procesos tras un fork (gunicorn con preload).
+- Mide por worker conexiones en uso, overflow y tiempo de espera del pool.
+"""
+import os
+import threading
+from time import perf_counter
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+WORKERS_ASINCRONOS = {'gevent', 'eventlet'}
+
+
+def _entero(nombre: str, por_defecto: int) -> int:
+    valor = os.environ.get(nombre)
+    return int(valor) if valor not in (None, '') else por_defecto
+
+
+def tipo_worker() -> str:
+    """Clase de worker de gunicorn declarada por entorno (sync, gthread, gevent...)."""
+    return (os.environ.get('GUNICORN_WORKER_CLASS') or 'sync').split('.')[-1].lower().replace('worker', '') or 'sync'
+
+
+class EstadisticasPool:
+    """Contadores del pool del proceso actual (cada worker de gunicorn tiene los suyos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Funciones f(segundos) notificadas en cada checkout (p. ej. métricas)
+        self.observadores = []
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.pid = os.getpid()
+            self.checkouts = 0
+            self.conexiones_creadas = 0
+            self.conexiones_invalidadas = 0
+            self.esperas_agotadas = 0
+            self.espera_total = 0.0
+            self.espera_maxima = 0.0
+
+    def registrar_espera(self, segundos: float, agotada: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+            if agotada:
+                self.esperas_agotadas += 1
+        for observador in self.observadores:
+            observador(segundos)
+
+    def incrementar(self, campo: str):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pid': self.pid,
+                'checkouts': self.checkouts,
+                'conexiones_creadas': self.conexiones_creadas,
+                'conexiones_invalidadas': self.conexiones_invalidadas,
+                'esperas_agotadas': self.esperas_agotadas,
+                'espera_total_ms': round(self.espera_total * 1000, 3),
+                'espera_media_ms': round(self.espera_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'espera_maxima_ms': round(self.espera_maxima * 1000, 3)
+            }
+
+
+estadisticas = EstadisticasPool()
+
+
+class PoolInstrumentado(QueuePool):
+    """QueuePool que mide cuánto espera cada petición para obtener una conexión."""
+
+    def _do_get(self):
+        inicio = perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            estadisticas.registrar_espera(perf_counter() - inicio, agotada=True)
+            raise
+        estadisticas.registrar_espera(perf_counter() - inicio)
+        return conexion
+
+
+def opciones_engine(uri: str = None) -> Dict[str, Any]:
+    """
+    Opciones de create_engine para SQLALCHEMY_ENGINE_OPTIONS.
+
+    Variables de entorno (todas opcionales):
+        GUNICORN_WORKER_CLASS, GUNICORN_THREADS, GUNICORN_WORKER_CONNECTIONS,
+        DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+    """
+    if uri and uri.startswith('sqlite') and ':memory:' in uri:
+        # SQLite en memoria usa su propio pool de una conexión
+        return {}
+
+    if tipo_worker() in WORKERS_ASINCRONOS:
+        # Muchos greenlets por worker: el pool limita la concurrencia real contra MySQL
+        conexiones = _entero('GUNICORN_WORKER_CONNECTIONS', 100)
+        pool_size, max_overflow = min(20, conexiones), min(30, conexiones)
+    else:
+        # sync/gthread: una petición por hilo; el extra cubre streams SSE y tareas en segundo plano
+        hilos = max(1, _entero('GUNICORN_THREADS', 1))
+        pool_size, max_overflow = hilos + 1, hilos + 2
+
+    return {
+        'poolclass': PoolInstrumentado,
+        'pool_size': _entero('DB_POOL_SIZE', pool_size),
+        'max_overflow': _entero('DB_MAX_OVERFLOW', max_overflow),
+        'pool_timeout': _entero('DB_POOL_TIMEOUT', 10),
+        # Debe ser menor que wait_timeout de MySQL (28800 s por defecto, suele bajarse en hosting)
+        'pool_recycle': _entero('DB_POOL_RECYCLE', 280),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+        'pool_use_lifo': True
+    }
+
+
+def registrar_eventos(engine):
+    """Eventos del pool: protección ante fork y contadores de conexiones."""
+    if getattr(engine, '_ceviche_pool_eventos', False):
+        return
+    engine._ceviche_pool_eventos = True
+
+    @event.listens_for(engine, 'connect')
+    def _al_conectar(dbapi_connection, connection_record):
+        connection_record.info['pid'] = os.getpid()
+        estadisticas.incrementar('conexiones_creadas')
+
+    @event.listens_for(engine, 'checkout')
+    def _al_obtener(dbapi_connection, connection_record, connection_proxy):
+        # Una conexión abierta por otro proceso nunca debe usarse aquí
+        pid = os.getpid()
+        if connection_record.info.get('pid') != pid:
+            connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+            raise exc.DisconnectionError(
+                f"Conexión creada en el pid {connection_record.info.get('pid')}, usada en {pid}"
+            )
+
+    @event.listens_for(engine, 'invalidate')
+    def _al_invalidar(dbapi_connection, connection_record, exception):
+        estadisticas.incrementar('conexiones_invalidadas')
+
+
+def init_pool(app, db):
+    """Registra los eventos en todos los engines de la aplicación."""
+    with app.app_context():
+        for engine in db.engines.values():
+            registrar_eventos(engine)
+
+
+def reiniciar_tras_fork(app, db):
+    """
+    Llamar en el post_fork de gunicorn: descarta las conexiones heredadas del
+    proceso padre sin cerrarlas (siguen siendo del padre) y reinicia contadores.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    estadisticas.reiniciar()
+
+
+def cerrar_pool(app, db):
+    """Cierra las conexiones del worker al terminar (worker_exit de gunicorn)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def estado_pool(db) -> Dict[str, Any]:
+    """Estado actual de los pools del proceso (requiere contexto de aplicación)."""
+    pools = {}
+    for nombre, engine in db.engines.items():
+        pool = engine.pool
+        datos = {'clase': type(pool).__name__, 'estado': pool.status()}
+        if isinstance(pool, QueuePool):
+            datos.update({
+                'tamano': pool.size(),
+                'en_uso': pool.checkedout(),
+                'disponibles': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'timeout': pool.timeout()
+            })
+        pools[nombre or 'default'] = datos
+    return {
+        'pid': os.getpid(),
+        'worker': tipo_worker(),
+        'pools': pools,
+        'estadisticas': estadisticas.to_dict()
+    }
@@ -0,0 +1,121 @@
+"""
+Proveedor JSON de la aplicación.
+
+Usa orjson cuando está instalado (dependencia opcional) y, si no, el json de la
+librería estándar. En ambos casos Decimal, date, datetime y time se serializan de
+forma nativa, sin conversiones previas en cada to_dict.
+"""
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from threading import Lock
+from time import monotonic
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Tipos que ninguno de los codificadores soporta por sí mismo."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (date, datetime, time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JSONPreCodificado:
+    """
+    Cuerpo JSON ya codificado. Los endpoints calientes pueden cachear los bytes
+    y devolverlos con jsonify(JSONPreCodificado(...)) sin volver a serializar.
+    """
+    __slots__ = ('contenido',)
+
+    def __init__(self, contenido: bytes):
+        self.contenido = contenido
+
+
+def codificar(obj: Any, ordenar: bool = False) -> bytes:
+    """Serializa a bytes JSON compactos con el codificador más rápido disponible."""
+    if orjson is not None:
+        opciones = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if ordenar:
+            opciones |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=opciones)
+    return json.dumps(obj, default=_default, sort_keys=ordenar, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class CevicheJSONProvider(DefaultJSONProvider):
+    """Proveedor JSON para Flask (app.json) basado en orjson con respaldo en json."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is not None and not kwargs.get('indent'):
+            return codificar(obj, ordenar=self.sort_keys).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+
+        if isinstance(obj, JSONPreCodificado):
+            cuerpo = obj.contenido
+        elif (self.compact is None and self._app.debug) or self.compact is False:
+            cuerpo = self.dumps(obj, indent=2).encode('utf-8')
+        else:
+            cuerpo = codificar(obj, ordenar=self.sort_keys)
+
+        return self._app.response_class(cuerpo + b'\n', mimetype=self.mimetype)
+
+
+class CacheJSON:
+    """
+    Caché en proceso de respuestas ya codificadas con expiración (TTL).
+    Pensada para listados de lectura frecuente: se serializa una vez y se
+    reutilizan los bytes hasta que expiran o se invalidan tras una escritura.
+    """
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._entradas: dict = {}
+        self._lock = Lock()
+
+    def obtener(self, clave: Any, construir, ttl: float = None) -> JSONPreCodificado:
+        """Devuelve los bytes cacheados o los construye con construir() y los guarda."""
+        ttl = self.ttl if ttl is None else ttl
+        ahora = monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada and entrada[0] > ahora:
+                return entrada[1]
+
+        cuerpo = JSONPreCodificado(codificar(construir()))
+        if ttl > 0:
+            with self._lock:
+                self._entradas[clave] = (ahora + ttl, cuerpo)
+        return cuerpo
+
+    def invalidar(self, clave: Any = None):
+        with self._lock:
+            if clave is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(clave, None)
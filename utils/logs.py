@@ -0,0 +1,141 @@
+"""
+Logging estructurado y no bloqueante.
+
+- Registros JSON (python-json-logger; si no está instalado, formato de texto).
+- Cada registro lleva request_id, método y ruta de la petición en curso. El id se
+  toma de la cabecera X-Request-ID o se genera, y se devuelve en la respuesta.
+- Los handlers de la petición solo encolan el registro (QueueHandler). La
+  escritura a stdout/archivo ocurre en un hilo aparte (QueueListener), fuera del
+  camino de la petición. Si la cola se llena, se descartan registros en lugar
+  de bloquear.
+- El nivel se controla con LOG_LEVEL; logger.debug no cuesta nada en producción.
+"""
+import atexit
+import logging
+import os
+import queue
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+try:
+    from pythonjsonlogger import jsonlogger
+except ImportError:  # pragma: no cover - depende del entorno
+    jsonlogger = None
+
+CAMPOS_JSON = '%(asctime)s %(levelname)s %(name)s %(message)s %(request_id)s %(metodo)s %(ruta)s %(process)d'
+
+
+class ContextoPeticionFilter(logging.Filter):
+    """Añade los datos de la petición actual al registro (se ejecuta en el hilo que loguea)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.metodo = request.method
+            record.ruta = request.path
+        else:
+            record.request_id = record.metodo = record.ruta = None
+        return True
+
+
+class ColaNoBloqueante(QueueHandler):
+    """
+    QueueHandler con cola acotada que descarta en lugar de bloquear y que arranca
+    su QueueListener en cada proceso (los hilos no sobreviven al fork de gunicorn).
+    """
+
+    def __init__(self, handlers, capacidad: int = 10000):
+        super().__init__(queue.Queue(maxsize=capacidad))
+        self.destinos = handlers
+        self.descartados = 0
+        self._pid = None
+        self._listener = None
+        self._iniciar()
+
+    def _iniciar(self):
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        # Tras un fork la cola heredada puede tener registros del padre: empezar con una nueva
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._listener = QueueListener(self.queue, *self.destinos, respect_handler_level=True)
+        self._listener.start()
+
+    def detener(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolver mensaje y traceback aquí; el formato JSON se aplica en el hilo del listener
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+    def emit(self, record: logging.LogRecord):
+        if self._pid != os.getpid():
+            self._iniciar()
+        super().emit(record)
+
+
+def _formateador(formato: str) -> logging.Formatter:
+    if formato == 'json' and jsonlogger is not None:
+        return jsonlogger.JsonFormatter(
+            CAMPOS_JSON,
+            rename_fields={'levelname': 'nivel', 'name': 'logger', 'asctime': 'fecha', 'process': 'pid'},
+            json_ensure_ascii=False
+        )
+    return logging.Formatter('%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s')
+
+
+_cola = None
+
+
+def init_logging(app):
+    """Configura el logging raíz de la aplicación (una sola vez por proceso)."""
+    global _cola
+
+    nivel = getattr(logging, str(app.config.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO)
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+
+    if _cola is None:
+        formateador = _formateador(app.config.get('LOG_FORMATO', 'json'))
+        destinos = [logging.StreamHandler(sys.stdout)]
+        if app.config.get('LOG_ARCHIVO'):
+            destinos.append(logging.FileHandler(app.config['LOG_ARCHIVO'], encoding='utf-8'))
+        for destino in destinos:
+            destino.setFormatter(formateador)
+
+        _cola = ColaNoBloqueante(destinos, capacidad=app.config.get('LOG_COLA_CAPACIDAD', 10000))
+        _cola.addFilter(ContextoPeticionFilter())
+        for handler in list(raiz.handlers):
+            raiz.removeHandler(handler)
+        raiz.addHandler(_cola)
+        atexit.register(_cola.detener)
+
+    # Flask añade su propio handler a app.logger: usar solo el de la raíz
+    app.logger.handlers.clear()
+    app.logger.propagate = True
+    logging.getLogger('werkzeug').setLevel(max(nivel, logging.INFO))
+
+    @app.before_request
+    def _asignar_request_id():
+        g.request_id = (request.headers.get('X-Request-ID') or uuid.uuid4().hex)[:64]
+
+    @app.after_request
+    def _devolver_request_id(response):
+        if g.get('request_id'):
+            response.headers['X-Request-ID'] = g.request_id
+        return response
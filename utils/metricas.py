@@ -0,0 +1,174 @@
+"""
+Métricas en formato Prometheus.
+
+- Latencia por blueprint/endpoint (histograma), throughput y peticiones en curso.
+- Uso del pool de conexiones (conexiones en uso y espera de checkout).
+- Indicadores del negocio: órdenes activas por estado, ítems de cocina por estación
+  y estado (profundidad de cola) y mesas por estado.
+
+prometheus_client es una dependencia opcional. Con varios workers de gunicorn se
+usa el modo multiproceso (variable PROMETHEUS_MULTIPROC_DIR). Los indicadores del
+negocio se recalculan como mucho cada METRICAS_DOMINIO_INTERVALO segundos, no en
+cada scrape.
+"""
+import os
+import threading
+from time import monotonic, perf_counter
+
+from flask import g, request
+from sqlalchemy import event, func
+
+from utils.replica import en_replica
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # pragma: no cover - depende del entorno
+    prometheus_client = None
+
+MULTIPROCESO = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ESTADOS_ORDEN_ACTIVOS = ('pendiente', 'confirmada', 'preparando', 'lista', 'servida')
+ESTADOS_ITEM_COCINA = ('pendiente', 'en_cola', 'preparando', 'listo')
+
+if prometheus_client is not None:
+    PETICIONES = Counter(
+        'ceviche_http_peticiones_total', 'Peticiones HTTP atendidas',
+        ['blueprint', 'endpoint', 'metodo', 'estado']
+    )
+    LATENCIA = Histogram(
+        'ceviche_http_latencia_segundos', 'Latencia de las peticiones HTTP',
+        ['blueprint', 'endpoint', 'metodo'], buckets=BUCKETS_LATENCIA
+    )
+    EN_CURSO = Gauge(
+        'ceviche_http_peticiones_en_curso', 'Peticiones HTTP en curso', multiprocess_mode='livesum'
+    )
+    POOL_EN_USO = Gauge(
+        'ceviche_db_pool_conexiones_en_uso', 'Conexiones del pool en uso', multiprocess_mode='livesum'
+    )
+    POOL_ESPERA = Histogram(
+        'ceviche_db_pool_espera_segundos', 'Espera para obtener una conexión del pool',
+        buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+    )
+    ORDENES_ACTIVAS = Gauge(
+        'ceviche_ordenes_activas', 'Órdenes activas por estado', ['estado'], multiprocess_mode='mostrecent'
+    )
+    ITEMS_COCINA = Gauge(
+        'ceviche_cocina_items', 'Ítems de cocina por estación y estado', ['estacion', 'estado'],
+        multiprocess_mode='mostrecent'
+    )
+    MESAS = Gauge(
+        'ceviche_mesas', 'Mesas activas por estado', ['estado'], multiprocess_mode='mostrecent'
+    )
+
+
+class IndicadoresDominio:
+    """Recalcula los gauges del negocio con tres consultas agrupadas, a lo sumo una vez por intervalo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ultima_actualizacion = 0.0
+        self._etiquetas = {}
+
+    def _fijar(self, gauge, valores: dict):
+        """Publica los valores y pone a cero las etiquetas que ya no aparecen."""
+        anteriores = self._etiquetas.get(gauge, set())
+        for etiquetas in anteriores - set(valores):
+            gauge.labels(*etiquetas).set(0)
+        for etiquetas, cantidad in valores.items():
+            gauge.labels(*etiquetas).set(cantidad)
+        self._etiquetas[gauge] = set(valores)
+
+    def actualizar(self, db, intervalo: float):
+        if monotonic() - self.ultima_actualizacion < intervalo:
+            return
+        if not self._lock.acquire(blocking=False):
+            return  # otro hilo ya está actualizando
+        try:
+            from models.order import Orden, ItemOrden
+            from models.local import Mesa
+
+            with en_replica():
+                ordenes = dict(db.session.query(Orden.estado, func.count(Orden.id)).filter(
+                    Orden.estado.in_(ESTADOS_ORDEN_ACTIVOS)
+                ).group_by(Orden.estado).all())
+                items = db.session.query(ItemOrden.estacion, ItemOrden.estado, func.count(ItemOrden.id)).filter(
+                    ItemOrden.estado.in_(ESTADOS_ITEM_COCINA)
+                ).group_by(ItemOrden.estacion, ItemOrden.estado).all()
+                mesas = db.session.query(Mesa.estado, func.count(Mesa.id)).filter(
+                    Mesa.activo == True
+                ).group_by(Mesa.estado).all()
+
+            self._fijar(ORDENES_ACTIVAS, {(estado,): ordenes.get(estado, 0) for estado in ESTADOS_ORDEN_ACTIVOS})
+            self._fijar(ITEMS_COCINA, {(estacion or 'sin_estacion', estado): n for estacion, estado, n in items})
+            self._fijar(MESAS, {(estado or 'disponible',): n for estado, n in mesas})
+            self.ultima_actualizacion = monotonic()
+        finally:
+            db.session.remove()
+            self._lock.release()
+
+
+indicadores = IndicadoresDominio()
+
+
+def exportar(db, intervalo: float) -> tuple[bytes, str]:
+    """Cuerpo y content-type de /metrics."""
+    indicadores.actualizar(db, intervalo)
+    if MULTIPROCESO:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registro), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def marcar_worker_terminado(pid: int):
+    """Para el child_exit de gunicorn: descarta los gauges 'live' del worker terminado."""
+    if prometheus_client is not None and MULTIPROCESO:
+        multiprocess.mark_process_dead(pid)
+
+
+def init_metricas(app, db):
+    """Registra los hooks de medición de peticiones y del pool."""
+    if prometheus_client is None or not app.config.get('METRICAS_HABILITADAS', True):
+        return
+
+    from utils.db_pool import estadisticas
+    if POOL_ESPERA.observe not in estadisticas.observadores:
+        estadisticas.observadores.append(POOL_ESPERA.observe)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'checkout', _al_obtener_conexion):
+                event.listen(engine, 'checkout', _al_obtener_conexion)
+                event.listen(engine, 'checkin', _al_devolver_conexion)
+
+    @app.before_request
+    def _iniciar_medicion():
+        if request.path == '/metrics':
+            return
+        g._metricas_inicio = perf_counter()
+        EN_CURSO.inc()
+
+    @app.after_request
+    def _registrar_medicion(response):
+        inicio = g.get('_metricas_inicio')
+        if inicio is not None:
+            blueprint = request.blueprint or 'app'
+            endpoint = request.url_rule.rule if request.url_rule else 'sin_ruta'
+            LATENCIA.labels(blueprint, endpoint, request.method).observe(perf_counter() - inicio)
+            PETICIONES.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+        return response
+
+    @app.teardown_request
+    def _finalizar_medicion(exc):
+        if g.pop('_metricas_inicio', None) is not None:
+            EN_CURSO.dec()
+
+
+def _al_obtener_conexion(dbapi_connection, connection_record, connection_proxy):
+    POOL_EN_USO.inc()
+
+
+def _al_devolver_conexion(dbapi_connection, connection_record):
+    POOL_EN_USO.dec()
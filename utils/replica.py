@@ -0,0 +1,176 @@
+"""
+Enrutamiento de lecturas a una réplica de la base de datos.
+
+Las rutas o métodos de servicio marcados con @lectura_replica (o ejecutados dentro
+de `with en_replica():`) envían sus SELECT al bind 'replica' configurado en
+SQLALCHEMY_BINDS. Se vuelve a la primaria cuando:
+
+- no hay réplica configurada,
+- la réplica no responde o su retraso de replicación supera REPLICA_RETRASO_MAXIMO,
+- la petición ya escribió algo (lectura de las propias escrituras), o
+- se llamó a fijar_primaria() explícitamente.
+
+Las escrituras (flush y sentencias DML) siempre van a la primaria.
+"""
+import os
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from time import monotonic
+from typing import Any, Dict, Optional
+
+import click
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+
+
+# --- Estado por petición ---
+
+def _replica_solicitada() -> bool:
+    return has_app_context() and g.get('_replica_nivel', 0) > 0
+
+def primaria_fijada() -> bool:
+    return has_app_context() and g.get('_replica_fijada', False)
+
+def fijar_primaria():
+    """Fuerza que el resto de la petición lea de la primaria."""
+    if has_app_context():
+        g._replica_fijada = True
+
+@contextmanager
+def en_replica():
+    """Contexto en el que las lecturas pueden ir a la réplica."""
+    if not has_app_context():
+        yield
+        return
+    g._replica_nivel = g.get('_replica_nivel', 0) + 1
+    try:
+        yield
+    finally:
+        g._replica_nivel -= 1
+
+def lectura_replica(fn):
+    """Decorador para rutas o métodos de servicio de solo lectura."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with en_replica():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+# --- Salud y retraso de la réplica ---
+
+class MonitorReplica:
+    """Comprueba periódicamente (por proceso) si la réplica está al día."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ultimo_chequeo = 0.0
+        self.disponible = False
+        self.retraso: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @staticmethod
+    def medir_retraso(engine) -> Optional[float]:
+        """Segundos de retraso de replicación (0 si el motor no los reporta, None si está detenida)."""
+        with engine.connect() as conn:
+            if engine.dialect.name != 'mysql':
+                conn.exec_driver_sql('SELECT 1')
+                return 0.0
+            try:
+                fila = conn.exec_driver_sql('SHOW REPLICA STATUS').mappings().first()
+            except Exception:
+                # MySQL < 8.0.22
+                fila = conn.exec_driver_sql('SHOW SLAVE STATUS').mappings().first()
+            if fila is None:
+                # No es una réplica (p. ej. el mismo servidor en desarrollo)
+                return 0.0
+            retraso = fila.get('Seconds_Behind_Source', fila.get('Seconds_Behind_Master'))
+            return float(retraso) if retraso is not None else None
+
+    def esta_disponible(self, engine, retraso_maximo: float, intervalo: float) -> bool:
+        if monotonic() - self.ultimo_chequeo < intervalo:
+            return self.disponible
+        with self._lock:
+            if monotonic() - self.ultimo_chequeo < intervalo:
+                return self.disponible
+            try:
+                self.retraso = self.medir_retraso(engine)
+                self.error = None
+                self.disponible = self.retraso is not None and self.retraso <= retraso_maximo
+            except Exception as e:
+                self.retraso, self.error, self.disponible = None, str(e), False
+            self.ultimo_chequeo = monotonic()
+            return self.disponible
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'disponible': self.disponible,
+            'retraso_segundos': self.retraso,
+            'error': self.error,
+            'ultimo_chequeo_hace': round(monotonic() - self.ultimo_chequeo, 1) if self.ultimo_chequeo else None
+        }
+
+
+monitor = MonitorReplica()
+
+
+# --- Sesión ---
+
+class SesionEnrutada(Session):
+    """Sesión de Flask-SQLAlchemy que decide entre primaria y réplica en cada sentencia."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or (clause is not None and getattr(clause, 'is_dml', False)):
+                fijar_primaria()
+            elif _replica_solicitada() and not primaria_fijada():
+                engine = self._db.engines.get(REPLICA_BIND)
+                if engine is not None and monitor.esta_disponible(
+                    engine,
+                    current_app.config.get('REPLICA_RETRASO_MAXIMO', 5),
+                    current_app.config.get('REPLICA_CHEQUEO_INTERVALO', 10)
+                ):
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def estado_replica(db) -> Dict[str, Any]:
+    """Estado de la réplica en este proceso (requiere contexto de aplicación)."""
+    return {'configurada': REPLICA_BIND in db.engines, **monitor.to_dict()}
+
+
+# --- Desarrollo local con dos archivos SQLite ---
+
+def _ruta_sqlite(engine) -> Optional[str]:
+    if engine.dialect.name != 'sqlite' or not engine.url.database or engine.url.database == ':memory:':
+        return None
+    return engine.url.database
+
+def init_replica(app, db):
+    """Registra el comando `flask replica-sync` para copiar la base SQLite primaria a la réplica."""
+
+    @app.cli.command('replica-sync')
+    def replica_sync():
+        """Copia la base SQLite primaria sobre la réplica (solo desarrollo local)."""
+        replica = db.engines.get(REPLICA_BIND)
+        if replica is None:
+            raise click.ClickException('No hay réplica configurada (DEV_REPLICA_URI / REPLICA_DATABASE_URI)')
+        origen, destino = _ruta_sqlite(db.engine), _ruta_sqlite(replica)
+        if not origen or not destino:
+            raise click.ClickException('replica-sync solo funciona con archivos SQLite')
+
+        replica.dispose()
+        temporal = f'{destino}.tmp'
+        fuente, copia = sqlite3.connect(origen), sqlite3.connect(temporal)
+        try:
+            fuente.backup(copia)
+        finally:
+            fuente.close()
+            copia.close()
+        shutil.move(temporal, destino)
+        click.echo(f'Réplica sincronizada: {origen} -> {destino} ({os.path.getsize(destino)} bytes)')
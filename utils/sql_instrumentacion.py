@@ -0,0 +1,201 @@
+"""
+Instrumentación SQL por petición y detector de N+1.
+
+Para cada petición muestreada se registran el número de sentencias, el tiempo total
+en base de datos, las sentencias más lentas y las huellas (SQL normalizado) que se
+repiten. Una misma SELECT ejecutada muchas veces con parámetros distintos dentro de
+una petición se marca como N+1.
+
+Modos (SQL_INSTRUMENTACION):
+    'cabeceras' - añade X-SQL-* a cada respuesta (desarrollo)
+    'reporte'   - acumula un reporte en memoria por endpoint (producción)
+    'off'       - desactivado
+"""
+import re
+import threading
+from collections import deque
+from time import perf_counter, time
+from random import random
+from typing import Any, Dict, List
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+
+_ESPACIOS = re.compile(r'\s+')
+_LISTA_IN = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)')
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def huella(sentencia: str) -> str:
+    """SQL normalizado: sin literales, listas IN colapsadas y espacios simples."""
+    texto = _ESPACIOS.sub(' ', sentencia).strip()
+    texto = _LITERALES.sub('?', texto)
+    return _LISTA_IN.sub('(?+)', texto)
+
+
+class RegistroPeticion:
+    """Sentencias ejecutadas durante una petición."""
+    __slots__ = ('cantidad', 'tiempo', 'lentas', 'huellas')
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+        self.lentas: List[tuple] = []
+        self.huellas: Dict[str, Dict[str, Any]] = {}
+
+    def registrar(self, sentencia: str, parametros: Any, duracion: float, max_lentas: int):
+        """Registra una sentencia; `parametros` es una clave hashable de sus valores."""
+        self.cantidad += 1
+        self.tiempo += duracion
+
+        self.lentas.append((duracion, sentencia))
+        if len(self.lentas) > max_lentas:
+            self.lentas.sort(key=lambda x: x[0], reverse=True)
+            del self.lentas[max_lentas:]
+
+        datos = self.huellas.setdefault(huella(sentencia), {'veces': 0, 'tiempo': 0.0, 'parametros': set()})
+        datos['veces'] += 1
+        datos['tiempo'] += duracion
+        if len(datos['parametros']) < 1000:
+            datos['parametros'].add(parametros)
+
+    def n_mas_uno(self, umbral: int) -> List[Dict[str, Any]]:
+        """SELECT repetidas con parámetros distintos al menos `umbral` veces."""
+        sospechosas = []
+        for texto, datos in self.huellas.items():
+            if datos['veces'] >= umbral and len(datos['parametros']) > 1 and texto.upper().startswith('SELECT'):
+                sospechosas.append({
+                    'huella': texto[:500],
+                    'veces': datos['veces'],
+                    'tiempo_ms': round(datos['tiempo'] * 1000, 3)
+                })
+        return sorted(sospechosas, key=lambda s: s['veces'], reverse=True)
+
+    def resumen(self, umbral: int) -> Dict[str, Any]:
+        return {
+            'sentencias': self.cantidad,
+            'tiempo_ms': round(self.tiempo * 1000, 3),
+            'repetidas': sum(1 for d in self.huellas.values() if d['veces'] > 1),
+            'mas_lentas': [
+                {'tiempo_ms': round(d * 1000, 3), 'sql': huella(s)[:500]}
+                for d, s in sorted(self.lentas, key=lambda x: x[0], reverse=True)
+            ],
+            'n_mas_uno': self.n_mas_uno(umbral)
+        }
+
+
+class ReporteSQL:
+    """Reporte acumulado en memoria del proceso: agregados por endpoint y últimas peticiones con N+1."""
+
+    def __init__(self, max_recientes: int = 200):
+        self._lock = threading.Lock()
+        self.max_recientes = max_recientes
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.desde = time()
+            self.endpoints: Dict[str, Dict[str, Any]] = {}
+            self.n_mas_uno = deque(maxlen=self.max_recientes)
+
+    def agregar(self, endpoint: str, metodo: str, estado: int, resumen: Dict[str, Any]):
+        clave = f'{metodo} {endpoint}'
+        with self._lock:
+            datos = self.endpoints.setdefault(clave, {
+                'peticiones': 0, 'sentencias': 0, 'sentencias_max': 0,
+                'tiempo_ms': 0.0, 'tiempo_max_ms': 0.0, 'peticiones_n_mas_uno': 0
+            })
+            datos['peticiones'] += 1
+            datos['sentencias'] += resumen['sentencias']
+            datos['sentencias_max'] = max(datos['sentencias_max'], resumen['sentencias'])
+            datos['tiempo_ms'] += resumen['tiempo_ms']
+            datos['tiempo_max_ms'] = max(datos['tiempo_max_ms'], resumen['tiempo_ms'])
+            if resumen['n_mas_uno']:
+                datos['peticiones_n_mas_uno'] += 1
+                self.n_mas_uno.append({
+                    'endpoint': clave,
+                    'estado': estado,
+                    'fecha': time(),
+                    'sentencias': resumen['sentencias'],
+                    'n_mas_uno': resumen['n_mas_uno'][:5]
+                })
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = [
+                {
+                    'endpoint': clave,
+                    **datos,
+                    'sentencias_media': round(datos['sentencias'] / datos['peticiones'], 2),
+                    'tiempo_medio_ms': round(datos['tiempo_ms'] / datos['peticiones'], 3)
+                }
+                for clave, datos in self.endpoints.items()
+            ]
+            recientes = list(self.n_mas_uno)
+        endpoints.sort(key=lambda e: e['sentencias_media'], reverse=True)
+        return {'desde': self.desde, 'endpoints': endpoints, 'n_mas_uno_recientes': recientes[::-1]}
+
+
+reporte = ReporteSQL()
+
+
+def _registro_actual():
+    return g.get('_sql_registro') if has_app_context() else None
+
+
+def _antes_de_ejecutar(conn, cursor, sentencia, parametros, context, executemany):
+    if _registro_actual() is not None:
+        conn.info.setdefault('_sql_inicio', []).append(perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, sentencia, parametros, context, executemany):
+    registro = _registro_actual()
+    inicios = conn.info.get('_sql_inicio')
+    if registro is None or not inicios:
+        return
+    # En executemany solo importa el tamaño del lote, no cada fila
+    clave = ('executemany', len(parametros)) if executemany else repr(parametros)
+    registro.registrar(sentencia, clave, perf_counter() - inicios.pop(),
+                       current_app.config.get('SQL_MAX_LENTAS', 5))
+
+
+def init_instrumentacion(app, db):
+    """Conecta los eventos de los engines y los hooks de petición según SQL_INSTRUMENTACION."""
+    modo = app.config.get('SQL_INSTRUMENTACION', 'off')
+    if modo not in ('cabeceras', 'reporte'):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'before_cursor_execute', _antes_de_ejecutar):
+                event.listen(engine, 'before_cursor_execute', _antes_de_ejecutar)
+                event.listen(engine, 'after_cursor_execute', _despues_de_ejecutar)
+
+    @app.before_request
+    def _iniciar_registro_sql():
+        if random() < app.config.get('SQL_MUESTREO', 1.0):
+            g._sql_registro = RegistroPeticion()
+
+    @app.after_request
+    def _cerrar_registro_sql(response):
+        registro = g.pop('_sql_registro', None)
+        if registro is None:
+            return response
+
+        resumen = registro.resumen(app.config.get('SQL_N1_UMBRAL', 5))
+        if resumen['n_mas_uno']:
+            app.logger.warning(
+                'Posible N+1 en %s %s: %s', request.method, request.path,
+                '; '.join(f"{s['veces']}x {s['huella'][:120]}" for s in resumen['n_mas_uno'][:3])
+            )
+
+        if modo == 'cabeceras':
+            response.headers['X-SQL-Count'] = str(resumen['sentencias'])
+            response.headers['X-SQL-Time-Ms'] = str(resumen['tiempo_ms'])
+            response.headers['X-SQL-Repeated'] = str(resumen['repetidas'])
+            if resumen['n_mas_uno']:
+                response.headers['X-SQL-N1'] = str(len(resumen['n_mas_uno']))
+        else:
+            ruta = request.url_rule.rule if request.url_rule else request.path
+            reporte.agregar(ruta, request.method, response.status_code, resumen)
+        return response
@@ -0,0 +1,62 @@
+"""
+Tareas periódicas en segundo plano, una por proceso.
+
+Cada tarea corre en un hilo daemon que se inicia con la primera petición del proceso
+(los hilos no sobreviven al fork de gunicorn, así que no se inician en create_app) y
+ejecuta su función dentro de un contexto de aplicación cada `intervalo` segundos.
+Las funciones deben ser idempotentes: con varios workers se ejecutan en cada uno.
+"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TareaPeriodica:
+    """Función ejecutada cada `intervalo` segundos en un hilo del proceso actual."""
+
+    def __init__(self, nombre: str, intervalo: float, funcion):
+        self.nombre = nombre
+        self.intervalo = intervalo
+        self.funcion = funcion
+        self._pid = None
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+
+    def asegurar_iniciada(self, app):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._detener = threading.Event()
+            threading.Thread(target=self._bucle, args=(app, self._detener), name=f'tarea-{self.nombre}', daemon=True).start()
+
+    def _bucle(self, app, detener):
+        while not detener.wait(self.intervalo):
+            try:
+                with app.app_context():
+                    self.funcion()
+            except Exception:
+                logger.exception("Error en la tarea periódica %s", self.nombre)
+
+    def detener(self):
+        self._detener.set()
+
+
+def programar_tarea(app, nombre: str, intervalo: float, funcion):
+    """Registra una tarea periódica en la aplicación; intervalo <= 0 la desactiva."""
+    if not intervalo or intervalo <= 0:
+        return None
+
+    tarea = TareaPeriodica(nombre, intervalo, funcion)
+    tareas = app.extensions.setdefault('tareas_periodicas', [])
+    if not tareas:
+        @app.before_request
+        def _iniciar_tareas():
+            for pendiente in tareas:
+                pendiente.asegurar_iniciada(app)
+    tareas.append(tarea)
+    return tarea